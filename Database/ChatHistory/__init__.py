@@ -7,16 +7,13 @@ parent_dir = os.path.dirname(current_dir)
 top_level = os.path.dirname(parent_dir)
 sys.path.insert(0, top_level)
 
-from Database.connection import connect_to_postgres
+from Database.connection import pooled_connection
 from Database.ChatHistory.initialize_table import initialize_chathistory_table
 
 
 load_dotenv()
-conn = connect_to_postgres(os.environ)
-
-initialize_chathistory_table(conn)
-
-conn.close()
+with pooled_connection() as conn:
+    initialize_chathistory_table(conn)
 
 # Testing functions for interacting with DB
 
@@ -1,7 +1,6 @@
 import psycopg2
 from psycopg2 import sql
-from Database.connection import connect_to_postgres
-import os
+from Database.connection import pooled_connection
 
 
 def load_chat_history(user_id, session_id, conn=None):
@@ -9,7 +8,8 @@ def load_chat_history(user_id, session_id, conn=None):
     Loads chat history for a specific user and session, ordered from newest to oldest.
 
     Args:
-        conn (psycopg2.connection): The database connection object.
+        conn (psycopg2.connection): The database connection object, borrowed from
+            the pool by default.
         user_id (str): The UUID of the user.
         session_id (str): The UUID of the session.
 
@@ -17,42 +17,40 @@ def load_chat_history(user_id, session_id, conn=None):
         list of dicts: A list of chat history records, where each record is a dictionary.
     """
 
-    if not conn:
-        conn = connect_to_postgres(os.environ)
-
-    try:
-        cursor = conn.cursor()
-
-        query = sql.SQL(
-            "SELECT id, user_id, session_id, messages, answer, created_at FROM chat_history WHERE user_id = %s AND session_id = %s ORDER BY created_at DESC"
-        )
-
-        cursor.execute(
-            query,
-            (
-                user_id,
-                session_id,
-            ),
-        )
-
-        column_names = [desc[0] for desc in cursor.description]
-
-        chat_history_rows = cursor.fetchall()
-
-        chat_history_dicts = []
-        for row in chat_history_rows:
-            row_dict = dict(zip(column_names, row))
-            chat_history_dicts.append(row_dict)
-
-        print(
-            f"Successfully loaded chat history for user ID: {user_id} and session ID: {session_id}."
-        )
-        return chat_history_dicts
-
-    except psycopg2.Error as error:
-        print(f"Error loading chat history: {error}")
-        return []
-
-    finally:
-        if cursor:
-            cursor.close()
+    with pooled_connection(conn) as conn:
+        if not conn:
+            return []
+        try:
+            with conn.cursor() as cursor:
+                query = sql.SQL(
+                    "SELECT id, user_id, session_id, messages, answer, created_at FROM chat_history WHERE user_id = %s AND session_id = %s ORDER BY created_at DESC"
+                )
+
+                cursor.execute(
+                    query,
+                    (
+                        user_id,
+                        session_id,
+                    ),
+                )
+
+                column_names = [desc[0] for desc in cursor.description]
+
+                chat_history_rows = cursor.fetchall()
+            # jen čtení, transakce se nenechává otevřená
+            conn.commit()
+
+            chat_history_dicts = []
+            for row in chat_history_rows:
+                row_dict = dict(zip(column_names, row))
+                chat_history_dicts.append(row_dict)
+
+            print(
+                f"Successfully loaded chat history for user ID: {user_id} and session ID: {session_id}."
+            )
+            return chat_history_dicts
+
+        except psycopg2.Error as error:
+            print(f"Error loading chat history: {error}")
+            conn.rollback()
+            return []
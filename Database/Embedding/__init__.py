@@ -8,14 +8,16 @@ parent_dir = os.path.dirname(current_dir)
 top_level = os.path.dirname(parent_dir)
 sys.path.insert(0, top_level)
 
-from Database.connection import connect_to_postgres
-from Database.Embedding.initialize_table import initialize_embedding_table
+from Database.connection import pooled_connection
+from Database.Embedding.initialize_table import (
+    initialize_embedding_table,
+    initialize_embedding_cache_table,
+)
 
 load_dotenv()
-conn = connect_to_postgres(os.environ)
-
-initialize_embedding_table(conn)
-conn.close()
+with pooled_connection() as conn:
+    initialize_embedding_table(conn)
+    initialize_embedding_cache_table(conn)
 
 # # Testing
 # from add_to_db import add_embedding_row
@@ -1,14 +1,11 @@
+import asyncio
 import psycopg2
-from Database.Embedding.embeding import get_ollama_embedding
-from Database.connection import connect_to_postgres
-import os
+from psycopg2.extras import execute_values
+from Database.Embedding.embeding import get_ollama_embedding, aget_ollama_embeddings
+from Database.connection import pooled_connection
 
 
 def add_embedding_row(GQLquery, user_prompt, conn=None):
-
-    if not conn:
-        conn = connect_to_postgres(os.environ)
-
     """
     Inserts a new row into the graphql_types table.
     """
@@ -20,13 +17,67 @@ def add_embedding_row(GQLquery, user_prompt, conn=None):
     # get embedding in float type
     embedding = get_ollama_embedding(user_prompt)
     print("deje se ")
-    if conn:
+    with pooled_connection(conn) as conn:
+        if not conn:
+            return
         try:
-            cursor = conn.cursor()
-            cursor.execute(command, (user_prompt, GQLquery, embedding))
+            with conn.cursor() as cursor:
+                cursor.execute(command, (user_prompt, GQLquery, embedding))
             conn.commit()
-            cursor.close()
             print("Row added successfully.")
         except psycopg2.Error as error:
             print(f"Error adding row: {error}")
             conn.rollback()
+
+
+def _insert_rows(rows, conn=None):
+    with pooled_connection(conn) as conn:
+        if not conn:
+            return 0
+        try:
+            with conn.cursor() as cursor:
+                execute_values(
+                    cursor,
+                    """
+                    INSERT INTO graphql_types (question, answer, embedding)
+                    VALUES %s
+                    ON CONFLICT (question) DO NOTHING;
+                    """,
+                    rows,
+                )
+            conn.commit()
+            print(f"{len(rows)} rows added successfully.")
+            return len(rows)
+        except psycopg2.Error as error:
+            print(f"Error adding rows: {error}")
+            conn.rollback()
+            return 0
+
+
+async def aadd_embedding_rows(pairs, conn=None) -> int:
+    """
+    Embeds questions in batches and inserts them with their answers in one statement.
+
+    The database work runs in a worker thread, so it may be awaited on the UI loop.
+
+    Args:
+        pairs: (GQLquery, user_prompt) tuples, like the arguments of `add_embedding_row`
+        conn: psycopg2 connection, borrowed from the pool by default
+
+    Returns:
+        int: number of rows sent to the database (questions without an embedding are skipped)
+    """
+    pairs = list(pairs)
+    embeddings = await aget_ollama_embeddings([prompt for _, prompt in pairs])
+    rows = [
+        (prompt, query, embedding)
+        for (query, prompt), embedding in zip(pairs, embeddings)
+        if embedding is not None
+    ]
+    if not rows:
+        return 0
+    return await asyncio.to_thread(_insert_rows, rows, conn)
+
+
+async def aadd_embedding_row(GQLquery, user_prompt, conn=None) -> int:
+    return await aadd_embedding_rows([(GQLquery, user_prompt)], conn)
@@ -0,0 +1,272 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from Database.connection import pooled_connection
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+# 0 = jen paměť, bez tabulky embedding_cache
+EMBED_CACHE_PERSIST = os.getenv("EMBED_CACHE_PERSIST", "1").strip().lower()
+EMBED_CACHE_PERSIST = EMBED_CACHE_PERSIST not in ("0", "false", "no", "")
+# po chybě databáze se tabulka tolik sekund přeskakuje
+EMBED_CACHE_DB_BACKOFF = float(os.getenv("EMBED_CACHE_DB_BACKOFF", "60"))
+
+Embed = Callable[[List[str], str], Awaitable[List[Optional[List[float]]]]]
+
+
+def normalize_text(text: str) -> str:
+    """NFC with collapsed whitespace, texts differing only in spacing share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by `(model, sha256 of the normalized text)`.
+
+    A bounded in-process LRU is in front of the `embedding_cache` table in the
+    pgvector database. Texts missing in both tiers are embedded in one batched call
+    and written to both. Without a database the cache works in memory only.
+
+    Args:
+        embed: coroutine function (texts, model) -> embeddings, e.g. `OllamaEmbeddingClient.embed`
+        maxsize: max. embeddings kept in memory (env `EMBED_CACHE_SIZE`)
+        persist: use the Postgres table (env `EMBED_CACHE_PERSIST`)
+    """
+
+    def __init__(
+        self,
+        embed: Embed,
+        maxsize: Optional[int] = None,
+        persist: Optional[bool] = None,
+    ):
+        self.embed_texts = embed
+        self.maxsize = EMBED_CACHE_SIZE if maxsize is None else maxsize
+        self.persist = EMBED_CACHE_PERSIST if persist is None else persist
+        self._memory: OrderedDict[tuple, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_retry_at = 0.0
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.db_errors = 0
+        self.embed_seconds = 0.0
+        # průměrná doba embeddingu jednoho textu, z ní se počítá ušetřený čas
+        self.seconds_per_text = 0.0
+        self.saved_seconds = 0.0
+
+    # --- paměť ---
+
+    def _get_memory(self, key: tuple) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+            return embedding
+
+    def _put_memory(self, key: tuple, embedding: List[float]):
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    # --- Postgres ---
+
+    def _db_failed(self):
+        self.db_errors += 1
+        self._db_retry_at = time.monotonic() + EMBED_CACHE_DB_BACKOFF
+
+    def _db_call(self, action, default):
+        if time.monotonic() < self._db_retry_at:
+            return default
+        # spojení z poolu, souběžná vyhledávání se neserializují
+        with pooled_connection() as conn:
+            if conn is None:
+                self._db_failed()
+                return default
+            try:
+                with conn.cursor() as cursor:
+                    result = action(cursor)
+                conn.commit()
+                return result
+            except psycopg2.Error as error:
+                print(f"Error in embedding cache table: {error}")
+                if not conn.closed:
+                    conn.rollback()
+                self._db_failed()
+                return default
+
+    def _db_get(self, model: str, hashes: List[str]) -> dict:
+        def action(cursor):
+            cursor.execute(
+                """
+                SELECT text_hash, embedding FROM embedding_cache
+                WHERE model = %s AND text_hash = ANY(%s);
+                """,
+                (model, hashes),
+            )
+            return {h: list(e) for h, e in cursor.fetchall()}
+
+        return self._db_call(action, {})
+
+    def _db_put(self, model: str, rows: List[tuple]):
+        def action(cursor):
+            execute_values(
+                cursor,
+                """
+                INSERT INTO embedding_cache (model, text_hash, embedding)
+                VALUES %s
+                ON CONFLICT (model, text_hash) DO NOTHING;
+                """,
+                [(model, h, e) for h, e in rows],
+            )
+
+        self._db_call(action, None)
+
+    # --- API ---
+
+    async def embed(
+        self,
+        texts: Sequence[str],
+        model: str,
+        embed: Optional[Embed] = None,
+    ) -> List[Optional[List[float]]]:
+        """
+        Embeddings of `texts` in their order, None for a text which failed to embed.
+
+        Args:
+          embed: embedding function for this call (e.g. a client of another event loop)
+        """
+        texts = list(texts)
+        hashes = [text_hash(model, t) for t in texts]
+        result: List[Optional[List[float]]] = [None] * len(texts)
+        missing: dict[str, List[int]] = {}
+        for i, h in enumerate(hashes):
+            embedding = self._get_memory((model, h))
+            if embedding is not None:
+                result[i] = embedding
+                self.memory_hits += 1
+            else:
+                missing.setdefault(h, []).append(i)
+
+        if missing and self.persist:
+            found = await asyncio.to_thread(self._db_get, model, list(missing))
+            for h, embedding in found.items():
+                self._put_memory((model, h), embedding)
+                for i in missing.pop(h):
+                    result[i] = embedding
+                    self.db_hits += 1
+
+        if missing:
+            # stejný text se pošle jen jednou
+            unique = list(missing)
+            start = time.perf_counter()
+            embeddings = await (embed or self.embed_texts)(
+                [texts[missing[h][0]] for h in unique], model
+            )
+            elapsed = time.perf_counter() - start
+            self.embed_seconds += elapsed
+            self.misses += len(unique)
+            per_text = elapsed / len(unique)
+            if self.seconds_per_text:
+                per_text = self.seconds_per_text + 0.2 * (
+                    per_text - self.seconds_per_text
+                )
+            self.seconds_per_text = per_text
+            rows = []
+            for h, embedding in zip(unique, embeddings):
+                if embedding is None:
+                    continue
+                self._put_memory((model, h), embedding)
+                rows.append((h, embedding))
+                for i in missing[h]:
+                    result[i] = embedding
+            if rows and self.persist:
+                await asyncio.to_thread(self._db_put, model, rows)
+
+        hits = len(texts) - sum(len(v) for v in missing.values())
+        self.saved_seconds += hits * self.seconds_per_text
+        return result
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.db_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "db_errors": self.db_errors,
+            "entries": len(self._memory),
+            "embed_seconds": self.embed_seconds,
+            "saved_seconds": self.saved_seconds,
+        }
+
+
+class EmbeddingCacheCollector:
+    """prometheus_client collector exporting `EmbeddingCache.stats`."""
+
+    def __init__(self, cache: EmbeddingCache):
+        self.cache = cache
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        stats = self.cache.stats()
+        lookups = CounterMetricFamily(
+            "embedding_cache_lookups",
+            "Embedding lookups by result",
+            labels=["result"],
+        )
+        lookups.add_metric(["memory_hit"], stats["memory_hits"])
+        lookups.add_metric(["db_hit"], stats["db_hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        yield lookups
+        yield GaugeMetricFamily(
+            "embedding_cache_hit_ratio",
+            "Share of lookups served by the cache",
+            value=stats["hit_rate"],
+        )
+        yield GaugeMetricFamily(
+            "embedding_cache_entries",
+            "Embeddings kept in memory",
+            value=stats["entries"],
+        )
+        yield CounterMetricFamily(
+            "embedding_cache_db_errors",
+            "Failed embedding cache table operations",
+            value=stats["db_errors"],
+        )
+        yield CounterMetricFamily(
+            "embedding_cache_embed_seconds",
+            "Time spent embedding cache misses",
+            value=stats["embed_seconds"],
+        )
+        yield CounterMetricFamily(
+            "embedding_cache_saved_seconds",
+            "Estimated embedding time saved by cache hits",
+            value=stats["saved_seconds"],
+        )
+
+
+def register_prometheus_collector(cache: EmbeddingCache) -> bool:
+    """Registers `EmbeddingCacheCollector` in the default prometheus registry, False without prometheus_client."""
+    try:
+        from prometheus_client import REGISTRY
+    except ImportError:
+        return False
+    REGISTRY.register(EmbeddingCacheCollector(cache))
+    return True
@@ -1,12 +1,218 @@
-import requests
-from typing import List, Optional
-import json
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
 from dotenv import load_dotenv
 import os
 
+import aiohttp
+
+from Database.Embedding.embedding_cache import EmbeddingCache
+
 load_dotenv()
 OLLAMA_TOKEN = os.getenv("OLLAMA_TOKEN")
 OLLAMA_URL = os.getenv("OLLAMA_URL")
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "mxbai-embed-large")
+# počet textů v jednom požadavku /api/embed
+OLLAMA_EMBED_BATCH = int(os.getenv("OLLAMA_EMBED_BATCH", "32"))
+OLLAMA_EMBED_CONCURRENCY = int(os.getenv("OLLAMA_EMBED_CONCURRENCY", "4"))
+OLLAMA_EMBED_RETRIES = int(os.getenv("OLLAMA_EMBED_RETRIES", "3"))
+OLLAMA_EMBED_TIMEOUT = float(os.getenv("OLLAMA_EMBED_TIMEOUT", "60"))
+OLLAMA_POOL_LIMIT = int(os.getenv("OLLAMA_POOL_LIMIT", "16"))
+
+_RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class OllamaEmbeddingClient:
+    """
+    Async client of the Ollama batch endpoint `/api/embed` with one pooled session.
+
+    Texts are split into batches of `batch_size`, up to `concurrency` batches are in
+    flight at once. A batch failing with a timeout, connection error, 408, 429 or
+    5xx is retried with exponential backoff, a batch which fails for good gives None
+    for each of its texts. The session is bound to the event loop it was created on
+    and is recreated on another loop.
+
+    Args:
+        url: Ollama host, `https://` is prepended without a scheme (env `OLLAMA_URL`)
+        token: bearer token (env `OLLAMA_TOKEN`)
+        model: embedding model (env `OLLAMA_EMBED_MODEL`)
+        batch_size: texts per request (env `OLLAMA_EMBED_BATCH`)
+        concurrency: max. requests in flight (env `OLLAMA_EMBED_CONCURRENCY`)
+        retries: retries of one batch (env `OLLAMA_EMBED_RETRIES`)
+        timeout: total timeout of one request in seconds (env `OLLAMA_EMBED_TIMEOUT`)
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        token: Optional[str] = None,
+        model: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        url = OLLAMA_URL if url is None else url
+        self.url = (url if "://" in (url or "") else f"https://{url}").rstrip("/")
+        self.token = OLLAMA_TOKEN if token is None else token
+        self.model = OLLAMA_EMBED_MODEL if model is None else model
+        self.batch_size = max(1, batch_size or OLLAMA_EMBED_BATCH)
+        self.concurrency = max(1, concurrency or OLLAMA_EMBED_CONCURRENCY)
+        self.retries = OLLAMA_EMBED_RETRIES if retries is None else retries
+        self.timeout = OLLAMA_EMBED_TIMEOUT if timeout is None else timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop = None
+
+        self.requests = 0
+        self.retried = 0
+        self.errors = 0
+        self.texts = 0
+        self.total_seconds = 0.0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=OLLAMA_POOL_LIMIT),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=headers,
+            )
+            self._loop = loop
+        return self._session
+
+    async def _post(self, texts: List[str], model: str) -> List[List[float]]:
+        payload = {"model": model, "input": texts}
+        for attempt in range(self.retries + 1):
+            self.requests += 1
+            start = time.perf_counter()
+            try:
+                async with self.session.post(
+                    f"{self.url}/api/embed", json=payload
+                ) as resp:
+                    if resp.status in _RETRY_STATUSES and attempt < self.retries:
+                        raise aiohttp.ClientResponseError(
+                            resp.request_info, resp.history, status=resp.status
+                        )
+                    resp.raise_for_status()
+                    data = await resp.json(content_type=None)
+                embeddings = data.get("embeddings") or []
+                if len(embeddings) != len(texts):
+                    raise ValueError(
+                        f"expected {len(texts)} embeddings, got {len(embeddings)}"
+                    )
+                return embeddings
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, "status", None)
+                if attempt >= self.retries or (
+                    status is not None and status not in _RETRY_STATUSES
+                ):
+                    raise
+                self.retried += 1
+                print(f"embedding request failed ({e}), retry {attempt + 1}")
+                await asyncio.sleep(0.5 * 2**attempt)
+            finally:
+                self.total_seconds += time.perf_counter() - start
+
+    async def embed(
+        self, texts: Sequence[str], model: Optional[str] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embeds `texts`, the result has their order. A text of a failed batch is None.
+        """
+        model = model or self.model
+        texts = list(texts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch: List[str]) -> List[Optional[List[float]]]:
+            async with semaphore:
+                try:
+                    return await self._post(batch, model)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Error during embedding request: {e}")
+                    return [None] * len(batch)
+
+        batches = await asyncio.gather(
+            *(
+                run(texts[i : i + self.batch_size])
+                for i in range(0, len(texts), self.batch_size)
+            )
+        )
+        self.texts += len(texts)
+        return [embedding for batch in batches for embedding in batch]
+
+    async def embed_one(
+        self, text: str, model: Optional[str] = None
+    ) -> Optional[List[float]]:
+        return (await self.embed([text], model))[0]
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "errors": self.errors,
+            "texts": self.texts,
+            "avg_seconds": self.total_seconds / self.requests if self.requests else 0.0,
+        }
+
+
+# sdílený klient pro async kód (UI, skills)
+EMBEDDING_CLIENT = OllamaEmbeddingClient()
+# paměť + tabulka embedding_cache před klientem
+EMBEDDING_CACHE = EmbeddingCache(EMBEDDING_CLIENT.embed)
+
+
+async def aget_ollama_embeddings(
+    texts: Sequence[str], model: Optional[str] = None
+) -> List[Optional[List[float]]]:
+    """
+    Embeds many texts with the shared client, see `OllamaEmbeddingClient.embed`.
+    Texts embedded before are served by `EMBEDDING_CACHE`.
+    """
+    return await EMBEDDING_CACHE.embed(texts, model or EMBEDDING_CLIENT.model)
+
+
+async def aget_ollama_embedding(
+    text: str, model: Optional[str] = None
+) -> Optional[List[float]]:
+    return (await aget_ollama_embeddings([text], model))[0]
+
+
+def _run_sync(texts: List[str], model: Optional[str]) -> List[Optional[List[float]]]:
+    async def run():
+        # vlastní klient, session nesmí přežít jednorázovou smyčku
+        async with OllamaEmbeddingClient(model=model) as client:
+            return await EMBEDDING_CACHE.embed(texts, client.model, embed=client.embed)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run())
+    # volání ze smyčky událostí, poběží ve vlastním vlákně (volající ale čeká)
+    print("get_ollama_embedding called from a running event loop, use the async API")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, run()).result()
+
+
+def get_ollama_embeddings(
+    texts: Sequence[str], model: Optional[str] = None
+) -> List[Optional[List[float]]]:
+    """Blocking variant of `aget_ollama_embeddings` for scripts."""
+    return _run_sync(list(texts), model)
 
 
 def get_ollama_embedding(
@@ -15,6 +221,9 @@ def get_ollama_embedding(
     """
     Retrieves an embedding for the given text from the Ollama server.
 
+    Blocking wrapper over `OllamaEmbeddingClient` and `EMBEDDING_CACHE`, async code
+    should await `aget_ollama_embedding` instead.
+
     Args:
         text (str): The text to be embedded.
         model (str): The name of the Ollama model to use. Defaults to "mxbai-embed-large".
@@ -23,35 +232,4 @@ def get_ollama_embedding(
         Optional[List[float]]: A list of floats representing the embedding vector,
                                or None if the request fails.
     """
-    # Ollama server endpoint for embeddings
-    url = f"https://{OLLAMA_URL}/api/embeddings"
-
-    # JSON payload for the request
-    payload = json.dumps({"model": model, "prompt": text})
-    token = f"Bearer {OLLAMA_TOKEN}"
-
-    try:
-        # Send the POST request to the Ollama server
-        response = requests.post(
-            url,
-            data=payload,
-            timeout=60,
-            headers={"Authorization": token},
-        )
-        print("deje se 2")
-
-        # Raise an HTTPError for bad responses (4xx or 5xx)
-        response.raise_for_status()
-        # Parse the JSON response
-        data = response.json()
-
-        # Return the embedding vector
-        embedding = data.get("embedding", [])
-        return embedding
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error during API request: {e}")
-        return None
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return None
+    return _run_sync([text], model)[0]
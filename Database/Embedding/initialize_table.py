@@ -1,5 +1,7 @@
 import psycopg2
 
+from Database.Embedding.vector_search import index_ddl
+
 # DROP TABLE IF EXISTS graphql_types;
 
 
@@ -11,17 +13,13 @@ def initialize_embedding_table(conn):
     CREATE EXTENSION IF NOT EXISTS vector;
     CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
-    CREATE TABLE graphql_types (
+    CREATE TABLE IF NOT EXISTS graphql_types (
         id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
         question TEXT UNIQUE,
         answer TEXT,
         embedding vector({embedding_dimension})
     );
-
-    CREATE INDEX IF NOT EXISTS idx_graphql_types_embedding
-        ON graphql_types
-        USING ivfflat (embedding vector_cosine_ops)
-        WITH (lists = 100);
+    {index_ddl()}
     """
 
     if conn:
@@ -35,3 +33,35 @@ def initialize_embedding_table(conn):
         except psycopg2.Error as error:
             print(f"Error executing command: {error}")
             conn.rollback()
+
+
+def initialize_embedding_cache_table(conn):
+    """
+    Creates the `embedding_cache` table used by `EmbeddingCache` if it does not exist.
+
+    Args:
+        conn: A psycopg2 connection object.
+    """
+    command = """
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+        model TEXT NOT NULL,
+        text_hash CHAR(64) NOT NULL,
+        embedding REAL[] NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (model, text_hash)
+    );
+    """
+
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute(command)
+            conn.commit()
+            cursor.close()
+            print(
+                "Embedding cache table 'embedding_cache' checked and created if needed."
+            )
+
+        except psycopg2.Error as error:
+            print(f"Error executing command: {error}")
+            conn.rollback()
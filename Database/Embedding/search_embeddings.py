@@ -1,40 +1,24 @@
-import ollama
-import psycopg2
-import os
-
-from Database.connection import connect_to_postgres
+from Database.connection import pooled_connection
+from Database.Embedding.embeding import get_ollama_embedding
+from Database.Embedding.vector_search import search
 
 
 def get_embeddings(query: str):
+    # přes EMBEDDING_CACHE, opakované dotazy se neposílají na server
+    return get_ollama_embedding(query, model="mxbai-embed-large")
 
-    response = ollama.embeddings(model="mxbai-embed-large", prompt=query)
-    return response["embedding"]
-
-
-def search_index(conn=None):
-    if not conn:
-        conn = connect_to_postgres(os.environ)
-
-    query = "Show me all planned lessons for this semester"
 
+def search_index(
+    conn=None, query: str = "Show me all planned lessons for this semester", k: int = 5
+):
+    """Prints the `k` stored questions closest to `query` with their answers and scores."""
     embedding = get_embeddings(query=query)
+    if embedding is None:
+        return []
 
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT name, description
-            FROM graphql_types
-            ORDER BY embedding <-> %s::vector
-            LIMIT 5;
-            """,
-            (embedding,),
-        )
-        matches = cur.fetchall()
+    with pooled_connection(conn) as conn:
+        if not conn:
+            return []
+        matches = search(conn, embedding, k=k)
         print(matches)
-
-    except psycopg2.Error as error:
-        print(f"Error executing command: {error}")
-    finally:
-        cur.close()
-        conn.close()
+        return matches
@@ -0,0 +1,201 @@
+import asyncio
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import psycopg2
+
+from Database.connection import pooled_connection
+
+# hnsw | ivfflat
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "hnsw").strip().lower()
+# cosine | l2 | ip, operátor dotazu musí odpovídat operátorové třídě indexu
+VECTOR_METRIC = os.getenv("VECTOR_METRIC", "cosine").strip().lower()
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "100"))
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+
+TABLE = "graphql_types"
+INDEX_NAME = "idx_graphql_types_embedding"
+
+# metric -> (operator, operator class, distance -> similarity)
+METRICS = {
+    "cosine": ("<=>", "vector_cosine_ops", "1 - {d}"),
+    "l2": ("<->", "vector_l2_ops", "1 / (1 + {d})"),
+    # <#> vrací záporný skalární součin
+    "ip": ("<#>", "vector_ip_ops", "-({d})"),
+}
+
+Match = Tuple[str, str, float]
+
+
+def _metric(metric: Optional[str]) -> tuple:
+    metric = metric or VECTOR_METRIC
+    if metric not in METRICS:
+        raise ValueError(f"Unknown vector metric {metric}")
+    return METRICS[metric]
+
+
+def vector_literal(embedding: Sequence[float]) -> str:
+    """pgvector text form `[1,2,3]`, works with and without `register_vector`."""
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+def index_ddl(
+    index: Optional[str] = None,
+    metric: Optional[str] = None,
+    lists: Optional[int] = None,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+) -> str:
+    """
+    `CREATE INDEX` of the embedding column for the index type and metric.
+
+    Args:
+        index: `hnsw` or `ivfflat` (env `VECTOR_INDEX`)
+        metric: `cosine`, `l2` or `ip` (env `VECTOR_METRIC`)
+        lists: IVFFlat lists (env `IVFFLAT_LISTS`)
+        m: HNSW connections per node (env `HNSW_M`)
+        ef_construction: HNSW build candidate list (env `HNSW_EF_CONSTRUCTION`)
+    """
+    index = index or VECTOR_INDEX
+    _, opclass, _ = _metric(metric)
+    if index == "ivfflat":
+        options = f"lists = {int(lists or IVFFLAT_LISTS)}"
+    elif index == "hnsw":
+        options = (
+            f"m = {int(m or HNSW_M)}, "
+            f"ef_construction = {int(ef_construction or HNSW_EF_CONSTRUCTION)}"
+        )
+    else:
+        raise ValueError(f"Unknown vector index {index}")
+    return f"""
+    CREATE INDEX IF NOT EXISTS {INDEX_NAME}
+        ON {TABLE}
+        USING {index} (embedding {opclass})
+        WITH ({options});
+    """
+
+
+def create_index(conn, replace: bool = False, **options) -> bool:
+    """
+    Creates the ANN index, `replace` drops the existing one first. Needed to switch
+    the index type or metric, e.g. of tables created with the former IVFFlat index.
+    Options as for `index_ddl`.
+    """
+    command = index_ddl(**options)
+    if replace:
+        command = f"DROP INDEX IF EXISTS {INDEX_NAME};\n{command}"
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(command)
+        conn.commit()
+        return True
+    except psycopg2.Error as error:
+        print(f"Error creating vector index: {error}")
+        conn.rollback()
+        return False
+
+
+def search(
+    conn,
+    embedding: Sequence[float],
+    k: int = 5,
+    threshold: Optional[float] = None,
+    metric: Optional[str] = None,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> List[Match]:
+    """
+    Top-k nearest stored questions to `embedding`.
+
+    The query orders by the operator of the index metric, so the ANN index is used.
+    Both `ivfflat.probes` and `hnsw.ef_search` are set with `SET LOCAL`, only for
+    this query's transaction, whichever index type the table currently has.
+
+    Args:
+        k: number of matches
+        threshold: minimal similarity (cosine: 1 - distance, l2: 1 / (1 + distance),
+            ip: inner product), None = no filter
+        metric: must be the metric the index was built with (env `VECTOR_METRIC`)
+        probes: IVFFlat lists scanned (env `IVFFLAT_PROBES`)
+        ef_search: HNSW candidate list (env `HNSW_EF_SEARCH`)
+
+    Returns:
+        list of (question, answer, score), best first
+    """
+    operator, _, similarity = _metric(metric)
+    score = similarity.format(d=f"(embedding {operator} %(vector)s::vector)")
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SET LOCAL ivfflat.probes = %s", (int(probes or IVFFLAT_PROBES),)
+            )
+            # méně kandidátů než k by vrátilo méně řádků
+            cursor.execute(
+                "SET LOCAL hnsw.ef_search = %s",
+                (max(int(ef_search or HNSW_EF_SEARCH), k),),
+            )
+            cursor.execute(
+                f"""
+                SELECT question, answer, {score} AS score
+                FROM {TABLE}
+                ORDER BY embedding {operator} %(vector)s::vector
+                LIMIT %(k)s;
+                """,
+                {"vector": vector_literal(embedding), "k": k},
+            )
+            rows = cursor.fetchall()
+        conn.commit()
+    except psycopg2.Error as error:
+        print(f"Error searching embeddings: {error}")
+        conn.rollback()
+        return []
+    return [
+        (question, answer, float(score))
+        for question, answer, score in rows
+        if threshold is None or score >= threshold
+    ]
+
+
+def search_similar(
+    text: str,
+    k: int = 5,
+    threshold: Optional[float] = None,
+    conn=None,
+    **options,
+) -> List[Match]:
+    """Embeds `text` (through the embedding cache) and runs `search`."""
+    from Database.Embedding.embeding import get_ollama_embedding
+
+    embedding = get_ollama_embedding(text)
+    if embedding is None:
+        return []
+    with pooled_connection(conn) as conn:
+        if not conn:
+            return []
+        return search(conn, embedding, k, threshold, **options)
+
+
+async def asearch_similar(
+    text: str,
+    k: int = 5,
+    threshold: Optional[float] = None,
+    conn=None,
+    **options,
+) -> List[Match]:
+    """Async `search_similar`, the database work runs in a worker thread."""
+    from Database.Embedding.embeding import aget_ollama_embedding
+
+    embedding = await aget_ollama_embedding(text)
+    if embedding is None:
+        return []
+
+    def run():
+        with pooled_connection(conn) as connection:
+            if not connection:
+                return []
+            return search(connection, embedding, k, threshold, **options)
+
+    return await asyncio.to_thread(run)
@@ -1,20 +1,49 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
 import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
 from pgvector.psycopg2 import register_vector
+from dotenv import load_dotenv
+
+load_dotenv()
+# max. počet otevřených spojení procesu
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# tolik nečinných spojení zůstane otevřených i po idle timeoutu
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+# jak dlouho (s) se čeká na volné spojení, pak PoolError
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# nečinné spojení se po tolika sekundách zavře
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+# spojení nečinné déle než tolik sekund se před půjčením ověří `SELECT 1`
+DB_POOL_HEALTH_CHECK = float(os.getenv("DB_POOL_HEALTH_CHECK", "30"))
+
+
+def _connect(env):
+    # Connection parameters
+    return psycopg2.connect(
+        host=env["DBHOSTNAME"],
+        database=env["DBNAME"],
+        user=env["DBUSERNAME"],
+        password=env["DBPASS"],
+        port=env["DBPORT"],
+    )
 
 
 def connect_to_postgres(env):
     """
     Connect to PostgreSQL database
+
+    A dedicated connection the caller has to close, the helpers borrow pooled
+    connections through `pooled_connection` instead.
     """
     try:
-        # Connection parameters
-        connection = psycopg2.connect(
-            host=env["DBHOSTNAME"],
-            database=env["DBNAME"],
-            user=env["DBUSERNAME"],
-            password=env["DBPASS"],
-            port=env["DBPORT"],
-        )
+        connection = _connect(env)
 
         print("Successfully connected to database")
         return connection
@@ -22,3 +51,347 @@ def connect_to_postgres(env):
     except psycopg2.Error as error:
         print(f"Error connecting to PostgreSQL: {error}")
         return None
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections shared by the whole process.
+
+    Unlike `psycopg2.pool.ThreadedConnectionPool`, a borrower waits up to `timeout`
+    for a free connection instead of failing at once, so concurrent users queue for
+    at most `maxconn` connections rather than exhausting Postgres. Idle connections
+    are reused newest first; those idle longer than `idle_timeout` are closed down to
+    `minconn`, those idle longer than `health_check` are pinged with `SELECT 1`
+    before they are lent. A connection returned closed or broken is discarded, one
+    left in a transaction is rolled back.
+
+    Args:
+        env: connection parameters `DBHOSTNAME`, `DBNAME`, `DBUSERNAME`, `DBPASS`,
+            `DBPORT` (default `os.environ`)
+        minconn: idle connections kept open (env `DB_POOL_MIN`)
+        maxconn: max. open connections (env `DB_POOL_MAX`)
+        timeout: max. wait for a connection in seconds (env `DB_POOL_TIMEOUT`)
+        idle_timeout: idle seconds before a connection is closed (env `DB_POOL_IDLE_TIMEOUT`)
+        health_check: idle seconds before a connection is checked (env `DB_POOL_HEALTH_CHECK`)
+        connect: function env -> new connection
+    """
+
+    def __init__(
+        self,
+        env=None,
+        minconn: Optional[int] = None,
+        maxconn: Optional[int] = None,
+        timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        health_check: Optional[float] = None,
+        connect: Callable = _connect,
+    ):
+        self.env = os.environ if env is None else env
+        self.maxconn = max(1, DB_POOL_MAX if maxconn is None else maxconn)
+        self.minconn = min(DB_POOL_MIN if minconn is None else minconn, self.maxconn)
+        self.timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+        self.idle_timeout = (
+            DB_POOL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        )
+        self.health_check = (
+            DB_POOL_HEALTH_CHECK if health_check is None else health_check
+        )
+        self.connect = connect
+        # (spojení, čas vrácení), poslední vrácené vpravo
+        self._idle: deque = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.waiting = 0
+        self.acquired = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.health_check_failures = 0
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self.discarded += 1
+
+    def _expire_locked(self) -> list:
+        # nejstarší nečinná spojení jsou vlevo
+        now = time.monotonic()
+        expired = []
+        while (
+            len(self._idle) > self.minconn
+            and now - self._idle[0][1] > self.idle_timeout
+        ):
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def _healthy(self, conn, idle: float) -> bool:
+        if conn.closed:
+            return False
+        if idle < self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as error:
+            print(f"Pooled connection failed health check: {error}")
+            self.health_check_failures += 1
+            return False
+
+    def getconn(self, timeout: Optional[float] = None):
+        """
+        Borrows a connection, opens a new one below `maxconn`, otherwise waits.
+
+        Raises:
+            PoolError: no connection was free within `timeout` or the pool is closed
+            psycopg2.Error: a new connection could not be opened
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            conn = None
+            with self._cond:
+                while (
+                    not self._idle and self._size >= self.maxconn and not self._closed
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolError(
+                            f"no database connection free within {timeout:g} s "
+                            f"({self.maxconn} in use)"
+                        )
+                    self.waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self.waiting -= 1
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    conn, since = self._idle.pop()
+                else:
+                    # místo ve poolu se rezervuje, spojení se otevře mimo zámek
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self.connect(self.env)
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                self.created += 1
+            elif not self._healthy(conn, time.monotonic() - since):
+                self._discard(conn)
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                continue
+
+            waited = time.monotonic() - start
+            self.acquired += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            return conn
+
+    def putconn(self, conn, close: bool = False):
+        """Returns a borrowed connection, `close` discards it."""
+        if not close and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    # nedokončená transakce se nesmí přenést na dalšího
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+        with self._cond:
+            if close or conn.closed or self._closed:
+                self._size -= 1
+                expired = [conn]
+            else:
+                self._idle.append((conn, time.monotonic()))
+                expired = self._expire_locked()
+            self._cond.notify(max(1, len(expired)))
+        for old in expired:
+            self._discard(old)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """`with pool.connection() as conn:` borrows and returns a connection."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Closes idle connections, borrowed ones are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle = len(self._idle)
+            size = self._size
+        return {
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "max": self.maxconn,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "wait_seconds": self.wait_seconds,
+            "avg_wait_seconds": (
+                self.wait_seconds / self.acquired if self.acquired else 0.0
+            ),
+            "max_wait_seconds": self.max_wait_seconds,
+            "timeouts": self.timeouts,
+            "created": self.created,
+            "discarded": self.discarded,
+            "health_check_failures": self.health_check_failures,
+        }
+
+
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Process-wide pool, created on first use (after `load_dotenv`)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL._closed:
+            _POOL = ConnectionPool()
+        return _POOL
+
+
+def close_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.closeall()
+        _POOL = None
+
+
+@contextmanager
+def pooled_connection(conn=None):
+    """
+    `with pooled_connection(conn) as conn:` for the Database helpers.
+
+    A given `conn` is used as is and stays open. Otherwise a connection is borrowed
+    from `get_pool()` and returned afterwards. When none can be had, the error is
+    printed and None is yielded, as `connect_to_postgres` returns None.
+    """
+    if conn:
+        yield conn
+        return
+    pool = get_pool()
+    try:
+        conn = pool.getconn()
+    except KeyError as error:
+        print(f"Error connecting to PostgreSQL: missing environment variable {error}")
+        yield None
+        return
+    except psycopg2.Error as error:
+        # i PoolError, žádné spojení se neuvolnilo včas
+        print(f"Error connecting to PostgreSQL: {error}")
+        yield None
+        return
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+
+class ConnectionPoolCollector:
+    """prometheus_client collector exporting `ConnectionPool.stats`."""
+
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        self.pool = pool
+
+    def collect(self):
+        from prometheus_client.core import (
+            CounterMetricFamily,
+            GaugeMetricFamily,
+            SummaryMetricFamily,
+        )
+
+        stats = (self.pool or get_pool()).stats()
+        connections = GaugeMetricFamily(
+            "db_pool_connections",
+            "Open database connections by state",
+            labels=["state"],
+        )
+        connections.add_metric(["idle"], stats["idle"])
+        connections.add_metric(["in_use"], stats["in_use"])
+        yield connections
+        yield GaugeMetricFamily(
+            "db_pool_max_connections",
+            "Maximum open database connections",
+            value=stats["max"],
+        )
+        yield GaugeMetricFamily(
+            "db_pool_waiting",
+            "Threads waiting for a database connection",
+            value=stats["waiting"],
+        )
+        yield SummaryMetricFamily(
+            "db_pool_wait_seconds",
+            "Time spent waiting for a database connection",
+            count_value=stats["acquired"],
+            sum_value=stats["wait_seconds"],
+        )
+        yield GaugeMetricFamily(
+            "db_pool_max_wait_seconds",
+            "Longest wait for a database connection",
+            value=stats["max_wait_seconds"],
+        )
+        yield CounterMetricFamily(
+            "db_pool_timeouts",
+            "Borrows which found no free connection in time",
+            value=stats["timeouts"],
+        )
+        yield CounterMetricFamily(
+            "db_pool_created_connections",
+            "Database connections opened by the pool",
+            value=stats["created"],
+        )
+        yield CounterMetricFamily(
+            "db_pool_discarded_connections",
+            "Database connections closed by the pool",
+            value=stats["discarded"],
+        )
+        yield CounterMetricFamily(
+            "db_pool_health_check_failures",
+            "Idle connections which failed the health check",
+            value=stats["health_check_failures"],
+        )
+
+
+def register_prometheus_collector(pool: Optional[ConnectionPool] = None) -> bool:
+    """Registers `ConnectionPoolCollector` in the default prometheus registry, False without prometheus_client."""
+    try:
+        from prometheus_client import REGISTRY
+    except ImportError:
+        return False
+    REGISTRY.register(ConnectionPoolCollector(pool))
+    return True
@@ -1,6 +1,7 @@
 from typing import List, Tuple, Dict, Annotated
-from collections import deque
-from graphql import parse, build_ast_schema
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field as dataclass_field
+from graphql import parse, GraphQLSchema
 from graphql.language.ast import (
     TypeNode,
     DocumentNode,
@@ -14,6 +15,7 @@ from graphql.language.ast import (
 import json
 import os
 import sys
+import threading
 from pathlib import Path
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -28,6 +30,8 @@ try:
         select_ast_by_path,
         get_read_scalar_values,
         build_large_fragment,
+        as_schema_index,
+        unwrap_type,
     )
 except ImportError:
     from SemanticKernel.Skills.utils_sdl_2 import (
@@ -36,20 +40,249 @@ except ImportError:
         select_ast_by_path,
         get_read_scalar_values,
         build_large_fragment,
+        as_schema_index,
+        unwrap_type,
     )
+from src.Utils.field_health import FIELD_HEALTH
+
+
+class RelationGraph:
+    """
+    Type relationship graph of one schema version with memoised shortest paths.
+
+    Edges are `(field name, target type)` for every field of every type with fields.
+    BFS parent pointers are computed once per source type (and set of disabled fields)
+    and shared by all builders, a lookup then only walks the parent pointers.
+    Use `RelationGraph.for_index(index)` to get the shared instance.
+    """
+
+    def __init__(self, index):
+        self.adjacency: Dict[str, List[Tuple[str, str]]] = {}
+        for defn in index.definitions:
+            if hasattr(defn, "fields"):
+                from_type = defn.name.value
+                for field in defn.fields:
+                    to_type = unwrap_type(field.type).name.value
+                    self.adjacency.setdefault(from_type, []).append(
+                        (field.name.value, to_type)
+                    )
+        # (disabled fields, source) -> (parents, back edge to source)
+        self._trees: Dict[
+            Tuple[frozenset, str],
+            Tuple[Dict[str, Tuple[str, str]], Tuple[str, str] | None],
+        ] = {}
+
+    @classmethod
+    def for_index(cls, index) -> "RelationGraph":
+        return index.derived(cls, lambda: cls(index))
+
+    def edges(
+        self, type_name: str, disabled_fields: frozenset = frozenset()
+    ) -> List[Tuple[str, str]]:
+        return [
+            (field, to_type)
+            for field, to_type in self.adjacency.get(type_name, [])
+            if field not in disabled_fields
+        ]
+
+    def _tree(self, source: str, disabled_fields: frozenset):
+        key = (disabled_fields, source)
+        tree = self._trees.get(key)
+        if tree is not None:
+            return tree
+
+        # parents[type] = (předchůdce, field), back = první hrana vedoucí zpět do source
+        parents: Dict[str, Tuple[str, str]] = {}
+        back = None
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for field, nxt in self.adjacency.get(current, []):
+                if field in disabled_fields:
+                    continue
+                if nxt == source:
+                    if back is None:
+                        back = (current, field)
+                    continue
+                if nxt not in parents:
+                    parents[nxt] = (current, field)
+                    queue.append(nxt)
+        tree = (parents, back)
+        self._trees[key] = tree
+        return tree
+
+    def find_path(
+        self, source: str, target: str, disabled_fields: frozenset = frozenset()
+    ) -> List[Tuple[str, str]]:
+        """
+        Shortest list of `(field, type)` hops leading from `source` to `target`,
+        empty list if `target` is not reachable. For `source == target` the shortest cycle is returned.
+        """
+        parents, back = self._tree(source, disabled_fields)
+        if target == source:
+            if back is None:
+                return []
+            current, field = back
+        elif target in parents:
+            current, field = parents[target]
+        else:
+            return []
+
+        path = [(field, target)]
+        while current != source:
+            prev, field = parents[current]
+            path.append((field, current))
+            current = prev
+        path.reverse()
+        return path
+
+
+@dataclass
+class JoinNode:
+    """One selected type in a join plan, `children` are keyed by the selecting field."""
+
+    type_name: str
+    depth: int = 0
+    children: Dict[str, "JoinNode"] = dataclass_field(default_factory=dict)
+
+    def walk(self):
+        yield self
+        for child in self.children.values():
+            yield from child.walk()
+
+
+@dataclass
+class JoinPlan:
+    """
+    Merged selection tree connecting all requested types, rooted at the first one.
+
+    Attributes:
+        root (JoinNode): root of the tree, selected by the page / read operation
+        unreachable (list[str]): requested types with no path from the tree
+    """
+
+    root: JoinNode
+    unreachable: List[str] = dataclass_field(default_factory=list)
+
+    @property
+    def types(self) -> List[str]:
+        """Types present in the tree (each needs its medium fragment)."""
+        return list(dict.fromkeys(node.type_name for node in self.root.walk()))
+
+    @property
+    def size(self) -> int:
+        """Number of relation fields selected by the plan."""
+        return sum(1 for _ in self.root.walk()) - 1
+
+    @property
+    def depth(self) -> int:
+        """Deepest level of nested relation fields."""
+        return max(node.depth for node in self.root.walk())
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size,
+            "depth": self.depth,
+            "types": len(self.types),
+            "unreachable": list(self.unreachable),
+        }
+
+    def selection(self) -> str:
+        """Nested selection of the relation fields below the root."""
+
+        def build(node: JoinNode) -> str:
+            parts = [
+                f"{field} {{ ...{child.type_name}MediumFragment"
+                + (f" {build(child)}" if child.children else "")
+                + " }"
+                for field, child in node.children.items()
+            ]
+            return " ".join(parts)
+
+        return build(self.root)
+
+
+def _existing(node: JoinNode, path: List[Tuple[str, str]]) -> JoinNode | None:
+    for field, _ in path:
+        node = node.children.get(field)
+        if node is None:
+            return None
+    return node
+
+
+def plan_joins(
+    graph: "RelationGraph", types: List[str], disabled_fields: frozenset = frozenset()
+) -> JoinPlan:
+    """
+    Builds a small connecting tree (Steiner tree heuristic) for `types`.
+
+    Types are attached in the given order, each one by the shortest path from any node
+    already in the tree. Ties prefer the node of the previously requested type, then the
+    shallower node, so `[Parent, Child, ...]` chains keep their nesting. Shared prefixes
+    are merged instead of being selected once per target. A type requested again is a
+    self-join, e.g. `[Group, Group]` selects the groups related to the root group.
+    """
+    root = JoinNode(types[0])
+    plan = JoinPlan(root=root)
+    nodes = [root]
+    placed: Dict[str, JoinNode] = {types[0]: root}
+
+    for position, target in enumerate(types[1:]):
+        repeated = target in placed
+        covered = next((node for node in nodes if node.type_name == target), None)
+        if covered is not None and not repeated:
+            # typ už je ve stromu jako mezikrok cesty k jinému typu
+            placed[target] = covered
+            continue
+        previous = placed.get(types[position])
+
+        best = None
+        for order, node in enumerate(nodes):
+            path = graph.find_path(node.type_name, target, disabled_fields)
+            if not path:
+                continue
+            if repeated and _existing(node, path) is not None:
+                # opakovaný typ musí dostat nový uzel, ne ten už vybraný
+                continue
+            rank = (len(path), node is not previous, node.depth, order)
+            if best is None or rank < best[0]:
+                best = (rank, node, path)
+        if best is None:
+            plan.unreachable.append(target)
+            continue
+
+        _, node, path = best
+        for field, type_name in path:
+            child = node.children.get(field)
+            if child is None:
+                child = JoinNode(type_name, depth=node.depth + 1)
+                node.children[field] = child
+                nodes.append(child)
+            node = child
+        placed[target] = node
+
+    return plan
 
 
 # 1️⃣ Define the GraphQLQueryBuilder class
 class GraphQLQueryBuilder:
-    def __init__(self, disabled_fields: list[str] = []):
+    def __init__(self, disabled_fields: list[str] = [], excluded_fields=None):
 
-        from sdl.sdl_fetch import fetch_sdl
+        from sdl.sdl_fetch import get_schema_snapshot
 
-        sdl = fetch_sdl()
+        snapshot = get_schema_snapshot()
 
-        self.ast = parse(sdl)
-        self.schema = build_ast_schema(self.ast)
-        self.adjacency = self._build_adjacency(self.ast, disabled_fields)
+        self.ast = snapshot.ast
+        self.version = snapshot.version
+        self.index = as_schema_index(self.ast)
+        self.schema = snapshot.schema
+        self.graph = RelationGraph.for_index(self.index)
+        self.disabled_fields = frozenset(disabled_fields)
+        # (typ, pole) a jména polí vynechaná z fragmentů, None = aktuální stav FIELD_HEALTH
+        self.excluded_fields = (
+            FIELD_HEALTH.excluded() if excluded_fields is None else excluded_fields
+        )
+        self.last_plan: JoinPlan | None = None
 
     def _unwrap_type(self, t):
         # Unwrap AST type nodes (NonNull, List) to get NamedTypeNode
@@ -59,45 +292,27 @@ class GraphQLQueryBuilder:
             return t.name.value
         raise TypeError(f"Unexpected type node: {t}")
 
-    def _build_adjacency(
-        self, ast, disabled_fields: list[str]
-    ) -> Dict[str, List[Tuple[str, str]]]:
-        edges: Dict[str, List[Tuple[str, str]]] = {}
-        for defn in ast.definitions:
-            if hasattr(defn, "fields"):
-                from_type = defn.name.value
-                for field in defn.fields:
-                    if field.name.value in disabled_fields:
-                        continue
-                    to_type = self._unwrap_type(field.type)
-                    edges.setdefault(from_type, []).append((field.name.value, to_type))
-        return edges
-
     def _find_path(self, source: str, target: str) -> List[Tuple[str, str]]:
-        queue = deque([(source, [])])
-        visited = {source}
-        while queue:
-            current, path = queue.popleft()
-            for field, nxt in self.adjacency.get(current, []):
-                if nxt == target:
-                    return path + [(field, nxt)]
-                if nxt not in visited:
-                    visited.add(nxt)
-                    queue.append((nxt, path + [(field, nxt)]))
-        return []
+        return self.graph.find_path(source, target, self.disabled_fields)
+
+    def plan(self, types: List[str]) -> JoinPlan:
+        self.last_plan = plan_joins(self.graph, types, self.disabled_fields)
+        return self.last_plan
 
     def build_query_vector(self, types: List[str]) -> str:
         # print(f"building query vector for types {types}")
         root = types[0]
 
         # Build the "large" fragment for root
-        rootfragment = build_large_fragment(self.ast, root)
+        rootfragment = build_large_fragment(
+            self.index, root, excluded=self.excluded_fields
+        )
 
         # Determine the page operation
-        page_operations = get_read_vector_values(self.ast)
+        page_operations = get_read_vector_values(self.index)
         page_operation = page_operations[root][0]
 
-        field = select_ast_by_path(self.ast, ["Query", page_operation])
+        field = select_ast_by_path(self.index, ["Query", page_operation])
 
         # Prepare argument strings
         args_str = ", ".join(
@@ -116,45 +331,15 @@ class GraphQLQueryBuilder:
         )
         args3_str += "\n\n# to get more results, adjust parameters $skip and / or $limit and call the query until the result is empty vector\n"
 
-        # Precompute paths and build nested selections
-        full_paths = {t: self._find_path(types[i], t) for i, t in enumerate(types[1:])}
-
-        # def build_spread(current: str, remaining_path: List[Tuple[str, str]]) -> str:
-        #     # If no more path, insert fragment spread
-        #     if not remaining_path:
-        #         return f"...{current}MediumFragment"
-        #     field, next_type = remaining_path[0]
-        #     sub = build_spread(next_type, remaining_path[1:])
-        #     return f"{field} {{ {sub} }}"
-
-        # selections = [build_spread(root, path) for path in full_paths.values()]
-
-        def build_spread(path: list[tuple[str, str]]) -> str:
-            # Base case: if path is empty, return nothing
-            if not path:
-                return ""
-            field, next_type = path[0]
-            # If this is the last element in the path, return the fragment
-            if len(path) == 1:
-                return f"{field} {{ ...{next_type}MediumFragment }}"
-            # Otherwise, nest recursively
-            nested = build_spread(path[1:])
-            return f"{field} {{ ...{next_type}MediumFragment {nested} }}"
-
-        # Build selection sets for each target and combine
-        # full_paths = {'EventGQLModel': [('events', 'EventGQLModel')], 'GroupGQLModel': [('groups', 'GroupGQLModel')]}
-        selections = [build_spread(path) for path in full_paths.values()]
-
-        selection_str = " ".join(list(dict.fromkeys(selections)))  # remove duplicates
+        # One merged selection tree for all requested types
+        plan = self.plan(types)
+        selection_str = plan.selection()
 
-        # Generate fragment definitions
-        # Extract models from full_paths
-        models_from_paths = {model for path in full_paths.values() for _, model in path}
-
-        # Combine with graphgql_types and remove duplicates
-        all_models = models_from_paths.union(types)
-
-        medium_fragments = [build_medium_fragment(self.ast, t) for t in all_models]
+        # Generate fragment definitions for every type in the plan
+        medium_fragments = [
+            build_medium_fragment(self.index, t, excluded=self.excluded_fields)
+            for t in plan.types
+        ]
         large_fragments = [rootfragment]  # root large fragment
         fragments = medium_fragments + large_fragments
 
@@ -171,12 +356,14 @@ class GraphQLQueryBuilder:
     def build_query_scalar(self, types: List[str]) -> str:
         print(f"building query scalar for types {types}")
         root = types[0]
-        rootfragment = build_large_fragment(self.ast, root)
-        page_operations = get_read_scalar_values(self.ast)
+        rootfragment = build_large_fragment(
+            self.index, root, excluded=self.excluded_fields
+        )
+        page_operations = get_read_scalar_values(self.index)
         page_operation = page_operations[root][0]
         # print(f"page_operation {page_operation}")
 
-        field = select_ast_by_path(self.ast, ["Query", page_operation])
+        field = select_ast_by_path(self.index, ["Query", page_operation])
         args_str = ", ".join(
             f"${arg.name.value}: {self._unwrap_type(arg.type)}"
             + ("!" if isinstance(arg.type, NonNullTypeNode) else "")
@@ -187,50 +374,18 @@ class GraphQLQueryBuilder:
         args2_str = ", ".join(args2)
         # print(f"args: {args}")
 
-        # Precompute full paths from root to each target
-        full_paths = {t: self._find_path(types[i], t) for i, t in enumerate(types[1:])}
+        # One merged selection tree for all requested types
+        plan = self.plan(types)
+        selection_str = plan.selection()
 
-        # def build_spread(current: str, remaining_path: List[Tuple[str, str]]) -> str:
-        #     # If no more path, insert fragment spread
-        #     if not remaining_path:
-        #         return f"...{current}MediumFragment"
-        #     field, next_type = remaining_path[0]
-        #     sub = build_spread(next_type, remaining_path[1:])
-        #     return f"{field} {{ {sub} }}"
-
-        # selections = [build_spread(root, path) for path in full_paths.values()]
-
-        def build_spread(path: list[tuple[str, str]]) -> str:
-            # Base case: if path is empty, return nothing
-            if not path:
-                return ""
-            field, next_type = path[0]
-            # If this is the last element in the path, return the fragment
-            if len(path) == 1:
-                return f"{field} {{ ...{next_type}MediumFragment }}"
-            # Otherwise, nest recursively
-            nested = build_spread(path[1:])
-            return f"{field} {{ ...{next_type}MediumFragment {nested} }}"
-
-        # Build selection sets for each target and combine
-        # full_paths = {'EventGQLModel': [('events', 'EventGQLModel')], 'GroupGQLModel': [('groups', 'GroupGQLModel')]}
-        selections = [build_spread(path) for path in full_paths.values()]
-
-        selection_str = " ".join(list(dict.fromkeys(selections)))  # remove duplicates
-
-        # Generate fragment definitions
-        # Extract models from full_paths
-        models_from_paths = {model for path in full_paths.values() for _, model in path}
-
-        # Combine with graphgql_types and remove duplicates
-        all_models = models_from_paths.union(types)
-
-        medium_fragments = [build_medium_fragment(self.ast, t) for t in all_models]
+        # Generate fragment definitions for every type in the plan
+        medium_fragments = [
+            build_medium_fragment(self.index, t, excluded=self.excluded_fields)
+            for t in plan.types
+        ]
         large_fragments = [rootfragment]  # root large fragment
         fragments = medium_fragments + large_fragments
 
-        unique_selections = list(dict.fromkeys(selections))
-        selection_str = " ".join(unique_selections)
         query = f"query {page_operation}({args_str})\n{{\n{page_operation}({args2_str})\n{{...{root}MediumFragment\n...{root}LargeFragment\n{selection_str}\n}}\n}}"
         # query = f"query {page_operation}({args_str})\n{{\n{page_operation}({args2_str})\n{{...{root}MediumFragment\n{selection_str}\n}}\n}}"
         # Append fragments after the main query
@@ -239,350 +394,499 @@ class GraphQLQueryBuilder:
         return f"{query}\n\n{fragments_str}"
 
     def explain_graphql_query(self, query: str):
-        from graphql import parse, build_ast_schema, print_ast, GraphQLSchema
-        from graphql.language.ast import (
-            DocumentNode,
-            FieldNode,
-            SelectionSetNode,
-            OperationDefinitionNode,
-            FragmentDefinitionNode,
-            FragmentSpreadNode,
-            InlineFragmentNode,
-            ArgumentNode,
-            VariableNode,
-            ObjectValueNode,
-            ObjectFieldNode,
-            ListValueNode,
-        )
-        from graphql.type import (
-            GraphQLObjectType,
-            GraphQLInterfaceType,
-            GraphQLUnionType,
-            GraphQLNonNull,
-            GraphQLList,
-            GraphQLInputObjectType,
-            GraphQLEnumType,
-            GraphQLScalarType,
-            GraphQLInputType,
-            GraphQLNamedType,
-        )
+        """
+        Returns `query` prefixed with the `@param`/`@property` comment header.
 
-        schema: GraphQLSchema = build_ast_schema(self.ast, assume_valid=True)
+        The header depends only on the query and the schema version, so it is
+        cached in `EXPLAIN_HEADER_CACHE` under the whitespace-normalized query text.
+        """
+        from graphql import print_ast
+
+        query_ast = parse(query)
+        key = (self.version, " ".join(query.split()))
+        header = EXPLAIN_HEADER_CACHE.get(key)
+        if header is None:
+            field_meta = self.index.derived(
+                "field_meta", lambda: build_field_meta(self.ast)
+            )
+            header = explain_header(self.schema, field_meta, query_ast)
+            EXPLAIN_HEADER_CACHE.put(key, header)
+        return "\n".join([header, "", print_ast(query_ast)])
 
-        # ---- popisy polí pro Object i Interface (výstup)
-        field_meta: dict[tuple[str, str], str | None] = {}
-        from graphql.language.ast import (
-            ObjectTypeDefinitionNode,
-            InterfaceTypeDefinitionNode,
-        )
 
-        for defn in self.ast.definitions:
-            if isinstance(
-                defn, (ObjectTypeDefinitionNode, InterfaceTypeDefinitionNode)
-            ):
-                parent = defn.name.value
-                for fld in defn.fields or []:
-                    desc = fld.description.value if fld.description else None
-                    field_meta[(parent, fld.name.value)] = desc
-
-        query_ast: DocumentNode = parse(query)
-
-        # ---- definice fragmentů (vstup i výstup)
-        fragments: dict[str, FragmentDefinitionNode] = {
-            d.name.value: d
-            for d in query_ast.definitions
-            if isinstance(d, FragmentDefinitionNode)
-        }
+def build_field_meta(sdl_doc) -> dict[tuple[str, str], str | None]:
+    """Popisy polí pro Object i Interface (výstup), klíč je (typ, pole)."""
+    from graphql.language.ast import (
+        ObjectTypeDefinitionNode,
+        InterfaceTypeDefinitionNode,
+    )
 
-        # ---------- UTILS ----------
-
-        def unwrap(gtype: GraphQLInputType | GraphQLNamedType):
-            while isinstance(gtype, (GraphQLNonNull, GraphQLList)):
-                gtype = gtype.of_type
-            return gtype
-
-        def type_to_str(gtype) -> str:
-            if isinstance(gtype, GraphQLNonNull):
-                return f"{type_to_str(gtype.of_type)}!"
-            if isinstance(gtype, GraphQLList):
-                return f"[{type_to_str(gtype.of_type)}]"
-            return getattr(gtype, "name", str(gtype))
-
-        def type_node_to_str(type_node) -> str:
-            k = getattr(type_node, "kind", None) or type_node.kind
-            if k in ("NamedType", "named_type"):
-                return type_node.name.value
-            if k in ("NonNullType", "non_null_type"):
-                return f"{type_node_to_str(type_node.type)}!"
-            if k in ("ListType", "list_type"):
-                return f"[{type_node_to_str(type_node.type)}]"
-            raise ValueError(f"Unknown kind {k}")
-
-        # ---------- 1) @param: popisy proměnných + (nově) mapování proměnná → skutečný input typ ----------
-
-        # Proměnná může být použita kdekoli (i uvnitř objektů). Najdeme všechny použití a určíme typ.
-        var_to_input_type: dict[str, GraphQLInputType] = {}
-
-        def map_variable_usage_in_args(sel: FieldNode, parent_type):
-            """Promapuje VariableNode ve všech argumentech fieldů (vč. vnořených objektů)."""
-            if not isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
-                return
-            fdef = parent_type.fields.get(sel.name.value)
-            if not fdef:
-                return
-            # Pro každý argument v AST porovnej s typem z fdef.args a rekurzivně projdi hodnoty:
-            for arg in sel.arguments or []:
-                arg_name = arg.name.value
-                arg_def = fdef.args.get(arg_name)
-                if not arg_def:
-                    continue
+    field_meta: dict[tuple[str, str], str | None] = {}
+    for defn in sdl_doc.definitions:
+        if isinstance(defn, (ObjectTypeDefinitionNode, InterfaceTypeDefinitionNode)):
+            parent = defn.name.value
+            for fld in defn.fields or []:
+                desc = fld.description.value if fld.description else None
+                field_meta[(parent, fld.name.value)] = desc
+    return field_meta
+
+
+def explain_header(
+    schema: GraphQLSchema, field_meta: dict, query_ast: DocumentNode
+) -> str:
+    """
+    Builds the `@param`/`@input`/`@property` comment header for a parsed query.
+
+    Args:
+      schema: prebuilt GraphQLSchema
+      field_meta: field descriptions from `build_field_meta`
+      query_ast: parsed query document
+    """
+    from graphql.language.ast import (
+        FieldNode,
+        SelectionSetNode,
+        OperationDefinitionNode,
+        FragmentDefinitionNode,
+        FragmentSpreadNode,
+        InlineFragmentNode,
+        ArgumentNode,
+        VariableNode,
+        ObjectValueNode,
+        ObjectFieldNode,
+        ListValueNode,
+    )
+    from graphql.type import (
+        GraphQLObjectType,
+        GraphQLInterfaceType,
+        GraphQLUnionType,
+        GraphQLNonNull,
+        GraphQLList,
+        GraphQLInputObjectType,
+        GraphQLEnumType,
+        GraphQLScalarType,
+        GraphQLInputType,
+        GraphQLNamedType,
+    )
 
-                def walk_value(value_node, expected_type: GraphQLInputType):
-                    if isinstance(value_node, VariableNode):
-                        var_to_input_type[value_node.name.value] = expected_type
-                        return
-                    unwrapped = unwrap(expected_type)
-                    if isinstance(value_node, ObjectValueNode) and isinstance(
-                        unwrapped, GraphQLInputObjectType
-                    ):
-                        # projdi pole objektu
-                        for of in value_node.fields or []:
-                            f: ObjectFieldNode = of
-                            if f.name.value in unwrapped.fields:
-                                walk_value(f.value, unwrapped.fields[f.name.value].type)
-                    elif isinstance(value_node, ListValueNode) and isinstance(
-                        expected_type, GraphQLList
-                    ):
-                        # každý prvek seznamu má typ .of_type
-                        for v in value_node.values or []:
-                            walk_value(v, expected_type.of_type)
-                    # skalár/enum: nic dalšího
-
-                walk_value(arg.value, arg_def.type)
-
-        # Projdi celý selection strom a hledej použití proměnných u argumentů
-        def walk_for_var_types(sel_set: SelectionSetNode, parent_type):
-            if not sel_set:
-                return
-            for sel in sel_set.selections:
-                if isinstance(sel, FieldNode):
-                    map_variable_usage_in_args(sel, parent_type)
-                    # rekurze do dítěte
-                    if isinstance(
-                        parent_type, (GraphQLObjectType, GraphQLInterfaceType)
-                    ):
-                        fdef = parent_type.fields.get(sel.name.value)
-                        if fdef and sel.selection_set:
-                            walk_for_var_types(sel.selection_set, unwrap(fdef.type))
-                elif isinstance(sel, FragmentSpreadNode):
-                    frag = fragments.get(sel.name.value)
-                    if frag:
-                        new_parent = parent_type
-                        if frag.type_condition:
-                            tname = frag.type_condition.name.value
-                            new_parent = schema.get_type(tname) or parent_type
-                        walk_for_var_types(frag.selection_set, new_parent)
-                elif isinstance(sel, InlineFragmentNode):
+    # ---- definice fragmentů (vstup i výstup)
+    fragments: dict[str, FragmentDefinitionNode] = {
+        d.name.value: d
+        for d in query_ast.definitions
+        if isinstance(d, FragmentDefinitionNode)
+    }
+
+    # ---------- UTILS ----------
+
+    def unwrap(gtype: GraphQLInputType | GraphQLNamedType):
+        while isinstance(gtype, (GraphQLNonNull, GraphQLList)):
+            gtype = gtype.of_type
+        return gtype
+
+    def type_to_str(gtype) -> str:
+        if isinstance(gtype, GraphQLNonNull):
+            return f"{type_to_str(gtype.of_type)}!"
+        if isinstance(gtype, GraphQLList):
+            return f"[{type_to_str(gtype.of_type)}]"
+        return getattr(gtype, "name", str(gtype))
+
+    def type_node_to_str(type_node) -> str:
+        k = getattr(type_node, "kind", None) or type_node.kind
+        if k in ("NamedType", "named_type"):
+            return type_node.name.value
+        if k in ("NonNullType", "non_null_type"):
+            return f"{type_node_to_str(type_node.type)}!"
+        if k in ("ListType", "list_type"):
+            return f"[{type_node_to_str(type_node.type)}]"
+        raise ValueError(f"Unknown kind {k}")
+
+    # ---------- 1) @param: popisy proměnných + (nově) mapování proměnná → skutečný input typ ----------
+
+    # Proměnná může být použita kdekoli (i uvnitř objektů). Najdeme všechny použití a určíme typ.
+    var_to_input_type: dict[str, GraphQLInputType] = {}
+
+    def map_variable_usage_in_args(sel: FieldNode, parent_type):
+        """Promapuje VariableNode ve všech argumentech fieldů (vč. vnořených objektů)."""
+        if not isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+            return
+        fdef = parent_type.fields.get(sel.name.value)
+        if not fdef:
+            return
+        # Pro každý argument v AST porovnej s typem z fdef.args a rekurzivně projdi hodnoty:
+        for arg in sel.arguments or []:
+            arg_name = arg.name.value
+            arg_def = fdef.args.get(arg_name)
+            if not arg_def:
+                continue
+
+            def walk_value(value_node, expected_type: GraphQLInputType):
+                if isinstance(value_node, VariableNode):
+                    var_to_input_type[value_node.name.value] = expected_type
+                    return
+                unwrapped = unwrap(expected_type)
+                if isinstance(value_node, ObjectValueNode) and isinstance(
+                    unwrapped, GraphQLInputObjectType
+                ):
+                    # projdi pole objektu
+                    for of in value_node.fields or []:
+                        f: ObjectFieldNode = of
+                        if f.name.value in unwrapped.fields:
+                            walk_value(f.value, unwrapped.fields[f.name.value].type)
+                elif isinstance(value_node, ListValueNode) and isinstance(
+                    expected_type, GraphQLList
+                ):
+                    # každý prvek seznamu má typ .of_type
+                    for v in value_node.values or []:
+                        walk_value(v, expected_type.of_type)
+                # skalár/enum: nic dalšího
+
+            walk_value(arg.value, arg_def.type)
+
+    # Projdi celý selection strom a hledej použití proměnných u argumentů
+    def walk_for_var_types(sel_set: SelectionSetNode, parent_type):
+        if not sel_set:
+            return
+        for sel in sel_set.selections:
+            if isinstance(sel, FieldNode):
+                map_variable_usage_in_args(sel, parent_type)
+                # rekurze do dítěte
+                if isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+                    fdef = parent_type.fields.get(sel.name.value)
+                    if fdef and sel.selection_set:
+                        walk_for_var_types(sel.selection_set, unwrap(fdef.type))
+            elif isinstance(sel, FragmentSpreadNode):
+                frag = fragments.get(sel.name.value)
+                if frag:
                     new_parent = parent_type
-                    if sel.type_condition:
-                        tname = sel.type_condition.name.value
+                    if frag.type_condition:
+                        tname = frag.type_condition.name.value
                         new_parent = schema.get_type(tname) or parent_type
-                    walk_for_var_types(sel.selection_set, new_parent)
-
-        for defn in query_ast.definitions:
-            if isinstance(defn, OperationDefinitionNode):
-                op = getattr(defn.operation, "value", defn.operation)
-                root = {
-                    "query": schema.query_type,
-                    "mutation": schema.mutation_type,
-                    "subscription": schema.subscription_type,
-                }.get(op)
-                if root:
-                    walk_for_var_types(defn.selection_set, root)
-
-        # @param řádky (původní + přesnější typy)
-        var_lines: list[str] = []
-        for defn in query_ast.definitions:
-            if isinstance(defn, OperationDefinitionNode) and defn.variable_definitions:
-                for vdef in defn.variable_definitions:
-                    name = vdef.variable.name.value
-                    # preferuj typ podle skutečného použití:
-                    gtype = var_to_input_type.get(name)
-                    type_str = (
-                        type_to_str(gtype) if gtype else type_node_to_str(vdef.type)
-                    )
-
-                    base_named = unwrap(gtype) if gtype is not None else None
-                    desc = str(
-                        getattr(base_named, "description", "missing description")
-                    )
-                    desc = desc.replace("\n", "\n#\t")
-                    # desc = "\n#\t ".join(desc.split()) if desc else "missing description"
-
-                    # desc = field_meta.get((parent_type.name, fname))
-                    # zkus popis z odpovídajícího InputObjectField, pokud máme typ i shodu jména pole
-                    # (nelze spolehlivě – proměnná nemusí odpovídat názvu input fieldu)
-                    var_lines.append(f"# @param {{{type_str}}} {name} - {desc}")
-
-        # ---------- 2) @input: struktura proměnných (včetně vnoření a rekurze) ----------
-
-        input_lines: list[str] = []
-
-        def append_input_line(
-            path: str, gtype: GraphQLInputType, descr: str | None = None
-        ):
-            d = (" - " + " ".join(descr.split())) if descr else ""
-            input_lines.append(f"# @input {{{type_to_str(gtype)}}} {path}{d}")
-
-        def describe_input_type(
-            path: str,
-            gtype: GraphQLInputType,
-            visiting: set[str] | None = None,
-            depth: int = 0,
-            max_depth: int = 1,
-        ):
-            """Vypíše strukturu input typu; chrání se proti rekurzi."""
-            if depth > max_depth:
-                input_lines.append(f"# @input {{...}} {path} - (truncated)")
-                return
-            visiting = visiting or set()
-
-            if isinstance(gtype, GraphQLNonNull) or isinstance(gtype, GraphQLList):
-                # vypiš wrapper typ a pokračuj do vnitřku
-                append_input_line(path, gtype)
-                inner = gtype.of_type
-                # pro seznam můžeme označit subpath jako path[] (jen esteticky)
-                child_path = path + "[]" if isinstance(gtype, GraphQLList) else path
-                describe_input_type(child_path, inner, visiting, depth + 1, max_depth)
-                return
-
-            base = unwrap(gtype)
-
-            # Enum: vypiš s výčtem hodnot
-            if isinstance(base, GraphQLEnumType):
-                vals = "|".join(v.name for v in base.values.values())
-                append_input_line(path, gtype, f"enum: {vals}")
-                return
+                    walk_for_var_types(frag.selection_set, new_parent)
+            elif isinstance(sel, InlineFragmentNode):
+                new_parent = parent_type
+                if sel.type_condition:
+                    tname = sel.type_condition.name.value
+                    new_parent = schema.get_type(tname) or parent_type
+                walk_for_var_types(sel.selection_set, new_parent)
+
+    for defn in query_ast.definitions:
+        if isinstance(defn, OperationDefinitionNode):
+            op = getattr(defn.operation, "value", defn.operation)
+            root = {
+                "query": schema.query_type,
+                "mutation": schema.mutation_type,
+                "subscription": schema.subscription_type,
+            }.get(op)
+            if root:
+                walk_for_var_types(defn.selection_set, root)
+
+    # @param řádky (původní + přesnější typy)
+    var_lines: list[str] = []
+    for defn in query_ast.definitions:
+        if isinstance(defn, OperationDefinitionNode) and defn.variable_definitions:
+            for vdef in defn.variable_definitions:
+                name = vdef.variable.name.value
+                # preferuj typ podle skutečného použití:
+                gtype = var_to_input_type.get(name)
+                type_str = type_to_str(gtype) if gtype else type_node_to_str(vdef.type)
+
+                base_named = unwrap(gtype) if gtype is not None else None
+                desc = str(getattr(base_named, "description", "missing description"))
+                desc = desc.replace("\n", "\n#\t")
+                # desc = "\n#\t ".join(desc.split()) if desc else "missing description"
+
+                # desc = field_meta.get((parent_type.name, fname))
+                # zkus popis z odpovídajícího InputObjectField, pokud máme typ i shodu jména pole
+                # (nelze spolehlivě – proměnná nemusí odpovídat názvu input fieldu)
+                var_lines.append(f"# @param {{{type_str}}} {name} - {desc}")
+
+    # ---------- 2) @input: struktura proměnných (včetně vnoření a rekurze) ----------
+
+    input_lines: list[str] = []
+
+    def append_input_line(path: str, gtype: GraphQLInputType, descr: str | None = None):
+        d = (" - " + " ".join(descr.split())) if descr else ""
+        input_lines.append(f"# @input {{{type_to_str(gtype)}}} {path}{d}")
+
+    def describe_input_type(
+        path: str,
+        gtype: GraphQLInputType,
+        visiting: set[str] | None = None,
+        depth: int = 0,
+        max_depth: int = 1,
+    ):
+        """Vypíše strukturu input typu; chrání se proti rekurzi."""
+        if depth > max_depth:
+            input_lines.append(f"# @input {{...}} {path} - (truncated)")
+            return
+        visiting = visiting or set()
+
+        if isinstance(gtype, GraphQLNonNull) or isinstance(gtype, GraphQLList):
+            # vypiš wrapper typ a pokračuj do vnitřku
+            append_input_line(path, gtype)
+            inner = gtype.of_type
+            # pro seznam můžeme označit subpath jako path[] (jen esteticky)
+            child_path = path + "[]" if isinstance(gtype, GraphQLList) else path
+            describe_input_type(child_path, inner, visiting, depth + 1, max_depth)
+            return
+
+        base = unwrap(gtype)
+
+        # Enum: vypiš s výčtem hodnot
+        if isinstance(base, GraphQLEnumType):
+            vals = "|".join(v.name for v in base.values.values())
+            append_input_line(path, gtype, f"enum: {vals}")
+            return
+
+        # Scalar: jen řádka
+        if isinstance(base, GraphQLScalarType):
+            append_input_line(path, gtype)
+            return
 
-            # Scalar: jen řádka
-            if isinstance(base, GraphQLScalarType):
-                append_input_line(path, gtype)
+        # Input objekt
+        if isinstance(base, GraphQLInputObjectType):
+            if base.name in visiting:
+                append_input_line(path, gtype, f"(recursive {base.name})")
                 return
+            visiting.add(base.name)
+
+            # nejdřív řádek pro samotný uzel
+            append_input_line(path, gtype, base.description)
+
+            # potom pole
+            for fname, fdef in base.fields.items():
+                fpath = f"{path}.{fname}"
+                append_input_line(fpath, fdef.type, fdef.description)
+                # rekurze jen pokud je to zase objekt
+                if isinstance(unwrap(fdef.type), GraphQLInputObjectType) or isinstance(
+                    unwrap(fdef.type), GraphQLList
+                ):
+                    describe_input_type(
+                        fpath, fdef.type, visiting, depth + 1, max_depth
+                    )
 
-            # Input objekt
-            if isinstance(base, GraphQLInputObjectType):
-                if base.name in visiting:
-                    append_input_line(path, gtype, f"(recursive {base.name})")
-                    return
-                visiting.add(base.name)
-
-                # nejdřív řádek pro samotný uzel
-                append_input_line(path, gtype, base.description)
-
-                # potom pole
-                for fname, fdef in base.fields.items():
-                    fpath = f"{path}.{fname}"
-                    append_input_line(fpath, fdef.type, fdef.description)
-                    # rekurze jen pokud je to zase objekt
-                    if isinstance(
-                        unwrap(fdef.type), GraphQLInputObjectType
-                    ) or isinstance(unwrap(fdef.type), GraphQLList):
-                        describe_input_type(
-                            fpath, fdef.type, visiting, depth + 1, max_depth
-                        )
-
-                visiting.remove(base.name)
-                return
+            visiting.remove(base.name)
+            return
+
+        # Fallback
+        append_input_line(path, gtype)
+
+    # spusť popis pro každou proměnnou, kterou jsme našli v dotazu
+    # for var_name, gtype in var_to_input_type.items():
+    #     describe_input_type(var_name, gtype)
+
+    # ---------- 3) @property výstup (s fragmenty) ----------
+
+    out_lines: list[str] = []
+    seen: set[tuple[str, str]] = set()
+
+    def print_field(parent_type, fname: str, path: str):
+        if isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+            fld_def = parent_type.fields.get(fname)
+        else:
+            fld_def = None
+        if not fld_def:
+            return
+        base_type = unwrap(fld_def.type)
+        base_name = getattr(base_type, "name", "Object")
+        desc = field_meta.get((parent_type.name, fname)) or ""
+        desc = " ".join(desc.split()) if desc else ""
+        key = (path, base_name)
+        if key in seen:
+            return
+        seen.add(key)
+        out_lines.append(
+            f"# @property {{{base_name}}} {path}" + (f" - {desc}" if desc else "")
+        )
 
-            # Fallback
-            append_input_line(path, gtype)
+    def walk_out(sel_set: SelectionSetNode, parent_type, prefix: str):
+        if not sel_set:
+            return
+        for sel in sel_set.selections:
+            if isinstance(sel, FieldNode):
+                fname = sel.name.value
+                path = f"{prefix}.{fname}" if prefix else fname
+                if isinstance(parent_type, GraphQLUnionType):
+                    continue
+                print_field(parent_type, fname, path)
+                if sel.selection_set and isinstance(
+                    parent_type, (GraphQLObjectType, GraphQLInterfaceType)
+                ):
+                    fdef = parent_type.fields.get(fname)
+                    if fdef:
+                        walk_out(sel.selection_set, unwrap(fdef.type), path)
+            elif isinstance(sel, FragmentSpreadNode):
+                frag = fragments.get(sel.name.value)
+                if frag:
+                    new_parent = parent_type
+                    if frag.type_condition:
+                        tname = frag.type_condition.name.value
+                        new_parent = schema.get_type(tname) or parent_type
+                    walk_out(frag.selection_set, new_parent, prefix)
+            elif isinstance(sel, InlineFragmentNode):
+                new_parent = parent_type
+                if sel.type_condition:
+                    tname = sel.type_condition.name.value
+                    new_parent = schema.get_type(tname) or parent_type
+                walk_out(sel.selection_set, new_parent, prefix)
+
+    for defn in query_ast.definitions:
+        if isinstance(defn, OperationDefinitionNode):
+            op = getattr(defn.operation, "value", defn.operation)
+            root = {
+                "query": schema.query_type,
+                "mutation": schema.mutation_type,
+                "subscription": schema.subscription_type,
+            }.get(op)
+            if root:
+                walk_out(defn.selection_set, root, "")
+
+    # ---------- 4) Sestavení hlavičky + dotaz ----------
+
+    header = []
+    if var_lines:
+        header.append("# ")
+        header.extend(var_lines)
+    if input_lines:
+        header.append("# ")
+        header.append("# @input structure")
+        header.extend(input_lines)
+    header.append("# @returns {Object}")
+    if out_lines:
+        header.append("# ")
+        header.extend(out_lines)
+
+    return "\n".join(header)
+
+
+DEFAULT_DISABLED_FIELDS = ("createdby", "changedby", "memberOf")
+
+
+class QueryTemplateCache:
+    """
+    LRU cache of strings generated for one schema version.
+
+    Keys start with the schema version, e.g. `(version, type chain, mode, disabled
+    fields)` for finished builder outputs. All entries are dropped as soon as
+    a lookup comes with a different schema version.
+
+    Args:
+        maxsize: maximum number of cached queries, env `QUERY_TEMPLATE_CACHE_SIZE` (256)
+    """
+
+    def __init__(self, maxsize: int | None = None):
+        if maxsize is None:
+            maxsize = int(os.getenv("QUERY_TEMPLATE_CACHE_SIZE", "256"))
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes = 0
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self._version = version
+
+    def get(self, key: tuple) -> str | None:
+        with self._lock:
+            self._check_version(key[0])
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: str):
+        with self._lock:
+            self._check_version(key[0])
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous.encode("utf-8"))
+            self._entries[key] = value
+            self.bytes += len(value.encode("utf-8"))
+            while len(self._entries) > self.maxsize:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted.encode("utf-8"))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "version": self._version,
+        }
 
-        # spusť popis pro každou proměnnou, kterou jsme našli v dotazu
-        # for var_name, gtype in var_to_input_type.items():
-        #     describe_input_type(var_name, gtype)
 
-        # ---------- 3) @property výstup (s fragmenty) ----------
+QUERY_TEMPLATE_CACHE = QueryTemplateCache()
+EXPLAIN_HEADER_CACHE = QueryTemplateCache(
+    int(os.getenv("EXPLAIN_HEADER_CACHE_SIZE", "1024"))
+)
 
-        out_lines: list[str] = []
-        seen: set[tuple[str, str]] = set()
 
-        def print_field(parent_type, fname: str, path: str):
-            if isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
-                fld_def = parent_type.fields.get(fname)
-            else:
-                fld_def = None
-            if not fld_def:
-                return
-            base_type = unwrap(fld_def.type)
-            base_name = getattr(base_type, "name", "Object")
-            desc = field_meta.get((parent_type.name, fname)) or ""
-            desc = " ".join(desc.split()) if desc else ""
-            key = (path, base_name)
-            if key in seen:
-                return
-            seen.add(key)
-            out_lines.append(
-                f"# @property {{{base_name}}} {path}" + (f" - {desc}" if desc else "")
-            )
+def build_explained_query(
+    graphql_types: List[str],
+    mode: str,
+    disabled_fields=DEFAULT_DISABLED_FIELDS,
+) -> str:
+    """
+    Returns the explained vector / scalar query for `graphql_types`, served from
+    `QUERY_TEMPLATE_CACHE` when the same chain was built for the current schema.
+
+    Args:
+      graphql_types: ordered list of type names, the first one is the root
+      mode: "vector" or "scalar"
+      disabled_fields: relation fields which must not be used for joins
+
+    Fields excluded by `FIELD_HEALTH` are part of the cache key, a template is
+    rebuilt as soon as a field becomes unhealthy or recovers.
+    """
+    from sdl.sdl_fetch import get_schema_snapshot
+
+    excluded = FIELD_HEALTH.excluded()
+    key = (
+        get_schema_snapshot().version,
+        tuple(graphql_types),
+        mode,
+        frozenset(disabled_fields),
+        excluded,
+    )
+    cached = QUERY_TEMPLATE_CACHE.get(key)
+    if cached is not None:
+        return cached
 
-        def walk_out(sel_set: SelectionSetNode, parent_type, prefix: str):
-            if not sel_set:
-                return
-            for sel in sel_set.selections:
-                if isinstance(sel, FieldNode):
-                    fname = sel.name.value
-                    path = f"{prefix}.{fname}" if prefix else fname
-                    if isinstance(parent_type, GraphQLUnionType):
-                        continue
-                    print_field(parent_type, fname, path)
-                    if sel.selection_set and isinstance(
-                        parent_type, (GraphQLObjectType, GraphQLInterfaceType)
-                    ):
-                        fdef = parent_type.fields.get(fname)
-                        if fdef:
-                            walk_out(sel.selection_set, unwrap(fdef.type), path)
-                elif isinstance(sel, FragmentSpreadNode):
-                    frag = fragments.get(sel.name.value)
-                    if frag:
-                        new_parent = parent_type
-                        if frag.type_condition:
-                            tname = frag.type_condition.name.value
-                            new_parent = schema.get_type(tname) or parent_type
-                        walk_out(frag.selection_set, new_parent, prefix)
-                elif isinstance(sel, InlineFragmentNode):
-                    new_parent = parent_type
-                    if sel.type_condition:
-                        tname = sel.type_condition.name.value
-                        new_parent = schema.get_type(tname) or parent_type
-                    walk_out(sel.selection_set, new_parent, prefix)
-
-        for defn in query_ast.definitions:
-            if isinstance(defn, OperationDefinitionNode):
-                op = getattr(defn.operation, "value", defn.operation)
-                root = {
-                    "query": schema.query_type,
-                    "mutation": schema.mutation_type,
-                    "subscription": schema.subscription_type,
-                }.get(op)
-                if root:
-                    walk_out(defn.selection_set, root, "")
-
-        # ---------- 4) Sestavení hlavičky + dotaz ----------
-
-        header = []
-        if var_lines:
-            header.append("# ")
-            header.extend(var_lines)
-        if input_lines:
-            header.append("# ")
-            header.append("# @input structure")
-            header.extend(input_lines)
-        header.append("# @returns {Object}")
-        if out_lines:
-            header.append("# ")
-            header.extend(out_lines)
-
-        return "\n".join(header + ["", print_ast(query_ast)])
+    builder = GraphQLQueryBuilder(
+        disabled_fields=list(disabled_fields), excluded_fields=excluded
+    )
+    if mode == "vector":
+        query = builder.build_query_vector(graphql_types)
+    elif mode == "scalar":
+        query = builder.build_query_scalar(graphql_types)
+    else:
+        raise ValueError(f"Unknown query mode {mode}")
+    print(f"join plan: {builder.last_plan.metrics()}")
+    result = builder.explain_graphql_query(query)
+    QUERY_TEMPLATE_CACHE.put(key, result)
+    return result
 
 
 from semantic_kernel.functions import kernel_function
@@ -617,11 +921,7 @@ class GraphQLBuilderPlugin:
         # types = payload["types"]
         # sdl = payload["sdl"]
         print(f"graphql_vetor_query_builder_skill(graphgql_types={graphql_types})")
-        builder = GraphQLQueryBuilder(
-            disabled_fields=["createdby", "changedby", "memberOf"]
-        )
-        query = builder.build_query_vector(graphql_types)
-        return builder.explain_graphql_query(query)
+        return build_explained_query(graphql_types, "vector")
 
     @kernel_function(
         name="buildScalarQuery",
@@ -649,8 +949,4 @@ class GraphQLBuilderPlugin:
         # types = payload["types"]
         # sdl = payload["sdl"]
         print(f"graphql_scalar_query_builder_skill(graphgql_types={graphql_types})")
-        builder = GraphQLQueryBuilder(
-            disabled_fields=["createdby", "changedby", "memberOf"]
-        )
-        query = builder.build_query_scalar(graphql_types)
-        return builder.explain_graphql_query(query)
+        return build_explained_query(graphql_types, "scalar")
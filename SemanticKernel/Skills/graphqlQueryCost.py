@@ -0,0 +1,395 @@
+import os
+import typing
+from dataclasses import dataclass, field as dataclass_field
+
+from graphql import parse, print_ast
+from graphql.language import visit, Visitor
+from graphql.language.ast import (
+    ArgumentNode,
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    IntValueNode,
+    ListTypeNode,
+    NameNode,
+    NonNullTypeNode,
+    OperationDefinitionNode,
+    VariableNode,
+)
+
+try:
+    from Skills.utils_sdl_2 import as_schema_index, unwrap_type
+except ImportError:
+    from SemanticKernel.Skills.utils_sdl_2 import as_schema_index, unwrap_type
+
+# odhad počtu vyřešených polí, nad GQL_COST_BUDGET se uplatní GQL_COST_ACTION
+GQL_COST_BUDGET = float(os.getenv("GQL_COST_BUDGET", "50000"))
+# reject | rewrite | confirm
+GQL_COST_ACTION = os.getenv("GQL_COST_ACTION", "rewrite").strip().lower()
+# nad tímto odhadem se dotaz odmítne vždy
+GQL_COST_MAX = float(os.getenv("GQL_COST_MAX", "500000"))
+# předpokládaná délka seznamu bez argumentu `limit`
+GQL_COST_LIST_SIZE = int(os.getenv("GQL_COST_LIST_SIZE", "10"))
+GQL_COST_LIMIT_ARGUMENT = "limit"
+
+
+def _is_list(type_node) -> bool:
+    while isinstance(type_node, NonNullTypeNode):
+        type_node = type_node.type
+    return isinstance(type_node, ListTypeNode)
+
+
+@dataclass
+class ListSite:
+    """
+    One list field of the query and the size assumed for it.
+
+    Attributes:
+        path (str): dotted response path, e.g. `userPage.memberships`
+        size (int): assumed number of items
+        source (str): `variable`, `argument`, `default` (SDL default) or `assumed`
+        variable (str | None): name of the `$limit` variable, if any
+        node (FieldNode): the field in the query AST
+        multiplier (float): number of parent objects the list is resolved for
+    """
+
+    path: str
+    size: int
+    source: str
+    variable: typing.Optional[str]
+    node: FieldNode
+    multiplier: float = 1.0
+
+    @property
+    def adjustable(self) -> bool:
+        return self.source != "assumed"
+
+
+@dataclass
+class CostEstimate:
+    """
+    Estimated work of one query.
+
+    Attributes:
+        cost (float): resolved field values (fields × objects they are resolved for)
+        objects (float): objects materialized by all list and object fields
+        depth (int): deepest nesting of list fields
+        lists (list[ListSite]): list fields with their assumed sizes
+    """
+
+    cost: float = 0.0
+    objects: float = 0.0
+    depth: int = 0
+    lists: typing.List[ListSite] = dataclass_field(default_factory=list)
+
+    def summary(self) -> dict:
+        # jen seznamy s největším dopadem, ať výsledek nástroje nenabobtná
+        largest = sorted(self.lists, key=lambda s: s.size * s.multiplier, reverse=True)
+        return {
+            "cost": round(self.cost),
+            "objects": round(self.objects),
+            "list_depth": self.depth,
+            "lists": {
+                site.path: f"{site.size} ({site.source})" for site in largest[:10]
+            },
+        }
+
+
+def estimate_cost(
+    sdl_doc,
+    document: DocumentNode,
+    variables: typing.Optional[dict] = None,
+    overrides: typing.Optional[typing.Dict[int, int]] = None,
+) -> CostEstimate:
+    """
+    Walks the first operation of `document` over the schema index.
+
+    Every field costs the number of parent objects it is resolved for. A list field
+    multiplies the objects below it by its `limit` (literal, variable, SDL default)
+    or by `GQL_COST_LIST_SIZE` when it has no such argument.
+
+    Args:
+      sdl_doc: SDL document or SchemaIndex
+      document: parsed query
+      variables: query variables
+      overrides: `id(FieldNode)` -> size replacing the list size of that field
+    """
+    index = as_schema_index(sdl_doc)
+    variables = variables or {}
+    overrides = overrides or {}
+    fragments = {
+        d.name.value: d
+        for d in document.definitions
+        if isinstance(d, FragmentDefinitionNode)
+    }
+    operation = next(
+        (d for d in document.definitions if isinstance(d, OperationDefinitionNode)),
+        None,
+    )
+    estimate = CostEstimate()
+    if operation is None:
+        return estimate
+    root = {"query": "Query", "mutation": "Mutation"}.get(operation.operation.value)
+
+    def list_size(node: FieldNode, field_def, path: str, multiplier: float) -> int:
+        argument = next(
+            (
+                a
+                for a in node.arguments or []
+                if a.name.value == GQL_COST_LIMIT_ARGUMENT
+            ),
+            None,
+        )
+        variable = None
+        if argument is not None and isinstance(argument.value, VariableNode):
+            variable = argument.value.name.value
+            value, source = variables.get(variable), "variable"
+        elif argument is not None and isinstance(argument.value, IntValueNode):
+            value, source = int(argument.value.value), "argument"
+        else:
+            arg_def = next(
+                (
+                    a
+                    for a in field_def.arguments or []
+                    if a.name.value == GQL_COST_LIMIT_ARGUMENT
+                ),
+                None,
+            )
+            if arg_def is not None and isinstance(arg_def.default_value, IntValueNode):
+                value, source = int(arg_def.default_value.value), "default"
+            else:
+                value, source = None, "assumed"
+        if not isinstance(value, int) or value <= 0:
+            # limit 0 / null typicky znamená "bez omezení"
+            value = GQL_COST_LIST_SIZE
+        if id(node) in overrides:
+            value = overrides[id(node)]
+        estimate.lists.append(
+            ListSite(path, value, source, variable, node, multiplier=multiplier)
+        )
+        return value
+
+    def walk(selection_set, type_name, multiplier, path, depth, seen):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                if name == "__typename":
+                    continue
+                field_def = index.field(type_name, name)
+                if field_def is None:
+                    continue
+                estimate.cost += multiplier
+                if selection.selection_set is None:
+                    continue
+                key = (selection.alias or selection.name).value
+                child_path = f"{path}.{key}" if path else key
+                child = multiplier
+                child_depth = depth
+                if _is_list(field_def.type):
+                    child *= list_size(selection, field_def, child_path, multiplier)
+                    child_depth += 1
+                    estimate.depth = max(estimate.depth, child_depth)
+                estimate.objects += child
+                walk(
+                    selection.selection_set,
+                    unwrap_type(field_def.type).name.value,
+                    child,
+                    child_path,
+                    child_depth,
+                    seen,
+                )
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                target = condition.name.value if condition else type_name
+                walk(selection.selection_set, target, multiplier, path, depth, seen)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = fragments.get(name)
+                if fragment is None or name in seen:
+                    continue
+                walk(
+                    fragment.selection_set,
+                    fragment.type_condition.name.value,
+                    multiplier,
+                    path,
+                    depth,
+                    seen | {name},
+                )
+
+    if root is not None:
+        walk(operation.selection_set, root, 1.0, "", 0, frozenset())
+    return estimate
+
+
+class _SetLimits(Visitor):
+    def __init__(self, limits: typing.Dict[int, int]):
+        super().__init__()
+        self.limits = limits
+
+    def enter_field(self, node: FieldNode, *_):
+        size = self.limits.get(id(node))
+        if size is None:
+            return None
+        argument = ArgumentNode(
+            name=NameNode(value=GQL_COST_LIMIT_ARGUMENT),
+            value=IntValueNode(value=str(size)),
+        )
+        arguments = [
+            a for a in node.arguments or [] if a.name.value != GQL_COST_LIMIT_ARGUMENT
+        ]
+        return FieldNode(
+            alias=node.alias,
+            name=node.name,
+            arguments=[*arguments, argument],
+            directives=node.directives,
+            selection_set=node.selection_set,
+        )
+
+
+@dataclass
+class Admission:
+    """
+    Decision about one query.
+
+    Attributes:
+        action (str): `allow`, `rewrite`, `confirm` or `reject`
+        query (str): query to send (with lowered literal limits after a rewrite)
+        variables (dict): variables to send (with lowered `$limit` after a rewrite)
+        estimate (CostEstimate): estimate of the query as it will be sent
+        original (CostEstimate | None): estimate before a rewrite
+        message (str | None): explanation for the model
+    """
+
+    action: str
+    query: str
+    variables: dict
+    estimate: CostEstimate
+    original: typing.Optional[CostEstimate] = None
+    message: typing.Optional[str] = None
+
+    @property
+    def allowed(self) -> bool:
+        return self.action in ("allow", "rewrite")
+
+    def report(self) -> dict:
+        report = {"action": self.action, **self.estimate.summary()}
+        if self.original is not None:
+            report["original_cost"] = round(self.original.cost)
+        if self.message:
+            report["message"] = self.message
+        return report
+
+
+def rewrite_limits(
+    sdl_doc,
+    document: DocumentNode,
+    variables: dict,
+    budget: float,
+    page_variable: typing.Optional[str] = None,
+) -> typing.Tuple[typing.Dict[int, int], dict, CostEstimate]:
+    """
+    Halves the list limit with the largest impact until the estimate fits `budget`
+    or no limit can be lowered. Returns (field limits, variables, estimate).
+
+    The `page_variable` of a paged query is lowered first, a smaller page only means
+    more pages, while a lower nested limit drops rows of the result.
+    """
+    overrides: typing.Dict[int, int] = {}
+    variables = dict(variables)
+    estimate = estimate_cost(sdl_doc, document, variables, overrides)
+    while estimate.cost > budget:
+        candidates = [s for s in estimate.lists if s.adjustable and s.size > 1]
+        if not candidates:
+            break
+        paging = [s for s in candidates if s.variable == page_variable]
+        if page_variable is not None and paging:
+            candidates = paging
+        site = max(candidates, key=lambda s: s.size * s.multiplier)
+        size = max(1, site.size // 2)
+        if site.variable is not None:
+            variables[site.variable] = size
+        else:
+            overrides[id(site.node)] = size
+        estimate = estimate_cost(sdl_doc, document, variables, overrides)
+    return overrides, variables, estimate
+
+
+def admit_query(
+    query: str,
+    variables: typing.Optional[dict] = None,
+    confirmed: bool = False,
+    sdl_doc=None,
+    budget: typing.Optional[float] = None,
+    action: typing.Optional[str] = None,
+    max_cost: typing.Optional[float] = None,
+    page_variable: typing.Optional[str] = None,
+) -> Admission:
+    """
+    Estimates the cost of `query` and decides whether it may be sent.
+
+    Below `budget` the query is allowed. Above it `action` applies: `reject`,
+    `rewrite` (lower the list limits until the estimate fits) or `confirm` (allowed
+    only with `confirmed=True`). Above `max_cost` the query is always rejected.
+
+    Args:
+      query: GraphQL query text
+      variables: query variables
+      confirmed: the caller confirmed an expensive query
+      sdl_doc: SDL document or SchemaIndex, the cached schema by default
+      budget: env `GQL_COST_BUDGET`
+      action: env `GQL_COST_ACTION`
+      max_cost: env `GQL_COST_MAX`
+      page_variable: page size variable of a paged query, lowered first on a rewrite
+    """
+    if sdl_doc is None:
+        from sdl.sdl_fetch import get_schema_snapshot
+
+        sdl_doc = get_schema_snapshot().ast
+    budget = GQL_COST_BUDGET if budget is None else budget
+    action = GQL_COST_ACTION if action is None else action
+    max_cost = GQL_COST_MAX if max_cost is None else max_cost
+    variables = dict(variables or {})
+
+    document = parse(query)
+    estimate = estimate_cost(sdl_doc, document, variables)
+    if estimate.cost <= budget:
+        return Admission("allow", query, variables, estimate)
+
+    if action == "rewrite":
+        overrides, new_variables, rewritten = rewrite_limits(
+            sdl_doc, document, variables, budget, page_variable
+        )
+        if rewritten.cost <= max_cost:
+            new_query = (
+                print_ast(visit(document, _SetLimits(overrides)))
+                if overrides
+                else query
+            )
+            return Admission(
+                "rewrite",
+                new_query,
+                new_variables,
+                rewritten,
+                original=estimate,
+                message=f"list limits were lowered to fit the cost budget {budget:g}, page through the results or select fewer nested lists",
+            )
+    elif action == "confirm" and estimate.cost <= max_cost:
+        if confirmed:
+            return Admission("allow", query, variables, estimate)
+        return Admission(
+            "confirm",
+            query,
+            variables,
+            estimate,
+            message=f"estimated cost {estimate.cost:.0f} exceeds the budget {budget:g}, ask the user and call again with confirm=true, or lower the limits",
+        )
+
+    return Admission(
+        "reject",
+        query,
+        variables,
+        estimate,
+        message=f"estimated cost {estimate.cost:.0f} exceeds the limit {budget if action == 'reject' else max_cost:g}, lower `limit` or select fewer nested lists",
+    )
@@ -1,9 +1,104 @@
 from typing import List, Tuple, Dict, Annotated
+from contextlib import aclosing
 import json
 
 from semantic_kernel.functions import kernel_function
 from semantic_kernel.functions import KernelArguments
 
+from src.Utils import json_codec
+from src.Utils.gql_paging import (
+    iterate_pages,
+    resolve_by_id,
+    GQL_PAGE_SIZE,
+    GQL_ENTITIES_CHUNK,
+)
+from src.Utils.gql_stream import GQL_STREAM_ROWS
+
+try:
+    from Skills.graphqlQueryCost import admit_query, GQL_COST_BUDGET, GQL_COST_MAX
+    from Skills.tableFormatter import markdown_table_from_stream
+except ImportError:
+    from SemanticKernel.Skills.graphqlQueryCost import (
+        admit_query,
+        GQL_COST_BUDGET,
+        GQL_COST_MAX,
+    )
+    from SemanticKernel.Skills.tableFormatter import markdown_table_from_stream
+
+
+def _get_path(row: dict, path: str):
+    value = row
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class RowAggregator:
+    """
+    Incremental aggregate over streamed rows, only `rows` keeps the rows themselves.
+
+    Args:
+        aggregate: `rows`, `count`, `count_by:<field>`, `sum:<field>`, `avg:<field>`,
+            `min:<field>` or `max:<field>` (field may be a dotted path)
+    """
+
+    def __init__(self, aggregate: str):
+        op, _, path = aggregate.partition(":")
+        self.op = op.strip().lower() or "rows"
+        if self.op == "none":
+            self.op = "rows"
+        if self.op not in ("rows", "count", "count_by", "sum", "avg", "min", "max"):
+            raise ValueError(f"Unknown aggregate {aggregate}")
+        self.path = path.strip()
+        self.count = 0
+        self.rows: List[dict] = []
+        self.groups: Dict[str, int] = {}
+        self.values = 0
+        self.value = None
+
+    def add(self, row: dict):
+        self.count += 1
+        op = self.op
+        if op == "rows":
+            self.rows.append(row)
+        elif op == "count_by":
+            key = json_codec.dumps(_get_path(row, self.path), default=str)
+            self.groups[key] = self.groups.get(key, 0) + 1
+        elif op != "count":
+            value = _get_path(row, self.path)
+            if not isinstance(value, (int, float)):
+                return
+            self.values += 1
+            if self.value is None:
+                self.value = value
+            elif op in ("sum", "avg"):
+                self.value += value
+            elif op == "min":
+                self.value = min(self.value, value)
+            elif op == "max":
+                self.value = max(self.value, value)
+
+    def result(self) -> dict:
+        if self.op == "rows":
+            return {"rows": self.rows, "count": self.count}
+        if self.op == "count":
+            return {"count": self.count}
+        if self.op == "count_by":
+            return {"count": self.count, "count_by": self.path, "groups": self.groups}
+        value = self.value
+        if self.op == "avg" and value is not None:
+            value = value / self.values
+        if self.op == "sum" and value is None:
+            value = 0
+        return {
+            "count": self.count,
+            "values": self.values,
+            self.op: value,
+            "field": self.path,
+        }
+
 
 class GraphQLRunQueryPlugin:
     @kernel_function(
@@ -18,6 +113,9 @@ class GraphQLRunQueryPlugin:
         ],
         skip: Annotated[int, "Number of items to skip"] = 0,
         limit: Annotated[int, "Maximum number of items to return"] = 10,
+        confirm: Annotated[
+            bool, "Set to true only after the user confirmed an expensive query"
+        ] = False,
         arguments: KernelArguments = None,
     ) -> str:
         """
@@ -27,33 +125,133 @@ class GraphQLRunQueryPlugin:
           graphql_query: valid GraphQL query string
           skip: number of records to skip (offset)
           limit: maximum number of records to return
+          confirm: run a query over the cost budget (when confirmation is required)
 
         Returns:
-          The list of entities under the `data` key in the GraphQL response.
+          `rows`: the list of entities under the `data` key in the GraphQL response,
+          `cost`: the estimated cost and the admission decision (limits may be lowered).
           If the number of returned items is equal to limit, there are another items beyond limit.
+          To get all items (or their count / aggregate) in one call use runQueryAll.
         """
         # types = json.loads(graphgql_types)
         # types = payload["types"]
         # sdl = payload["sdl"]
         print(f"run_graphql_query_for_page skip: {skip}, limit: {limit}")
         variables = {"skip": skip, "limit": limit}
+        admission = admit_query(graphql_query, variables, confirmed=confirm)
+        print(f"query cost: {admission.report()}")
+        if not admission.allowed:
+            return {"error": admission.message, "cost": admission.report()}
 
         # extra_context = arguments["extra_context"]
         gqlclient = arguments["gqlclient"]
-        rows = await gqlclient(query=graphql_query, variables=variables)
+        rows = await gqlclient(query=admission.query, variables=admission.variables)
         # rows = await response.json()
 
         assert "data" in rows, f"the response does not contain the data key {rows}"
         data = rows["data"]
 
         if not data:
-            return []
+            return {"rows": [], "cost": admission.report()}
 
         _, entities = next(iter(data.items()))
         # print(f"have got entity: \n{json.dumps(entity, indent=4)}")
         # assert "__typename" in entity, f"the response does not contain the data key {rows}"
 
-        return entities
+        return {"rows": entities, "cost": admission.report()}
+
+    @kernel_function(
+        name="runQueryAll",
+    )
+    async def run_graphql_query_for_all_pages(
+        self,
+        graphql_query: Annotated[
+            str,
+            "The full GraphQL page query string with `$skip` and `$limit` variables",
+        ],
+        aggregate: Annotated[
+            str,
+            "rows (all rows) | table (markdown table of all rows) | count | count_by:<field> | sum:<field> | avg:<field> | min:<field> | max:<field>",
+        ] = "rows",
+        max_rows: Annotated[int, "Maximum number of rows to fetch"] = 1000,
+        confirm: Annotated[
+            bool, "Set to true only after the user confirmed an expensive query"
+        ] = False,
+        arguments: KernelArguments = None,
+    ) -> str:
+        """
+        Runs a GraphQL page query for all pages at once (several pages are fetched
+        concurrently, or one streamed page with `GQL_STREAM_ROWS=1`) and returns all
+        rows or their aggregate in a single call.
+
+        Args:
+          graphql_query: valid GraphQL page query string (must accept `$skip` and `$limit`)
+          aggregate: what to return, all rows, a markdown table of them or an aggregate
+            over a (dotted) field
+          max_rows: upper bound of fetched rows
+          confirm: run a query over the cost budget (when confirmation is required)
+
+        Returns:
+          All rows (list), the markdown table (str) or the aggregate (dict). `truncated` says whether `max_rows` was reached,
+          `cost` is the estimated cost of one request and the admission decision.
+        """
+        print(
+            f"run_graphql_query_for_all_pages aggregate: {aggregate}, max_rows: {max_rows}"
+        )
+        gqlclient = arguments["gqlclient"]
+        table = aggregate.strip().lower() == "table"
+        aggregator = RowAggregator("count" if table else aggregate)
+        stream = GQL_STREAM_ROWS and hasattr(gqlclient, "stream")
+        page_size = max_rows + 1 if stream else min(GQL_PAGE_SIZE, max_rows + 1)
+        admission = admit_query(
+            graphql_query,
+            {"skip": 0, "limit": page_size},
+            confirmed=confirm,
+            page_variable="limit",
+        )
+        print(f"query cost: {admission.report()}")
+        if not admission.allowed:
+            return {"error": admission.message, "cost": admission.report()}
+        query = admission.query
+        if admission.variables.get("limit") != page_size:
+            # levnější dotaz = menší stránky, počet řádků se nemění
+            page_size = admission.variables["limit"]
+            stream = False
+        if stream:
+            # jedna velká stránka, řádky se zpracují už během stahování
+            rows = gqlclient.stream(query, {"skip": 0, "limit": page_size})
+        else:
+            rows = iterate_pages(
+                gqlclient, query, page_size=page_size, max_rows=max_rows + 1
+            )
+        truncated = False
+        if table:
+
+            async def counted():
+                async for row in rows:
+                    aggregator.add(row)
+                    yield row
+
+            # tabulka se píše po řádcích, řádky samotné se neuchovávají
+            async with aclosing(rows):
+                result = await markdown_table_from_stream(counted(), max_rows)
+            return {
+                "table": result,
+                "count": min(aggregator.count, max_rows),
+                "truncated": aggregator.count > max_rows,
+                "cost": admission.report(),
+            }
+        async with aclosing(rows):
+            async for row in rows:
+                if aggregator.count >= max_rows:
+                    truncated = True
+                    break
+                aggregator.add(row)
+        return {
+            **aggregator.result(),
+            "truncated": truncated,
+            "cost": admission.report(),
+        }
 
     @kernel_function(
         name="runQuerySingle",
@@ -65,6 +263,9 @@ class GraphQLRunQueryPlugin:
             str, "The full GraphQL query string with an `$id` variable"
         ],
         id: Annotated[str, "Primary key (UUID) of the requested entity"],
+        confirm: Annotated[
+            bool, "Set to true only after the user confirmed an expensive query"
+        ] = False,
         arguments: KernelArguments = None,
     ) -> str:
         """
@@ -73,19 +274,25 @@ class GraphQLRunQueryPlugin:
         Args:
           graphql_query: valid GraphQL query string (must accept `$id`)
           id: the entity's primary key
+          confirm: run a query over the cost budget (when confirmation is required)
 
         Returns:
-          The single entity object under the `data` key in the GraphQL response.
+          The single entity object under the `data` key in the GraphQL response,
+          or the cost estimate with an error when the query is over the cost budget.
         """
         # types = json.loads(graphgql_types)
         # types = payload["types"]
         # sdl = payload["sdl"]
         print(f"run_graphql_query_for_single_entity id: {id}")
         variables = {"id": id}
+        admission = admit_query(graphql_query, variables, confirmed=confirm)
+        print(f"query cost: {admission.report()}")
+        if not admission.allowed:
+            return {"error": admission.message, "cost": admission.report()}
 
         # extra_context = arguments["extra_context"]
         gqlclient = arguments["gqlclient"]
-        rows = await gqlclient(query=graphql_query, variables=variables)
+        rows = await gqlclient(query=admission.query, variables=admission.variables)
         # rows = await response.json()
 
         assert "data" in rows, f"the response does not contain the data key {rows}"
@@ -95,3 +302,56 @@ class GraphQLRunQueryPlugin:
         # assert "__typename" in entity, f"the response does not contain the data key {rows}"
 
         return entity
+
+    @kernel_function(
+        name="runQueryMany",
+    )
+    async def run_graphql_query_for_many_entities(
+        self,
+        graphql_query: Annotated[
+            str, "The full GraphQL query string with an `$id` variable"
+        ],
+        ids: Annotated[List[str], "Primary keys (UUID) of the requested entities"],
+        confirm: Annotated[
+            bool, "Set to true only after the user confirmed an expensive query"
+        ] = False,
+        arguments: KernelArguments = None,
+    ) -> str:
+        """
+        Runs a GraphQL query for one entity (the same query as for runQuerySingle)
+        for many ids at once. The ids are resolved in one or a few requests, use it
+        instead of calling runQuerySingle repeatedly.
+
+        Args:
+          graphql_query: valid GraphQL query string (must accept `$id`)
+          ids: the entities' primary keys
+          confirm: run a query over the cost budget (when confirmation is required)
+
+        Returns:
+          `entities`: the entities in the order of `ids` (null for an id which was not found),
+          `cost`: the estimated cost of one entity and the admission decision.
+        """
+        print(f"run_graphql_query_for_many_entities ids: {len(ids)}")
+        if not ids:
+            return {"entities": []}
+        # jeden požadavek nese až GQL_ENTITIES_CHUNK entit, rozpočet platí pro požadavek
+        per_request = min(len(ids), GQL_ENTITIES_CHUNK)
+        admission = admit_query(
+            graphql_query,
+            {"id": ids[0]},
+            confirmed=confirm,
+            budget=GQL_COST_BUDGET / per_request,
+            max_cost=GQL_COST_MAX / per_request,
+        )
+        print(f"query cost: {admission.report()}")
+        if not admission.allowed:
+            return {"error": admission.message, "cost": admission.report()}
+
+        gqlclient = arguments["gqlclient"]
+        try:
+            entities = await resolve_by_id(
+                gqlclient, admission.query, ids, admission.variables
+            )
+        except ValueError as e:
+            return {"error": f"{e}, use a query for one entity by `$id`"}
+        return {"entities": entities, "cost": admission.report()}
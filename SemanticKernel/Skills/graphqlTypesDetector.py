@@ -69,10 +69,10 @@ class GraphQLBuilderPlugin:
         Returns:
           An ordered list of GQL types names
         """
-        from sdl.sdl_fetch import fetch_sdl
+        from sdl.sdl_fetch import get_schema_provider
 
-        sdl = fetch_sdl()
-        ast = graphql.parse(sdl)
+        snapshot = await get_schema_provider().aget()
+        ast = snapshot.ast
 
         result = {}
         for node in ast.definitions:
@@ -1,17 +1,6 @@
-from typing import List, Tuple, Dict, Annotated, Any
-import json
+from typing import List, Annotated
 import os
 import sys
-from graphql.language.ast import (
-    TypeNode,
-    DocumentNode,
-    NamedTypeNode,
-    NonNullTypeNode,
-    ListTypeNode,
-    ObjectTypeDefinitionNode,
-    ScalarTypeDefinitionNode,
-    UnionTypeDefinitionNode,
-)
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
@@ -20,7 +9,9 @@ sys.path.insert(0, top_level)
 
 from semantic_kernel.functions import kernel_function
 from semantic_kernel.functions import KernelArguments
-from SemanticKernel.Skills.graphqlQueryBuilder import GraphQLQueryBuilder
+from SemanticKernel.Skills.graphqlQueryBuilder import RelationGraph
+from SemanticKernel.Skills.utils_sdl_2 import as_schema_index
+from src.Utils import json_codec
 
 
 class GraphQLFilterQueryPlugin:
@@ -50,30 +41,6 @@ class GraphQLFilterQueryPlugin:
           A json structure with filtrable variables and their filter options.
         """
 
-        def unwrap_type(t):
-            # Unwrap AST type nodes (NonNull, List) to get NamedTypeNode
-            while isinstance(t, (NonNullTypeNode, ListTypeNode)):
-                t = t.type
-            if isinstance(t, NamedTypeNode):
-                return t.name.value
-            raise TypeError(f"Unexpected type node: {t}")
-
-        def build_adjacency(
-            ast, disabled_fields: list[str]
-        ) -> Dict[str, List[Tuple[str, str]]]:
-            edges: Dict[str, List[Tuple[str, str]]] = {}
-            for defn in ast.definitions:
-                if hasattr(defn, "fields"):
-                    from_type = defn.name.value
-                    for field in defn.fields:
-                        if field.name.value in disabled_fields:
-                            continue
-                        to_type = unwrap_type(field.type)
-                        edges.setdefault(from_type, []).append(
-                            (field.name.value, to_type)
-                        )
-            return edges
-
         def extract_filter_inputs(ast) -> dict[str, list[str]]:
             """
             Extract available filter input types (e.g. StrFilter) and their operators
@@ -125,12 +92,16 @@ class GraphQLFilterQueryPlugin:
             return result
 
         print(f"find_filter_variables(graphql_types={graphql_types})")
-        from sdl.sdl_fetch import fetch_sdl
-        from graphql import parse, build_ast_schema
+        from sdl.sdl_fetch import get_schema_snapshot
 
-        sdl = fetch_sdl()
-        ast = parse(sdl)
-        adjacency = build_adjacency(ast=ast, disabled_fields=disabled_fields)
+        ast = get_schema_snapshot().ast
+        graph = RelationGraph.for_index(as_schema_index(ast))
+        mask = frozenset(disabled_fields)
+        adjacency = {
+            type_name: graph.edges(type_name, mask)
+            for type_name in graph.adjacency
+            if type_name in graphql_types
+        }
 
         result = get_filterable_fields_with_ops(ast, adjacency)
         return result
@@ -167,8 +138,8 @@ class GraphQLFilterQueryPlugin:
         """
         print(f"run_graphql_filter_query graphql_variables: {graphql_variables}")
         try:
-            variables = json.loads(graphql_variables)
-        except json.JSONDecodeError as e:
+            variables = json_codec.loads(graphql_variables)
+        except json_codec.JSONDecodeError as e:
             print(f"Error decoding JSON variables: {e}")
             return f"Error: Invalid JSON variables provided. {e}"
 
@@ -187,4 +158,4 @@ class GraphQLFilterQueryPlugin:
         # This assumes the query returns a single root field that is a list.
         _, entities = next(iter(data.items()))
 
-        return json.dumps(entities, indent=2, ensure_ascii=False)
+        return json_codec.dumps(entities, indent=2)
@@ -1,8 +1,63 @@
-import json
-from typing import Annotated
+from typing import Annotated, AsyncIterable, Iterable
 from semantic_kernel.functions import kernel_function
 from semantic_kernel.functions import KernelArguments
 
+from src.Utils import json_codec
+
+
+def markdown_header(headers: list) -> str:
+    markdown_table = "| " + " | ".join(headers) + " |\n"
+    markdown_table += "|---" * len(headers) + "|\n"
+    return markdown_table
+
+
+def markdown_row(item: dict, headers: list) -> str:
+    row_values = []
+    for header in headers:
+        value = item.get(header, "")
+        row_values.append(str(value))
+    return "| " + " | ".join(row_values) + " |\n"
+
+
+def markdown_table(data: Iterable[dict]) -> str:
+    """Markdown table over the union of keys of all rows (sorted)."""
+    data = list(data)
+    headers = set()
+    for item in data:
+        if isinstance(item, dict):
+            headers.update(item.keys())
+
+    headers = sorted(list(headers))
+    if not headers:
+        return ""
+
+    lines = [markdown_header(headers)]
+    for item in data:
+        if isinstance(item, dict):
+            lines.append(markdown_row(item, headers))
+    return "".join(lines)
+
+
+async def markdown_table_from_stream(
+    rows: AsyncIterable[dict], max_rows: int | None = None
+) -> str:
+    """
+    Markdown table written row by row while the rows are streamed, the rows
+    themselves are not kept. Columns are the (sorted) keys of the first row.
+    """
+    headers = None
+    lines = []
+    async for item in rows:
+        if not isinstance(item, dict):
+            continue
+        if headers is None:
+            headers = sorted(item.keys())
+            lines.append(markdown_header(headers))
+        if max_rows is not None and len(lines) > max_rows:
+            break
+        lines.append(markdown_row(item, headers))
+    return "".join(lines)
+
 
 class TableFormatterPlugin:
     @kernel_function(
@@ -26,31 +81,14 @@ class TableFormatterPlugin:
           A markdown formatted string containing the json data formatted into a table.
         """
         try:
-            data = json.loads(json_data)
-        except json.JSONDecodeError:
+            data = json_codec.loads(json_data)
+        except json_codec.JSONDecodeError:
             return "Invalid JSON data provided."
 
         if not isinstance(data, list) or not data:
             return "Data is not a list or is empty."
 
-        headers = set()
-        for item in data:
-            if isinstance(item, dict):
-                headers.update(item.keys())
-
-        headers = sorted(list(headers))
-        if not headers:
+        table = markdown_table(data)
+        if not table:
             return "No data found to create a table."
-
-        markdown_table = "| " + " | ".join(headers) + " |\n"
-        markdown_table += "|---" * len(headers) + "|\n"
-
-        for item in data:
-            if isinstance(item, dict):
-                row_values = []
-                for header in headers:
-                    value = item.get(header, "")
-                    row_values.append(str(value))
-                markdown_table += "| " + " | ".join(row_values) + " |\n"
-
-        return markdown_table
+        return table
@@ -3,7 +3,7 @@ import asyncio
 # import pytest
 import logging
 import typing
-import typing
+import weakref
 
 from graphql import parse
 from graphql.language import (
@@ -23,18 +23,120 @@ from graphql.language import (
 )
 
 
-def get_scalar_names(sdl_doc: DocumentNode) -> set:
-    # 1) základní GraphQL scalary
-    builtin = {"Int", "Float", "String", "Boolean", "ID"}
+BUILTIN_SCALARS = frozenset({"Int", "Float", "String", "Boolean", "ID"})
+# pomalé a rozbité resolvery, vynechané bez `excluded` (FIELD_HEALTH předává volající)
+DEFAULT_EXCLUDED_FIELDS = frozenset({"events", "plannedLessons"})
+
+Excluded = typing.AbstractSet[typing.Union[str, typing.Tuple[str, str]]]
+
+
+def is_excluded(excluded: Excluded, type_name: str, field_name: str) -> bool:
+    """`excluded` holds field names (excluded in every type) and (type, field) pairs."""
+    return field_name in excluded or (type_name, field_name) in excluded
+
+
+class SchemaIndex:
+    """
+    Dictionary lookups over a parsed SDL document.
+
+    Built once per SDL version (see `as_schema_index`) and accepted by every helper
+    in this module in place of the `DocumentNode`. `definitions` is kept, so code
+    which iterates the document works unchanged. The document itself is held only
+    weakly, the index does not keep it alive.
+
+    Attributes:
+        document (DocumentNode | None): the indexed SDL document, None once collected
+        objects (dict[str, ObjectTypeDefinitionNode]): OBJECT types by name
+        inputs (dict[str, InputObjectTypeDefinitionNode]): INPUT_OBJECT types by name
+        unions (dict[str, UnionTypeDefinitionNode]): UNION types by name
+        scalars (frozenset[str]): builtin and custom scalar names
+        fields (dict[str, dict[str, FieldDefinitionNode]]): OBJECT fields by type and field name
+        query_fields (dict[str, FieldDefinitionNode]): fields of `Query`
+        mutation_fields (dict[str, FieldDefinitionNode]): fields of `Mutation`
+    """
+
+    def __init__(self, sdl_doc: DocumentNode):
+        self._document = weakref.ref(sdl_doc)
+        self.definitions = sdl_doc.definitions
+
+        self.objects: typing.Dict[str, ObjectTypeDefinitionNode] = {}
+        self.inputs: typing.Dict[str, InputObjectTypeDefinitionNode] = {}
+        self.unions: typing.Dict[str, UnionTypeDefinitionNode] = {}
+        custom_scalars = set()
+        for d in sdl_doc.definitions:
+            # první definice vyhrává, stejně jako dříve next(...)
+            if isinstance(d, ObjectTypeDefinitionNode):
+                self.objects.setdefault(d.name.value, d)
+            elif isinstance(d, InputObjectTypeDefinitionNode):
+                self.inputs.setdefault(d.name.value, d)
+            elif isinstance(d, UnionTypeDefinitionNode):
+                self.unions.setdefault(d.name.value, d)
+            elif isinstance(d, ScalarTypeDefinitionNode):
+                custom_scalars.add(d.name.value)
+        self.scalars = BUILTIN_SCALARS | custom_scalars
+
+        self.fields: typing.Dict[str, typing.Dict[str, FieldDefinitionNode]] = {}
+        for name, d in self.objects.items():
+            by_name = {}
+            for f in d.fields or []:
+                by_name.setdefault(f.name.value, f)
+            self.fields[name] = by_name
+        self.query_fields = self.fields.get("Query", {})
+        self.mutation_fields = self.fields.get("Mutation", {})
+        self._derived: typing.Dict[typing.Hashable, typing.Any] = {}
+
+    def derived(
+        self, key: typing.Hashable, factory: typing.Callable[[], typing.Any]
+    ) -> typing.Any:
+        """
+        Returns a structure derived from this schema version, `factory()` runs only
+        for the first call with the given `key`.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            return self._derived.setdefault(key, factory())
+
+    @property
+    def document(self) -> typing.Optional[DocumentNode]:
+        return self._document()
+
+    def field(
+        self, type_name: str, field_name: str
+    ) -> typing.Optional[FieldDefinitionNode]:
+        """Returns the field definition `type_name.field_name` or None."""
+        return self.fields.get(type_name, {}).get(field_name)
+
+
+_schema_indexes: typing.Dict[int, SchemaIndex] = {}
+
+
+def as_schema_index(
+    sdl_doc: typing.Union[DocumentNode, SchemaIndex],
+) -> SchemaIndex:
+    """
+    Returns the `SchemaIndex` for `sdl_doc`.
+
+    An index is passed through, a `DocumentNode` is indexed once and the index is
+    reused for as long as the document is alive.
+    """
+    if isinstance(sdl_doc, SchemaIndex):
+        return sdl_doc
+    key = id(sdl_doc)
+    index = _schema_indexes.get(key)
+    if index is None or index.document is not sdl_doc:
+        index = SchemaIndex(sdl_doc)
+        _schema_indexes[key] = index
+        weakref.finalize(sdl_doc, _schema_indexes.pop, key, None)
+    return index
+
 
-    # 2) custom scalars z SDL
-    custom = {
-        d.name.value
-        for d in sdl_doc.definitions
-        if isinstance(d, ScalarTypeDefinitionNode)
-    }
+SdlDoc = typing.Union[DocumentNode, SchemaIndex]
 
-    return builtin | custom
+
+def get_scalar_names(sdl_doc: SdlDoc) -> set:
+    # základní GraphQL scalary + custom scalars z SDL
+    return as_schema_index(sdl_doc).scalars
 
 
 def unwrap_type(type_node):
@@ -48,7 +150,7 @@ def unwrap_type(type_node):
 
 
 def select_ast_by_path(
-    sdl_doc: DocumentNode, path: typing.List[str]
+    sdl_doc: SdlDoc, path: typing.List[str]
 ) -> typing.Optional[typing.Union[ObjectTypeDefinitionNode, FieldDefinitionNode]]:
     """
     Traverses the GraphQL AST based on `path`:
@@ -57,43 +159,26 @@ def select_ast_by_path(
       - After selecting a field (if not at end of path), continues into that field's return type definition.
     Returns the final AST node (type or field), or None if any step fails.
     """
+    index = as_schema_index(sdl_doc)
     current_node: typing.Union[
-        DocumentNode, ObjectTypeDefinitionNode, FieldDefinitionNode
-    ] = sdl_doc
+        SchemaIndex, ObjectTypeDefinitionNode, FieldDefinitionNode
+    ] = index
     for idx, name in enumerate(path):
-        if isinstance(current_node, DocumentNode):
+        if isinstance(current_node, SchemaIndex):
             # Find the type definition
-            type_def = next(
-                (
-                    d
-                    for d in sdl_doc.definitions
-                    if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == name
-                ),
-                None,
-            )
+            type_def = index.objects.get(name)
             if not type_def:
                 return None
             current_node = type_def
         elif isinstance(current_node, ObjectTypeDefinitionNode):
             # Find the field in the type
-            field_def = next(
-                (f for f in current_node.fields if f.name.value == name), None
-            )
+            field_def = index.field(current_node.name.value, name)
             if not field_def:
                 return None
             current_node = field_def
             # If more path remains, dive into the field's return type definition
             if idx < len(path) - 1:
-                type_name = unwrap_type(field_def.type)
-                type_def = next(
-                    (
-                        d
-                        for d in sdl_doc.definitions
-                        if isinstance(d, ObjectTypeDefinitionNode)
-                        and d.name.value == type_name
-                    ),
-                    None,
-                )
+                type_def = index.objects.get(unwrap_type(field_def.type).name.value)
                 if not type_def:
                     return None
                 current_node = type_def
@@ -103,7 +188,7 @@ def select_ast_by_path(
     return current_node
 
 
-def get_read_scalar_values(sdl_doc: DocumentNode) -> dict:
+def get_read_scalar_values(sdl_doc: SdlDoc) -> dict:
     """
     Extracts a mapping of GraphQL object type names to query field names
     that return a single object by NON_NULL 'id' argument.
@@ -141,16 +226,8 @@ def get_read_scalar_values(sdl_doc: DocumentNode) -> dict:
     """
     result = {}
 
-    # sdl_doc is already a parsed DocumentNode
     # Find the Query type definition node
-    query_def = next(
-        (
-            defn
-            for defn in sdl_doc.definitions
-            if isinstance(defn, ObjectTypeDefinitionNode) and defn.name.value == "Query"
-        ),
-        None,
-    )
+    query_def = as_schema_index(sdl_doc).objects.get("Query")
     if not query_def or not query_def.fields:
         return result
 
@@ -175,7 +252,7 @@ def get_read_scalar_values(sdl_doc: DocumentNode) -> dict:
     return result
 
 
-def get_read_vector_values(sdl_doc: DocumentNode) -> dict:
+def get_read_vector_values(sdl_doc: SdlDoc) -> dict:
     """
     Extracts a mapping of GraphQL object type names to Query field names
     that return a NonNull list of NonNull objects of that type.
@@ -210,14 +287,7 @@ def get_read_vector_values(sdl_doc: DocumentNode) -> dict:
     result = {}
 
     # najdi Query type definition v AST
-    query_def = next(
-        (
-            defn
-            for defn in sdl_doc.definitions
-            if isinstance(defn, ObjectTypeDefinitionNode) and defn.name.value == "Query"
-        ),
-        None,
-    )
+    query_def = as_schema_index(sdl_doc).objects.get("Query")
     if not query_def or not query_def.fields:
         return result
 
@@ -243,7 +313,7 @@ def get_read_vector_values(sdl_doc: DocumentNode) -> dict:
     return result
 
 
-def get_insert_mutations(sdl_doc: DocumentNode) -> dict:
+def get_insert_mutations(sdl_doc: SdlDoc) -> dict:
     """
     Extracts a mapping of GraphQL object type names to mutation field names
     for insert-like mutations, according to specific conventions.
@@ -277,17 +347,10 @@ def get_insert_mutations(sdl_doc: DocumentNode) -> dict:
 
     """
     result = {}
+    index = as_schema_index(sdl_doc)
 
     # najdi Mutation type definition v AST
-    mutation_def = next(
-        (
-            defn
-            for defn in sdl_doc.definitions
-            if isinstance(defn, ObjectTypeDefinitionNode)
-            and defn.name.value == "Mutation"
-        ),
-        None,
-    )
+    mutation_def = index.objects.get("Mutation")
     if not mutation_def or not mutation_def.fields:
         return result
 
@@ -299,15 +362,7 @@ def get_insert_mutations(sdl_doc: DocumentNode) -> dict:
             # unwrapneme na base input type
             base_arg = unwrap_type(args[0].type)
             # musí být INPUT_OBJECT
-            input_def = next(
-                (
-                    d
-                    for d in sdl_doc.definitions
-                    if isinstance(d, InputObjectTypeDefinitionNode)
-                    and d.name.value == base_arg.name.value
-                ),
-                None,
-            )
+            input_def = index.inputs.get(base_arg.name.value)
             if not input_def:
                 continue
             # zkontrolujeme, že inputFields neobsahuje "lastchange"
@@ -318,15 +373,7 @@ def get_insert_mutations(sdl_doc: DocumentNode) -> dict:
             # unwrap return type
             ret_base = unwrap_type(field.type)
             # musí být UNION
-            union_def = next(
-                (
-                    d
-                    for d in sdl_doc.definitions
-                    if isinstance(d, UnionTypeDefinitionNode)
-                    and d.name.value == ret_base.name.value
-                ),
-                None,
-            )
+            union_def = index.unions.get(ret_base.name.value)
             if not union_def:
                 continue
 
@@ -335,15 +382,7 @@ def get_insert_mutations(sdl_doc: DocumentNode) -> dict:
                 # jen OBJECT a bez "Error" v názvu
                 if isinstance(pt, NamedTypeNode) and "Error" not in pt.name.value:
                     # ověříme, že je to skutečný ObjectTypeDefinition
-                    obj_def = next(
-                        (
-                            d
-                            for d in sdl_doc.definitions
-                            if isinstance(d, ObjectTypeDefinitionNode)
-                            and d.name.value == pt.name.value
-                        ),
-                        None,
-                    )
+                    obj_def = index.objects.get(pt.name.value)
                     if obj_def:
                         type_name = pt.name.value
                         if type_name not in result:
@@ -354,7 +393,7 @@ def get_insert_mutations(sdl_doc: DocumentNode) -> dict:
     return result
 
 
-def get_update_mutations(sdl_doc: DocumentNode) -> dict:
+def get_update_mutations(sdl_doc: SdlDoc) -> dict:
     """
     Extracts a mapping of GraphQL object type names to mutation field names
     for update-like mutations, according to specific conventions.
@@ -395,17 +434,10 @@ def get_update_mutations(sdl_doc: DocumentNode) -> dict:
 
     """
     result = {}
+    index = as_schema_index(sdl_doc)
 
     # najdi Mutation type definition v AST
-    mutation_def = next(
-        (
-            defn
-            for defn in sdl_doc.definitions
-            if isinstance(defn, ObjectTypeDefinitionNode)
-            and defn.name.value == "Mutation"
-        ),
-        None,
-    )
+    mutation_def = index.objects.get("Mutation")
     if not mutation_def or not mutation_def.fields:
         return result
 
@@ -416,15 +448,7 @@ def get_update_mutations(sdl_doc: DocumentNode) -> dict:
         if len(args) == 1 and isinstance(args[0].type, NonNullTypeNode):
             base_arg = unwrap_type(args[0].type)
             # musí být INPUT_OBJECT
-            input_def = next(
-                (
-                    d
-                    for d in sdl_doc.definitions
-                    if isinstance(d, InputObjectTypeDefinitionNode)
-                    and d.name.value == base_arg.name.value
-                ),
-                None,
-            )
+            input_def = index.inputs.get(base_arg.name.value)
             if not input_def:
                 continue
 
@@ -444,29 +468,13 @@ def get_update_mutations(sdl_doc: DocumentNode) -> dict:
 
             # unwrap return type must be UNION
             ret_base = unwrap_type(field.type)
-            union_def = next(
-                (
-                    d
-                    for d in sdl_doc.definitions
-                    if isinstance(d, UnionTypeDefinitionNode)
-                    and d.name.value == ret_base.name.value
-                ),
-                None,
-            )
+            union_def = index.unions.get(ret_base.name.value)
             if not union_def:
                 continue
 
             for pt in union_def.types or []:
                 if isinstance(pt, NamedTypeNode) and "Error" not in pt.name.value:
-                    obj_def = next(
-                        (
-                            d
-                            for d in sdl_doc.definitions
-                            if isinstance(d, ObjectTypeDefinitionNode)
-                            and d.name.value == pt.name.value
-                        ),
-                        None,
-                    )
+                    obj_def = index.objects.get(pt.name.value)
                     if obj_def:
                         type_name = pt.name.value
                         if type_name not in result:
@@ -476,7 +484,7 @@ def get_update_mutations(sdl_doc: DocumentNode) -> dict:
     return result
 
 
-def get_delete_mutations(sdl_doc: DocumentNode) -> dict:
+def get_delete_mutations(sdl_doc: SdlDoc) -> dict:
     """
     Extracts a mapping of GraphQL object type names to mutation field names
     for "delete" mutations following a specific convention.
@@ -519,17 +527,10 @@ def get_delete_mutations(sdl_doc: DocumentNode) -> dict:
 
     """
     result = {}
+    index = as_schema_index(sdl_doc)
 
     # najdi Mutation type definition v AST
-    mutation_def = next(
-        (
-            defn
-            for defn in sdl_doc.definitions
-            if isinstance(defn, ObjectTypeDefinitionNode)
-            and defn.name.value == "Mutation"
-        ),
-        None,
-    )
+    mutation_def = index.objects.get("Mutation")
     if not mutation_def or not mutation_def.fields:
         return result
 
@@ -540,15 +541,7 @@ def get_delete_mutations(sdl_doc: DocumentNode) -> dict:
         if len(args) == 1 and isinstance(args[0].type, NonNullTypeNode):
             base_arg = unwrap_type(args[0].type)
             # najdi definici INPUT_OBJECT
-            input_def = next(
-                (
-                    defn
-                    for defn in sdl_doc.definitions
-                    if isinstance(defn, InputObjectTypeDefinitionNode)
-                    and defn.name.value == base_arg.name.value
-                ),
-                None,
-            )
+            input_def = index.inputs.get(base_arg.name.value)
             if not input_def:
                 continue
 
@@ -568,22 +561,12 @@ def get_delete_mutations(sdl_doc: DocumentNode) -> dict:
                 continue
 
             # najdi definici návratového objektu
-            obj_def = next(
-                (
-                    defn
-                    for defn in sdl_doc.definitions
-                    if isinstance(defn, ObjectTypeDefinitionNode)
-                    and defn.name.value == ret_base.name.value
-                ),
-                None,
-            )
+            obj_def = index.objects.get(ret_base.name.value)
             if not obj_def or not obj_def.fields:
                 continue
 
             # najdi pole 'Entity'
-            entity_field = next(
-                (f for f in obj_def.fields if f.name.value == "Entity"), None
-            )
+            entity_field = index.field(ret_base.name.value, "Entity")
             if not entity_field:
                 continue
 
@@ -598,7 +581,7 @@ def get_delete_mutations(sdl_doc: DocumentNode) -> dict:
     return result
 
 
-def get_cruds(sdl_doc: DocumentNode) -> dict:
+def get_cruds(sdl_doc: SdlDoc) -> dict:
     """
     Constructs a CRUD operations mapping for each object type in a GraphQL SDL AST.
 
@@ -644,6 +627,7 @@ def get_cruds(sdl_doc: DocumentNode) -> dict:
         A type is only included if it supports both 'read' (single) and 'readp' (vector) queries.
 
     """
+    sdl_doc = as_schema_index(sdl_doc)
     single = get_read_scalar_values(sdl_doc)
     vector = get_read_vector_values(sdl_doc)
     ins = get_insert_mutations(sdl_doc)
@@ -682,28 +666,21 @@ query sdlQuery {
 }"""
 
 
-def build_selection_optional(sdl_doc: DocumentNode, field_type: TypeNode) -> str:
+def build_selection_optional(sdl_doc: SdlDoc, field_type: TypeNode) -> str:
     """
     Builds a selection set by iterating over fields of the given object type.
     Excludes any field that has at least one NON_NULL argument.
     For fields returning OBJECT or federated types, nests them with `{ __typename id }`.
     Scalar and enum fields are inlined by name.
     """
-    scalar_names = get_scalar_names(sdl_doc)
+    index = as_schema_index(sdl_doc)
+    scalar_names = index.scalars
 
     # 1) Unwrap to the base NamedTypeNode
     base = unwrap_type(field_type)
 
     # 2) Locate the corresponding ObjectTypeDefinition in the AST
-    type_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode)
-            and d.name.value == base.name.value
-        ),
-        None,
-    )
+    type_def = index.objects.get(base.name.value)
     if not type_def or not type_def.fields:
         return ""
 
@@ -736,7 +713,7 @@ def build_selection_optional(sdl_doc: DocumentNode, field_type: TypeNode) -> str
     return f"{{ {joined} }}"
 
 
-def build_selection(sdl_doc: DocumentNode, field_type: TypeNode) -> str:
+def build_selection(sdl_doc: SdlDoc, field_type: TypeNode) -> str:
     """
     Recursively builds a selection set based on the AST node of field_type.
     Uses build_selection_optional for OBJECTs, recurses through LIST/NON_NULL,
@@ -757,31 +734,17 @@ def build_selection(sdl_doc: DocumentNode, field_type: TypeNode) -> str:
     if not isinstance(field_type, NamedTypeNode):
         return ""
 
+    index = as_schema_index(sdl_doc)
+
     # Try OBJECT
-    obj_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode)
-            and d.name.value == field_type.name.value
-        ),
-        None,
-    )
+    obj_def = index.objects.get(field_type.name.value)
     if obj_def:
-        result = build_selection_optional(sdl_doc, field_type)
+        result = build_selection_optional(index, field_type)
         logging.info(f"{obj_def.name} -> {result}")
         return result
 
     # Try UNION
-    union_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, UnionTypeDefinitionNode)
-            and d.name.value == field_type.name.value
-        ),
-        None,
-    )
+    union_def = index.unions.get(field_type.name.value)
     if union_def:
         return "{ __typename }"
 
@@ -790,27 +753,27 @@ def build_selection(sdl_doc: DocumentNode, field_type: TypeNode) -> str:
 
 
 def build_medium_fragment(
-    sdl_doc: DocumentNode, type_name: str, postfix: str = "MediumFragment"
+    sdl_doc: SdlDoc,
+    type_name: str,
+    postfix: str = "MediumFragment",
+    excluded: typing.Optional[Excluded] = None,
 ) -> str:
     """
     Constructs a GraphQL fragment for `type_name` including only fields that:
       - have no NON_NULL arguments,
-      - return a base type that is scalar.
+      - return a base type that is scalar,
+      - are not `excluded` (see `is_excluded`, default `DEFAULT_EXCLUDED_FIELDS`).
     The fragment is named `<TypeName>MediumFragment`.
     """
+    index = as_schema_index(sdl_doc)
+    if excluded is None:
+        excluded = DEFAULT_EXCLUDED_FIELDS
     # Find the type definition in the AST
-    type_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == type_name
-        ),
-        None,
-    )
+    type_def = index.objects.get(type_name)
     if not type_def or not type_def.fields:
         return f"# Type {type_name} not found or has no fields"
 
-    scalar_names = get_scalar_names(sdl_doc)
+    scalar_names = index.scalars
     # print(f"scalar_names {scalar_names}")
     parts: typing.List[str] = ["__typename"]
 
@@ -822,6 +785,8 @@ def build_medium_fragment(
             isinstance(arg.type, NonNullTypeNode) for arg in (field.arguments or [])
         ):
             continue
+        if is_excluded(excluded, type_name, field.name.value):
+            continue
         # Unwrap return type
         base = unwrap_type(field.type)
         # print(f"considering field {base.name.value}")
@@ -839,39 +804,31 @@ def build_medium_fragment(
 
 
 def build_large_fragment(
-    sdl_doc: DocumentNode, type_name: str, postfix: str = "LargeFragment"
+    sdl_doc: SdlDoc,
+    type_name: str,
+    postfix: str = "LargeFragment",
+    excluded: typing.Optional[Excluded] = None,
 ) -> str:
     """
     Constructs a GraphQL fragment for `type_name` including:
       - all medium fragment fields (scalars without required args), plus
       - object/union/list fields without required args, each with a minimal { __typename } sub-selection.
+    `excluded` fields are left out (see `is_excluded`, default `DEFAULT_EXCLUDED_FIELDS`).
 
     The fragment is named `<TypeName>LargeFragment`.
     """
+    index = as_schema_index(sdl_doc)
+    if excluded is None:
+        excluded = DEFAULT_EXCLUDED_FIELDS
     # locate the type
-    type_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == type_name
-        ),
-        None,
-    )
+    type_def = index.objects.get(type_name)
     if not type_def or not type_def.fields:
         return f"# Type {type_name} not found or has no fields"
 
-    scalar_names = get_scalar_names(sdl_doc)
-    # collect object and union names for lookup
-    object_names = {
-        d.name.value
-        for d in sdl_doc.definitions
-        if isinstance(d, ObjectTypeDefinitionNode)
-    }
-    union_names = {
-        d.name.value
-        for d in sdl_doc.definitions
-        if isinstance(d, UnionTypeDefinitionNode)
-    }
+    scalar_names = index.scalars
+    # object and union names for lookup
+    object_names = index.objects
+    union_names = index.unions
 
     parts: typing.List[str] = ["__typename"]
 
@@ -882,8 +839,8 @@ def build_large_fragment(
         ):
             continue
 
-        # TODO : broken containers
-        if field.name.value == "events" or field.name.value == "plannedLessons":
+        # pomalé a rozbité resolvery (dříve napevno events, plannedLessons)
+        if is_excluded(excluded, type_name, field.name.value):
             continue
 
         base = unwrap_type(field.type)  # NamedTypeNode
@@ -926,7 +883,7 @@ def print_type(type_node: TypeNode) -> str:
 
 
 def build_input_type_params_list(
-    sdl_doc: DocumentNode, input_type_name: str
+    sdl_doc: SdlDoc, input_type_name: str
 ) -> list[str]:
     """
     Builds parameter definitions string for given INPUT_OBJECT type.
@@ -934,15 +891,7 @@ def build_input_type_params_list(
       ($field1: Type1!, $field2: Type2)
     """
     # Najdi definici INPUT_OBJECT v AST
-    input_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, InputObjectTypeDefinitionNode)
-            and d.name.value == input_type_name
-        ),
-        None,
-    )
+    input_def = as_schema_index(sdl_doc).inputs.get(input_type_name)
     # Pokud není nebo nemá žádná pole, vrať prázdný string
     if not input_def or not input_def.fields:
         return ""
@@ -957,7 +906,7 @@ def build_input_type_params_list(
     return params
 
 
-def build_input_type_params(sdl_doc: DocumentNode, input_type_name: str) -> str:
+def build_input_type_params(sdl_doc: SdlDoc, input_type_name: str) -> str:
     """
     Builds parameter definitions string for given INPUT_OBJECT type.
     Outputs GraphQL variable signature, e.g.:
@@ -975,23 +924,9 @@ def build_input_type_params(sdl_doc: DocumentNode, input_type_name: str) -> str:
     return f"(\n   {joined}\n)"
 
 
-def get_mutation_query_params(sdl_doc: DocumentNode, mutation_name: str) -> str:
-    # 1) Najdi Mutation type v AST
-    mutation_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == "Mutation"
-        ),
-        None,
-    )
-    if not mutation_def or not mutation_def.fields:
-        return ""
-
-    # 2) Najdi konkrétní mutation field
-    field = next(
-        (f for f in mutation_def.fields if f.name.value == mutation_name), None
-    )
+def get_mutation_query_params(sdl_doc: SdlDoc, mutation_name: str) -> str:
+    # 1) + 2) Najdi konkrétní mutation field
+    field = as_schema_index(sdl_doc).mutation_fields.get(mutation_name)
     if not field or len(field.arguments or []) != 1:
         return ""
 
@@ -1006,27 +941,14 @@ def get_mutation_query_params(sdl_doc: DocumentNode, mutation_name: str) -> str:
     return param_defs
 
 
-def build_expanded_mutation(sdl_doc: DocumentNode, mutation_name: str) -> str:
+def build_expanded_mutation(sdl_doc: SdlDoc, mutation_name: str) -> str:
     """
     Builds complete GraphQL mutation string for given mutation.
     Uses expanded individual fields as variables based on input type.
     """
-    # 1) Najdi Mutation type v AST
-    mutation_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == "Mutation"
-        ),
-        None,
-    )
-    if not mutation_def or not mutation_def.fields:
-        return ""
-
-    # 2) Najdi konkrétní mutation field
-    field = next(
-        (f for f in mutation_def.fields if f.name.value == mutation_name), None
-    )
+    index = as_schema_index(sdl_doc)
+    # 1) + 2) Najdi konkrétní mutation field
+    field = index.mutation_fields.get(mutation_name)
     if not field or len(field.arguments or []) != 1:
         return ""
 
@@ -1036,18 +958,10 @@ def build_expanded_mutation(sdl_doc: DocumentNode, mutation_name: str) -> str:
     input_name = base_arg.name.value
 
     # 4) Vygeneruj definici proměnných podle INPUT_OBJECT
-    param_defs = build_input_type_params(sdl_doc, input_name)
+    param_defs = build_input_type_params(index, input_name)
 
     # 5) Sestav call‑args z input fields
-    input_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, InputObjectTypeDefinitionNode)
-            and d.name.value == input_name
-        ),
-        None,
-    )
+    input_def = index.inputs.get(input_name)
     inputs = input_def.fields or []
     call_args = ",\n   ".join(f"{f.name.value}: ${f.name.value}" for f in inputs)
 
@@ -1056,46 +970,23 @@ def build_expanded_mutation(sdl_doc: DocumentNode, mutation_name: str) -> str:
     selection = ""
 
     # 6a) Pokud je to UNION
-    union_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, UnionTypeDefinitionNode)
-            and d.name.value == ret_base.name.value
-        ),
-        None,
-    )
+    union_def = index.unions.get(ret_base.name.value)
     if union_def:
         parts = []
         for pt in union_def.types or []:
             name = pt.name.value
             # jen OBJECT a bez „Error“
-            obj_def = next(
-                (
-                    d
-                    for d in sdl_doc.definitions
-                    if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == name
-                ),
-                None,
-            )
+            obj_def = index.objects.get(name)
             if obj_def and "Error" not in name:
-                sel = build_selection(sdl_doc, NamedTypeNode(name=pt.name))
+                sel = build_selection(index, NamedTypeNode(name=pt.name))
                 parts.append(f"... on {name} {sel}")
         joined = "\n   ".join(parts)
         selection = f" {{\n   __typename\n   {joined}\n }}"
     else:
         # 6b) Pokud je to OBJECT
-        obj_def = next(
-            (
-                d
-                for d in sdl_doc.definitions
-                if isinstance(d, ObjectTypeDefinitionNode)
-                and d.name.value == ret_base.name.value
-            ),
-            None,
-        )
+        obj_def = index.objects.get(ret_base.name.value)
         if obj_def:
-            sel = build_selection(sdl_doc, ret_base)
+            sel = build_selection(index, ret_base)
             selection = f" {sel}" if sel else ""
 
     # 7) Poskládáme celý mutation string
@@ -1108,26 +999,18 @@ def build_expanded_mutation(sdl_doc: DocumentNode, mutation_name: str) -> str:
     )
 
 
-def build_query_page(sdl_doc: DocumentNode, operation_name: str) -> str:
+def build_query_page(sdl_doc: SdlDoc, operation_name: str) -> str:
     """
     Builds a readPage query for the given operation name,
     expecting Query.<operationName>: NON_NULL( LIST( NON_NULL( Object ) ) ).
     """
+    index = as_schema_index(sdl_doc)
     # 1) Najdi Query type v AST
-    query_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == "Query"
-        ),
-        None,
-    )
+    query_def = index.objects.get("Query")
     assert query_def and query_def.fields, "Query type not found or has no fields"
 
     # 2) Najdi pole s daným jménem
-    field_def = next(
-        (f for f in query_def.fields if f.name.value == operation_name), None
-    )
+    field_def = index.query_fields.get(operation_name)
     assert field_def, f"Field {operation_name} not found in Query"
 
     # 3) Ověření struktury: NON_NULL → LIST → NON_NULL → NamedType
@@ -1141,35 +1024,27 @@ def build_query_page(sdl_doc: DocumentNode, operation_name: str) -> str:
     ), f"{operation_name} list elements must be NON_NULL"
 
     # 4) Vytvoření selection setu
-    sel = build_selection(sdl_doc, field_def.type)
+    sel = build_selection(index, field_def.type)
 
     # 5) Složení finální query
     return f"query {operation_name} {{ {operation_name}{sel} }}"
 
 
 def build_query_scalar(
-    sdl_doc: DocumentNode, operation_name: str
+    sdl_doc: SdlDoc, operation_name: str
 ) -> typing.Optional[str]:
     """
     Builds a read(id) query for given operation name.
     Expects Query.<operationName>(id: ID!): OBJECT.
     """
+    index = as_schema_index(sdl_doc)
     # 1) Najdi Query type v AST
-    query_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode) and d.name.value == "Query"
-        ),
-        None,
-    )
+    query_def = index.objects.get("Query")
     if not query_def or not query_def.fields:
         return None
 
     # 2) Najdi field s daným jménem
-    field_def = next(
-        (f for f in query_def.fields if f.name.value == operation_name), None
-    )
+    field_def = index.query_fields.get(operation_name)
     if not field_def:
         return None
 
@@ -1179,20 +1054,12 @@ def build_query_scalar(
         return None
 
     # 4) Zjisti, že ten typ opravdu existuje jako OBJECT
-    obj_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, ObjectTypeDefinitionNode)
-            and d.name.value == field_base.name.value
-        ),
-        None,
-    )
+    obj_def = index.objects.get(field_base.name.value)
     if not obj_def:
         return None
 
     # 5) Sestav selection set
-    sel = build_selection(sdl_doc, field_def.type)
+    sel = build_selection(index, field_def.type)
 
     # 6) Vrať finální query s proměnnou $id
     return (
@@ -1424,8 +1291,8 @@ def createTests(schema):
     #     introspection = executor(query=SERVICE_SDL_QUERY)
     sdl_str = introspection.data["_service"]["sdl"]
 
-    # 2) Parse the SDL string into a DocumentNode
-    sdl_doc = parse(sdl_str)
+    # 2) Parse the SDL string into a DocumentNode and index it
+    sdl_doc = as_schema_index(parse(sdl_str))
 
     # 3) Build the CRUD map from the AST
     cruds = get_cruds(sdl_doc)
@@ -1531,20 +1398,14 @@ async def createResolveTest(sdl_doc: DocumentNode, types: dict):
     return test_entities
 
 
-def build_entities_query(sdl_doc: DocumentNode) -> str:
+def build_entities_query(sdl_doc: SdlDoc) -> str:
     """
     Builds a federated _entities query selecting all types from the _Entity union.
     Uses build_selection_optional to derive each fragment's selection set.
     """
+    index = as_schema_index(sdl_doc)
     # 1) Locate the _Entity union in the AST
-    union_def = next(
-        (
-            d
-            for d in sdl_doc.definitions
-            if isinstance(d, UnionTypeDefinitionNode) and d.name.value == "_Entity"
-        ),
-        None,
-    )
+    union_def = index.unions.get("_Entity")
     if not union_def or not union_def.types:
         return None
 
@@ -1553,7 +1414,7 @@ def build_entities_query(sdl_doc: DocumentNode) -> str:
     for named in union_def.types:  # NamedTypeNode
         type_name = named.name.value
         # Build selection for that type
-        sel = build_selection_optional(sdl_doc, NamedTypeNode(name=named.name))
+        sel = build_selection_optional(index, NamedTypeNode(name=named.name))
         if not sel.strip():
             sel = "{ __typename id }"
         fragments.append(f"... on {type_name} {sel}")
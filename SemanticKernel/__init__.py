@@ -15,7 +15,11 @@ sys.path.insert(0, parent_dir)
 
 # from semantic_kernel.contents.chat_history import ChatHistory
 from semantic_kernel import Kernel
-from semantic_kernel.contents import ChatHistoryTruncationReducer
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatHistoryTruncationReducer,
+    ChatMessageContent,
+)
 from semantic_kernel.functions import KernelArguments, KernelPlugin
 from semantic_kernel.filters import FilterTypes, AutoFunctionInvocationContext
 from semantic_kernel.exceptions import PluginInitializationError
@@ -28,6 +32,12 @@ from semantic_kernel.connectors.ai.function_choice_behavior import (
     FunctionChoiceBehavior,
 )
 
+# jeden pooled klient (keep-alive session) na přihlášení, viz src/Utils/gql_client.py
+from src.Utils.gql_client import createGQLClient, close_gql_clients
+from src.Utils.gql_stack import createCachedGQLClient
+from src.Utils.semantic_answers import SEMANTIC_ANSWERS
+from src.Utils import json_codec
+
 skills_dir = Path(__file__).parent / "Skills"
 plugins = {}
 
@@ -84,66 +94,6 @@ kernel = Kernel(
 )
 
 
-async def createGQLClient(
-    *, url: str = "http://localhost:33001/api/gql", username: str, password: str
-):
-    import aiohttp
-
-    async def getToken():
-        authurl = url.replace("/api/gql", "/oauth/login3")
-        async with aiohttp.ClientSession() as session:
-            # print(headers, cookies)
-            async with session.get(authurl) as resp:
-                json = await resp.json()
-
-            payload = {**json, "username": username, "password": password}
-            async with session.post(authurl, json=payload) as resp:
-                json = await resp.json()
-            # print(f"createGQLClient: {json}")
-            token = json["token"]
-        return token
-
-    token = await getToken()
-    total_attempts = 10
-
-    async def client(query, variables, cookies={"authorization": token}):
-        # gqlurl = "http://host.docker.internal:33001/api/gql"
-        # gqlurl = "http://localhost:33001/api/gql"
-        nonlocal total_attempts
-        if total_attempts < 1:
-            raise Exception(
-                msg="Max attempts to reauthenticate to graphql endpoint has been reached"
-            )
-        attempts = 2
-        while attempts > 0:
-
-            payload = {"query": query, "variables": variables}
-            # print("Query payload", payload, flush=True)
-            try:
-                async with aiohttp.ClientSession() as session:
-                    # print(headers, cookies)
-                    async with session.post(url, json=payload, cookies=cookies) as resp:
-                        # print(resp.status)
-                        if resp.status != 200:
-                            text = await resp.text()
-                            # print(text, flush=True)
-                            raise Exception(f"Unexpected GQL response", text)
-                        else:
-                            text = await resp.text()
-                            # print(text, flush=True)
-                            response = await resp.json()
-                            # print(response, flush=True)
-                            return response
-            except aiohttp.ContentTypeError as e:
-                attempts = attempts - 1
-                total_attempts = total_attempts - 1
-                print(f"attempts {attempts}-{total_attempts}", flush=True)
-                nonlocal token
-                token = await getToken()
-
-    return client
-
-
 async def BasicChaStreamImplementation(context: dict):
     inQueue: asyncio.Queue = context["inQueue"]
     outQueue: asyncio.Queue = context["outQueue"]
@@ -178,10 +128,13 @@ async def BasicChaStreamImplementation(context: dict):
         response = await inQueue.get()
 
 
-async def openChat():
+async def openChat(user_id=None):
     gqlClient = None
-    gqlClient = await createGQLClient(
-        username="john.newbie@world.com", password="john.newbie@world.com"
+    # cache a úložiště entit se klíčují přihlášeným uživatelem aplikace
+    gqlClient = await createCachedGQLClient(
+        user=user_id,
+        username="john.newbie@world.com",
+        password="john.newbie@world.com",
     )
 
     skills = []
@@ -219,14 +172,33 @@ async def openChat():
     import json
 
     async def hook(user_input):
+        # podobná liked otázka: dotaz se spustí rovnou, jinak poslouží jako příklad
+        matches = await SEMANTIC_ANSWERS.matches(user_input)
+        answer = await SEMANTIC_ANSWERS.answer(matches, gqlClient)
+        if answer is not None:
+            content = json_codec.dumps(answer)
+            history.add_user_message(user_input)
+            history.add_assistant_message(content)
+            await history.reduce()
+            return ChatMessageContent(role=AuthorRole.ASSISTANT, content=content)
+
+        examples = SEMANTIC_ANSWERS.few_shot(matches)
+        if examples:
+            history.add_system_message(examples)
+            examples_message = history.messages[-1]
         history.add_user_message(user_input)
-        result = await azure_chat.get_chat_message_content(
-            chat_history=history,
-            settings=execution_settings,
-            kernel=kernel,
-            arguments=KernelArguments(),
-            result_type=str,
-        )
+        try:
+            result = await azure_chat.get_chat_message_content(
+                chat_history=history,
+                settings=execution_settings,
+                kernel=kernel,
+                arguments=KernelArguments(),
+                result_type=str,
+            )
+        finally:
+            # příklady platí jen pro tuto otázku
+            if examples:
+                history.messages.remove(examples_message)
         history.add_assistant_message(f"{result}")
         await history.reduce()
 
@@ -237,7 +209,7 @@ async def openChat():
 
 async def main():
     gqlClient = None
-    gqlClient = await createGQLClient(
+    gqlClient = await createCachedGQLClient(
         username="john.newbie@world.com", password="john.newbie@world.com"
     )
 
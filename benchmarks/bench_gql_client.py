@@ -0,0 +1,125 @@
+"""
+Benchmark: GraphQL client throughput against a local stand-in server.
+
+Starts an aiohttp server imitating `/oauth/login3` and `/api/gql` (a page of rows
+per request) and sends the same queries through the original `createGQLClient`
+(new `ClientSession` per request, read from git via `--ref`, the first commit by
+default) and through the pooled `GQLClient`.
+
+Usage:
+    python benchmarks/bench_gql_client.py [--requests 2000] [--concurrency 20] [--rows 50]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+from aiohttp import web
+
+top_level = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(top_level))
+
+from src.Utils.gql_client import createGQLClient
+
+QUERY = "query userPage($skip: Int, $limit: Int) { userPage(skip: $skip, limit: $limit) { id name email } }"
+
+
+def load_old_client(ref: str | None) -> types.ModuleType:
+    if not ref:
+        ref = subprocess.check_output(
+            ["git", "rev-list", "--max-parents=0", "HEAD"], cwd=top_level, text=True
+        ).split()[0]
+    source = subprocess.check_output(
+        ["git", "show", f"{ref}:src/Utils/gql_client.py"], cwd=top_level, text=True
+    )
+    module = types.ModuleType("gql_client_old")
+    exec(compile(source, "gql_client_old.py", "exec"), module.__dict__)
+    return module
+
+
+def create_app(rows: int) -> web.Application:
+    page = json.dumps(
+        {
+            "data": {
+                "userPage": [
+                    {"id": f"{i:08d}", "name": f"User {i}", "email": f"u{i}@world.com"}
+                    for i in range(rows)
+                ]
+            }
+        }
+    )
+
+    async def login(request: web.Request):
+        if request.method == "GET":
+            return web.json_response({"key": "stand-in"})
+        return web.json_response({"token": "stand-in-token"})
+
+    async def gql(request: web.Request):
+        await request.read()
+        return web.Response(text=page, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_route("*", "/oauth/login3", login)
+    app.router.add_post("/api/gql", gql)
+    return app
+
+
+async def measure(label: str, client, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            response = await client(QUERY, {"skip": i, "limit": 50})
+            assert "data" in response, response
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:9.1f} ms  {total / elapsed:9.1f} req/s")
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--port", type=int, default=33099)
+    parser.add_argument("--ref", default=None)
+    args = parser.parse_args()
+
+    runner = web.AppRunner(create_app(args.rows), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    url = f"http://127.0.0.1:{args.port}/api/gql"
+    credentials = {"username": "john.newbie@world.com", "password": "x"}
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, {args.rows} rows/page"
+    )
+
+    try:
+        old = load_old_client(args.ref)
+        old_client = await old.createGQLClient(url=url, **credentials)
+        old_time = await measure(
+            "session per request (old)", old_client, args.requests, args.concurrency
+        )
+
+        new_client = await createGQLClient(url=url, **credentials)
+        # zahřátí poolu, ať se měří jen ustálený stav
+        await measure("pooled session (warm-up)", new_client, 50, args.concurrency)
+        new_time = await measure(
+            "pooled session (new)", new_client, args.requests, args.concurrency
+        )
+        await new_client.close()
+        print(f"speedup {old_time / new_time:.1f}x, {new_client.stats()}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Benchmark: whole-body vs. streaming decoding of a large page response.
+
+A local stand-in server returns a synthetic `userPage` with `--rows` rows (50k by
+default). Each variant counts the rows and sums one field, like the aggregation in
+`runQueryAll`:
+
+- "text + json (old)": the original `createGQLClient` (`resp.text()` and `resp.json()`),
+  read from git via `--ref`, the first commit by default
+- "read + loads": the pooled `GQLClient.__call__`
+- "stream": `GQLClient.stream`, rows are decoded while the body arrives
+
+Reports wall time and the peak of Python allocations (tracemalloc, measured in
+a separate run).
+
+Usage:
+    python benchmarks/bench_gql_stream.py [--rows 50000] [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+from aiohttp import web
+
+top_level = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(top_level))
+
+from src.Utils.gql_client import createGQLClient
+
+QUERY = "query userPage($skip: Int, $limit: Int) { userPage(skip: $skip, limit: $limit) { id name email valid } }"
+
+
+def load_old_client(ref: str | None) -> types.ModuleType:
+    if not ref:
+        ref = subprocess.check_output(
+            ["git", "rev-list", "--max-parents=0", "HEAD"], cwd=top_level, text=True
+        ).split()[0]
+    source = subprocess.check_output(
+        ["git", "show", f"{ref}:src/Utils/gql_client.py"], cwd=top_level, text=True
+    )
+    module = types.ModuleType("gql_client_old")
+    exec(compile(source, "gql_client_old.py", "exec"), module.__dict__)
+    return module
+
+
+def create_app(rows: int) -> web.Application:
+    body = json.dumps(
+        {
+            "data": {
+                "userPage": [
+                    {
+                        "id": f"{i:08d}-0000-0000-0000-000000000000",
+                        "name": f"Uživatel {i}",
+                        "email": f"user{i}@world.com",
+                        "valid": i % 2,
+                    }
+                    for i in range(rows)
+                ]
+            }
+        }
+    ).encode()
+
+    async def login(request: web.Request):
+        if request.method == "GET":
+            return web.json_response({"key": "stand-in"})
+        return web.json_response({"token": "stand-in-token"})
+
+    async def gql(request: web.Request):
+        await request.read()
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        for start in range(0, len(body), 65536):
+            await response.write(body[start : start + 65536])
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_route("*", "/oauth/login3", login)
+    app.router.add_post("/api/gql", gql)
+    return app
+
+
+async def whole(client) -> tuple[int, int]:
+    response = await client(QUERY, {"skip": 0, "limit": 100000})
+    rows = next(iter(response["data"].values()))
+    return len(rows), sum(row["valid"] for row in rows)
+
+
+async def streamed(client) -> tuple[int, int]:
+    count = total = 0
+    async for row in client.stream(QUERY, {"skip": 0, "limit": 100000}):
+        count += 1
+        total += row["valid"]
+    return count, total
+
+
+async def measure(label, consume, client, rounds) -> tuple:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = await consume(client)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    await consume(client)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {best * 1000:9.1f} ms  peak {peak / 2**20:8.1f} MiB  {result}")
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--port", type=int, default=33097)
+    parser.add_argument("--ref", default=None)
+    args = parser.parse_args()
+
+    runner = web.AppRunner(create_app(args.rows), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    url = f"http://127.0.0.1:{args.port}/api/gql"
+    credentials = {"username": "john.newbie@world.com", "password": "x"}
+    print(f"{args.rows} rows")
+
+    try:
+        old_client = await load_old_client(args.ref).createGQLClient(
+            url=url, **credentials
+        )
+        client = await createGQLClient(url=url, **credentials)
+        expected = await measure("text + json (old)", whole, old_client, args.rounds)
+        assert await measure("read + loads", whole, client, args.rounds) == expected
+        assert await measure("stream", streamed, client, args.rounds) == expected
+        await client.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Benchmark: stdlib `json` vs. `src.Utils.json_codec` on the payload shapes of the app.
+
+- "gql page 100" / "gql page 1000": GraphQL page responses (decode of the body,
+  compact encode for cache keys and skills, indent=2 encode for GraphQLData)
+- "log record": one LogItem dict (JSONFormatter encode + LogBus decode)
+- "variables": LLM tool call variables (decode)
+
+Usage:
+    python benchmarks/bench_json_codec.py [--number 200]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+top_level = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(top_level))
+
+from src.Utils import json_codec
+
+
+def page(rows: int) -> dict:
+    return {
+        "data": {
+            "userPage": [
+                {
+                    "__typename": "UserGQLModel",
+                    "id": f"{i:08d}-4bb2-882d-0d762eab6f4a",
+                    "name": f"Zdeňka {i}",
+                    "surname": "Nováková",
+                    "email": f"user{i}@world.com",
+                    "valid": True,
+                    "lastchange": "2025-01-01T10:00:00",
+                    "memberships": [
+                        {"id": f"{i}-{j}", "group": {"id": f"g{j}", "name": "Katedra"}}
+                        for j in range(3)
+                    ],
+                }
+                for i in range(rows)
+            ]
+        }
+    }
+
+
+PAYLOADS = {
+    "gql page 100": page(100),
+    "gql page 1000": page(1000),
+    "log record": {
+        "ts": 1760000000.123,
+        "iso": "2025-10-09 10:13:20",
+        "level": "INFO",
+        "logger": "graphql",
+        "message": "GraphQL query run",
+        "module": "main",
+        "func": "run_graphql",
+        "line": 720,
+        "process": 1,
+        "thread": 140000000,
+        "user_id": "d1822e48-2f4b-405c-a429-e0c0a37dc8a6",
+        "req_id": "a1b2c3d4",
+        "task": "Task-12",
+        "exc_text": None,
+        "extra": {"preview": "query userPage($skip: Int, $limit: Int) {"},
+    },
+    "variables": {"where": {"name": {"_startswith": "Z"}}, "skip": 0, "limit": 100},
+}
+
+
+def bench(number: int, label: str, std, fast):
+    t_std = min(timeit.repeat(std, number=number, repeat=3)) / number
+    t_fast = min(timeit.repeat(fast, number=number, repeat=3)) / number
+    print(
+        f"{label:<32} {t_std * 1e6:10.1f} us {t_fast * 1e6:10.1f} us {t_std / t_fast:6.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"backend: {json_codec.BACKEND}")
+    print(f"{'':<32} {'json':>13} {'json_codec':>13} {'speedup':>7}")
+    for name, payload in PAYLOADS.items():
+        text = json.dumps(payload)
+        body = text.encode()
+        assert json_codec.loads(body) == payload
+        assert json_codec.loads(json_codec.dumps(payload, indent=2)) == payload
+        bench(
+            args.number,
+            f"{name}: loads",
+            lambda: json.loads(body),
+            lambda: json_codec.loads(body),
+        )
+        bench(
+            args.number,
+            f"{name}: dumps",
+            lambda: json.dumps(payload, ensure_ascii=False),
+            lambda: json_codec.dumps(payload),
+        )
+        bench(
+            args.number,
+            f"{name}: dumps indent=2",
+            lambda: json.dumps(payload, indent=2),
+            lambda: json_codec.dumps(payload, indent=2),
+        )
+
+
+if __name__ == "__main__":
+    main()
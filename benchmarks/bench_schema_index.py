@@ -0,0 +1,112 @@
+"""
+Benchmark: fragment generation with linear scans vs. SchemaIndex lookups.
+
+Runs build_medium_fragment and build_large_fragment for every OBJECT type of the
+federated schema in sdl/schema.graphql. The "old" variant is the original
+implementation read from git (`--ref`, the first commit by default), the "new" one
+uses a prebuilt SchemaIndex.
+
+Usage:
+    python benchmarks/bench_schema_index.py [--rounds 5] [--ref <commit>]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+from graphql import parse
+from graphql.language.ast import ObjectTypeDefinitionNode
+
+top_level = Path(__file__).resolve().parent.parent
+# importujeme Skills bez SemanticKernel/__init__.py (ten inicializuje Azure kernel)
+sys.path.insert(0, str(top_level / "SemanticKernel"))
+
+from Skills.utils_sdl_2 import (
+    SchemaIndex,
+    build_large_fragment,
+    build_medium_fragment,
+)
+
+
+def load_old_utils(ref: str | None) -> types.ModuleType:
+    if not ref:
+        ref = subprocess.check_output(
+            ["git", "rev-list", "--max-parents=0", "HEAD"], cwd=top_level, text=True
+        ).split()[0]
+    source = subprocess.check_output(
+        ["git", "show", f"{ref}:SemanticKernel/Skills/utils_sdl_2.py"],
+        cwd=top_level,
+        text=True,
+    )
+    module = types.ModuleType("utils_sdl_2_old")
+    exec(compile(source, "utils_sdl_2_old.py", "exec"), module.__dict__)
+    return module
+
+
+def run(label, medium, large, doc, type_names, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for name in type_names:
+            medium(doc, name)
+            large(doc, name)
+        best = min(best, time.perf_counter() - start)
+    per_type = best / len(type_names) * 1e6
+    print(f"{label:<28} {best * 1000:9.2f} ms  {per_type:9.1f} us/type")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--ref", default=os.getenv("BENCH_BASELINE_REF"))
+    parser.add_argument("--sdl", default=str(top_level / "sdl" / "schema.graphql"))
+    args = parser.parse_args()
+
+    with open(args.sdl, "r", encoding="utf-8") as f:
+        doc = parse(f.read())
+    type_names = [
+        d.name.value
+        for d in doc.definitions
+        if isinstance(d, ObjectTypeDefinitionNode)
+    ]
+    print(f"{len(doc.definitions)} definitions, {len(type_names)} object types")
+
+    old = load_old_utils(args.ref)
+    for name in type_names:
+        assert old.build_medium_fragment(doc, name) == build_medium_fragment(
+            doc, name
+        ), name
+        assert old.build_large_fragment(doc, name) == build_large_fragment(
+            doc, name
+        ), name
+
+    start = time.perf_counter()
+    index = SchemaIndex(doc)
+    print(f"{'SchemaIndex build':<28} {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+    t_old = run(
+        "old (linear scans)",
+        old.build_medium_fragment,
+        old.build_large_fragment,
+        doc,
+        type_names,
+        args.rounds,
+    )
+    t_new = run(
+        "new (SchemaIndex)",
+        build_medium_fragment,
+        build_large_fragment,
+        index,
+        type_names,
+        args.rounds,
+    )
+    print(f"speedup {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
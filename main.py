@@ -9,10 +9,20 @@ import asyncio
 from fastapi import FastAPI, Request, Response
 from SemanticKernel import (
     createGQLClient,
+    close_gql_clients,
     openChat,
 )
 from History.chatHistory import UserChatHistory
+from sdl.sdl_fetch import get_schema_provider
 from Database.Embedding.add_to_db import add_embedding_row
+from Database.Embedding.embeding import EMBEDDING_CACHE, EMBEDDING_CLIENT
+from Database.Embedding.embedding_cache import (
+    register_prometheus_collector as register_embedding_collector,
+)
+from Database.connection import (
+    close_pool,
+    register_prometheus_collector as register_db_pool_collector,
+)
 
 
 from src.Utils.on_button_press import (
@@ -22,9 +32,14 @@ from src.Utils.on_button_press import (
     on_dislike_click,
 )
 from src.Utils.graphQLdata import GraphQLData
+from src.Utils.gql_stack import createCachedGQLClient
+from src.Utils.gql_stream import GQL_STREAM_ROWS
+from src.Utils.gql_guard import register_prometheus_collector
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 import logging, uuid, contextvars
 from src.Utils.log_bus import LOG_BUS, LEVEL_COLORS, setup_logging
+from src.Utils import json_codec
 from starlette.middleware.base import BaseHTTPMiddleware
 from pathlib import Path
 import tempfile
@@ -64,7 +79,7 @@ async def get_user_chat_hook(user_id: str):
     """Get or create a chat hook for a specific user"""
     if user_id not in user_chats:
         # Create a new chat hook for this user
-        user_chats[user_id] = await openChat()
+        user_chats[user_id] = await openChat(user_id)
     return user_chats[user_id]
 
 
@@ -84,11 +99,19 @@ async def startup_gql_client():
     logging.getLogger("selftest").info("LogBus OK - startup reached")
 
     # 3) inicializace GQL klienta
-    gql_client = await createGQLClient(
+    gql_client = await createCachedGQLClient(
         username="john.newbie@world.com", password="john.newbie@world.com"
     )
     logging.getLogger("app.startup").info("GraphQL client ready")
 
+    # 4) nahřátí cache schématu, další obnovy běží na pozadí
+    schema_provider = get_schema_provider()
+    await schema_provider.aget()
+    schema_provider.start_refresher()
+    logging.getLogger("app.startup").info(
+        "GraphQL schema cached", extra=schema_provider.stats()
+    )
+
 
 from nicegui import core
 import nicegui
@@ -104,9 +127,30 @@ class LogContextMiddleware(BaseHTTPMiddleware):
             current_req.reset(rid_token)
 
 
-app = FastAPI(on_startup=[startup_gql_client])
+async def shutdown_gql_client():
+    get_schema_provider().stop_refresher()
+    await close_gql_clients()
+    logging.getLogger("app.shutdown").info("GraphQL client sessions closed")
+    await EMBEDDING_CLIENT.close()
+    logging.getLogger("app.shutdown").info("Embedding client session closed")
+    close_pool()
+    logging.getLogger("app.shutdown").info("Database connection pool closed")
+
+
+app = FastAPI(on_startup=[startup_gql_client], on_shutdown=[shutdown_gql_client])
 
 app.add_middleware(LogContextMiddleware)
+
+# stav circuit breakerů a limitů subgrafů pro Prometheus (DockerStack/prometheus)
+register_prometheus_collector()
+register_embedding_collector(EMBEDDING_CACHE)
+register_db_pool_collector()
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 log_chat = logging.getLogger("chat")
 log_gql = logging.getLogger("graphql")
 log_auth = logging.getLogger("auth")
@@ -266,7 +310,7 @@ async def index_page(request: Request):
 
             with open(path, "w", encoding="utf-8") as f:
                 for r in rows:
-                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+                    f.write(json_codec.dumps(r) + "\n")
 
             ui.download(str(path))
 
@@ -473,7 +517,9 @@ async def index_page(request: Request):
 
         # 🔹 Uložení do historie
         history.add_entry(question=question, answer=result)
-        add_chat_history(
+        # čekání na spojení z poolu nesmí blokovat smyčku UI
+        await asyncio.to_thread(
+            add_chat_history,
             message=question,
             answer=result,
             user_id=user_id,
@@ -725,12 +771,14 @@ async def index_page(request: Request):
                 # vykresli widget
                 with gql_container:
                     GraphQLData(
-                        gqlclient=gql_client,
+                        gqlclient=gql_client.for_user(user_id),
                         query=query,
                         variables=variables,
                         result=None,
                         metadata=None,
                         autoload=True,
+                        # velké stránky se přidávají do tabulky už během stahování
+                        stream=GQL_STREAM_ROWS,
                     )
 
             ui.button("Run query", on_click=run_graphql).props("color=primary").classes(
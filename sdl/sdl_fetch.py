@@ -1,4 +1,14 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
 import requests
+from graphql import GraphQLSchema, build_ast_schema, parse
+from graphql.language.ast import DocumentNode
 
 
 def getToken(
@@ -55,3 +65,209 @@ def fetch_sdl(token: str = "", url: str = "http://localhost:33001/api/gql"):
     sdl = data["data"]["_service"]["sdl"]
 
     return sdl.replace("\\n, ", "\n")
+
+
+# ---------------------------------------------------------------------------
+# Sdílená cache schématu (SDL text + AST + GraphQLSchema)
+# ---------------------------------------------------------------------------
+
+SDL_CACHE_TTL = float(os.getenv("SDL_CACHE_TTL", "300"))
+
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    """
+    One fetched version of the federated schema.
+
+    Attributes:
+        sdl (str): raw SDL text as returned by `_service { sdl }`
+        ast (DocumentNode): parsed SDL
+        schema (GraphQLSchema): schema built from `ast`
+        version (str): sha256 of the SDL text, changes whenever the schema changes
+        fetched_at (float): `time.monotonic()` of the fetch
+    """
+
+    sdl: str
+    ast: DocumentNode
+    schema: GraphQLSchema
+    version: str
+    fetched_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_sdl(cls, sdl: str) -> "SchemaSnapshot":
+        ast = parse(sdl)
+        return cls(
+            sdl=sdl,
+            ast=ast,
+            schema=build_ast_schema(ast),
+            version=hashlib.sha256(sdl.encode("utf-8")).hexdigest(),
+        )
+
+
+class SchemaProvider:
+    """
+    Process-wide holder of the current `SchemaSnapshot`.
+
+    The first caller fetches the schema (concurrent callers wait for the same fetch),
+    every later caller is served from memory. Once the snapshot is older than `ttl`
+    seconds the stale one is still returned and a single background refresh is started.
+
+    Args:
+        fetcher: callable returning the SDL text, defaults to `fetch_sdl`
+        ttl: snapshot lifetime in seconds, defaults to env `SDL_CACHE_TTL` (300)
+    """
+
+    def __init__(
+        self, fetcher: Optional[Callable[[], str]] = None, ttl: Optional[float] = None
+    ):
+        self.fetcher = fetcher or fetch_sdl
+        self.ttl = SDL_CACHE_TTL if ttl is None else ttl
+        self._snapshot: Optional[SchemaSnapshot] = None
+        self._lock = threading.Lock()
+        self._flag_lock = threading.Lock()
+        self._refreshing = False
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_refresh_seconds = 0.0
+        self.total_refresh_seconds = 0.0
+
+    @property
+    def snapshot(self) -> Optional[SchemaSnapshot]:
+        return self._snapshot
+
+    def _is_stale(self, snapshot: SchemaSnapshot) -> bool:
+        return time.monotonic() - snapshot.fetched_at > self.ttl
+
+    def get(self) -> SchemaSnapshot:
+        """Returns the cached snapshot, fetching it synchronously only on a cold cache."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self.hits += 1
+            if self._is_stale(snapshot):
+                self._refresh_in_background()
+            return snapshot
+
+        with self._lock:
+            # jiný thread mohl mezitím schéma stáhnout
+            if self._snapshot is not None:
+                self.hits += 1
+                return self._snapshot
+            self.misses += 1
+            return self._refresh_locked()
+
+    async def aget(self) -> SchemaSnapshot:
+        """Async variant of `get`, a cold fetch does not block the event loop."""
+        if self._snapshot is not None:
+            return self.get()
+        return await asyncio.to_thread(self.get)
+
+    def refresh(self) -> SchemaSnapshot:
+        """Fetches the schema now and replaces the cached snapshot."""
+        with self._lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> SchemaSnapshot:
+        start = time.perf_counter()
+        try:
+            sdl = self.fetcher()
+            current = self._snapshot
+            if current is not None and current.sdl == sdl:
+                # stejná verze, jen prodloužíme platnost (odvozené struktury zůstanou)
+                snapshot = SchemaSnapshot(
+                    sdl=current.sdl,
+                    ast=current.ast,
+                    schema=current.schema,
+                    version=current.version,
+                )
+            else:
+                snapshot = SchemaSnapshot.from_sdl(sdl)
+        except Exception:
+            self.refresh_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.last_refresh_seconds = elapsed
+            self.total_refresh_seconds += elapsed
+        self.refreshes += 1
+        self._snapshot = snapshot
+        return snapshot
+
+    def _refresh_in_background(self):
+        with self._flag_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"SDL background refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="sdl-refresh", daemon=True).start()
+
+    def start_refresher(self):
+        """Starts a daemon thread which refreshes the snapshot every `ttl` seconds."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(self.ttl):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"SDL periodic refresh failed: {e}")
+
+        self._refresher = threading.Thread(
+            target=loop, name="sdl-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+
+    def invalidate(self):
+        """Drops the cached snapshot, the next `get` fetches the schema again."""
+        self._snapshot = None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "total_refresh_seconds": self.total_refresh_seconds,
+            "version": snapshot.version if snapshot else None,
+            "age_seconds": (
+                time.monotonic() - snapshot.fetched_at if snapshot else None
+            ),
+        }
+
+
+_provider: Optional[SchemaProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_schema_provider() -> SchemaProvider:
+    """Returns the process-wide `SchemaProvider`."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = SchemaProvider()
+    return _provider
+
+
+def get_schema_snapshot() -> SchemaSnapshot:
+    """Shortcut for `get_schema_provider().get()`."""
+    return get_schema_provider().get()
@@ -0,0 +1,277 @@
+import os
+import threading
+import time
+from functools import lru_cache
+
+from graphql import parse, GraphQLError, get_named_type, is_leaf_type
+from graphql.language.ast import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+)
+
+GQL_FIELD_HEALTH_HALF_LIFE = float(os.getenv("GQL_FIELD_HEALTH_HALF_LIFE", "600"))
+GQL_FIELD_MIN_SAMPLES = float(os.getenv("GQL_FIELD_MIN_SAMPLES", "5"))
+GQL_FIELD_ERROR_RATE = float(os.getenv("GQL_FIELD_ERROR_RATE", "0.5"))
+GQL_FIELD_SLOW_SECONDS = float(os.getenv("GQL_FIELD_SLOW_SECONDS", "5"))
+# vždy vynechaná pole, `pole` (v každém typu) nebo `Typ.pole`
+GQL_FIELDS_DISABLED = os.getenv("GQL_FIELDS_DISABLED", "events,plannedLessons")
+
+
+class _Score:
+    """Exponentially decaying request, error and latency sums of one field."""
+
+    __slots__ = ("requests", "errors", "timed", "seconds", "updated")
+
+    def __init__(self):
+        self.requests = 0.0
+        self.errors = 0.0
+        # vzorky s latencí z tracingu
+        self.timed = 0.0
+        self.seconds = 0.0
+        self.updated = time.monotonic()
+
+    def decay(self, now: float, half_life: float):
+        factor = 0.5 ** ((now - self.updated) / half_life) if half_life > 0 else 1.0
+        self.requests *= factor
+        self.errors *= factor
+        self.timed *= factor
+        self.seconds *= factor
+        self.updated = now
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    @property
+    def latency(self) -> float:
+        return self.seconds / self.timed if self.timed else 0.0
+
+
+def _selected_fields(schema, document, operation):
+    """
+    Walks the operation, yields (path of response keys, parent type, field name, leaf)
+    for every selected field. Fragment cycles are not followed.
+    """
+    fragments = {
+        d.name.value: d
+        for d in document.definitions
+        if isinstance(d, FragmentDefinitionNode)
+    }
+    root = schema.get_root_type(operation.operation)
+
+    def walk(selection_set, parent, path, seen):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                field = parent.fields.get(name) if hasattr(parent, "fields") else None
+                if field is None:
+                    continue
+                key = path + ((selection.alias or selection.name).value,)
+                field_type = get_named_type(field.type)
+                yield key, parent.name, name, is_leaf_type(field_type)
+                if selection.selection_set is not None:
+                    yield from walk(selection.selection_set, field_type, key, seen)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                target = schema.get_type(condition.name.value) if condition else parent
+                yield from walk(selection.selection_set, target or parent, path, seen)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = fragments.get(name)
+                if fragment is None or name in seen:
+                    continue
+                target = schema.get_type(fragment.type_condition.name.value) or parent
+                yield from walk(fragment.selection_set, target, path, seen | {name})
+
+    if root is None:
+        return
+    yield from walk(operation.selection_set, root, (), frozenset())
+
+
+@lru_cache(maxsize=512)
+def query_fields(schema, query: str) -> dict[tuple, tuple[str, str, bool]]:
+    """Response key path -> (parent type, field name, leaf) of a single-operation query."""
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return {}
+    operations = [
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    ]
+    if len(operations) != 1:
+        return {}
+    return {
+        path: (parent, name, leaf)
+        for path, parent, name, leaf in _selected_fields(
+            schema, document, operations[0]
+        )
+    }
+
+
+def parse_disabled(text: str) -> tuple[frozenset, frozenset]:
+    """Returns (field names disabled in every type, (type, field) pairs)."""
+    names, pairs = set(), set()
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        type_name, _, field_name = item.rpartition(".")
+        if type_name:
+            pairs.add((type_name, field_name))
+        else:
+            names.add(field_name)
+    return frozenset(names), frozenset(pairs)
+
+
+class FieldHealth:
+    """
+    Decaying per-`(type, field)` error rate and latency of executed queries.
+
+    Errors are attributed by `errors[].path` to the field which failed. Latency is
+    only counted from resolver tracing (`extensions.tracing`) which names the slow
+    resolver. The whole request time says nothing about which field was slow, so
+    without tracing a field can only be excluded for its errors.
+    Old samples fade out with `half_life`, so an excluded field is tried again once
+    its decayed sample count drops under `min_samples`.
+
+    Args:
+        half_life: seconds after which a sample counts half (env `GQL_FIELD_HEALTH_HALF_LIFE`)
+        min_samples: decayed samples needed for an automatic exclusion (env `GQL_FIELD_MIN_SAMPLES`)
+        error_rate: error ratio which excludes a field (env `GQL_FIELD_ERROR_RATE`)
+        slow_seconds: latency which excludes a relation field (env `GQL_FIELD_SLOW_SECONDS`)
+        disabled: always excluded fields, `field` or `Type.field` (env `GQL_FIELDS_DISABLED`)
+    """
+
+    def __init__(
+        self,
+        half_life: float | None = None,
+        min_samples: float | None = None,
+        error_rate: float | None = None,
+        slow_seconds: float | None = None,
+        disabled: str | None = None,
+    ):
+        self.half_life = GQL_FIELD_HEALTH_HALF_LIFE if half_life is None else half_life
+        self.min_samples = GQL_FIELD_MIN_SAMPLES if min_samples is None else min_samples
+        self.error_rate = GQL_FIELD_ERROR_RATE if error_rate is None else error_rate
+        self.slow_seconds = (
+            GQL_FIELD_SLOW_SECONDS if slow_seconds is None else slow_seconds
+        )
+        self.disabled_names, self.disabled_pairs = parse_disabled(
+            GQL_FIELDS_DISABLED if disabled is None else disabled
+        )
+        self._scores: dict[tuple[str, str], _Score] = {}
+        self._lock = threading.Lock()
+
+        self.responses = 0
+
+    def observe(self, query: str, response, seconds: float, schema=None):
+        """
+        Records one executed query and its response. `seconds` of the whole request
+        is not attributed to any field.
+        """
+        if schema is None:
+            from sdl.sdl_fetch import get_schema_provider
+
+            snapshot = get_schema_provider().snapshot
+            if snapshot is None:
+                return
+            schema = snapshot.schema
+        if not isinstance(response, dict):
+            return
+        fields = query_fields(schema, query)
+        if not fields:
+            return
+
+        failed = set()
+        for error in response.get("errors") or []:
+            if not isinstance(error, dict):
+                continue
+            path = tuple(p for p in (error.get("path") or []) if isinstance(p, str))
+            if path in fields:
+                failed.add(fields[path][:2])
+
+        traced = {}
+        tracing = (response.get("extensions") or {}).get("tracing") or {}
+        for resolver in (tracing.get("execution") or {}).get("resolvers") or []:
+            key = (resolver.get("parentType"), resolver.get("fieldName"))
+            # nanosekundy, u seznamů rozhoduje nejpomalejší položka
+            traced[key] = max(
+                traced.get(key, 0.0), (resolver.get("duration") or 0) / 1e9
+            )
+
+        now = time.monotonic()
+        with self._lock:
+            self.responses += 1
+            for key in {(t, f) for t, f, _ in fields.values()}:
+                score = self._scores.get(key)
+                if score is None:
+                    score = self._scores[key] = _Score()
+                score.decay(now, self.half_life)
+                score.requests += 1
+                score.errors += key in failed
+                if key in traced:
+                    score.timed += 1
+                    score.seconds += traced[key]
+
+    def _is_unhealthy(self, score: _Score) -> bool:
+        # rozpadlý počet vzorků není nikdy přesně celé číslo
+        enough = self.min_samples - 0.01
+        return (score.requests >= enough and score.error_rate >= self.error_rate) or (
+            score.timed >= enough and score.latency >= self.slow_seconds
+        )
+
+    def excluded(self) -> frozenset:
+        """
+        `(type, field)` pairs currently over the error or latency threshold plus the
+        disabled ones, disabled field names as plain strings. Accepted as `excluded`
+        by the fragment builders of `utils_sdl_2`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            result = set()
+            for key, score in self._scores.items():
+                score.decay(now, self.half_life)
+                if self._is_unhealthy(score):
+                    result.add(key)
+        return frozenset(result | self.disabled_pairs | self.disabled_names)
+
+    def is_disabled(self, type_name: str, field_name: str, excluded=()) -> bool:
+        return (
+            field_name in self.disabled_names
+            or (type_name, field_name) in self.disabled_pairs
+            or (type_name, field_name) in excluded
+        )
+
+    def stats(self, limit: int = 20) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            for score in self._scores.values():
+                score.decay(now, self.half_life)
+            worst = sorted(
+                self._scores.items(),
+                key=lambda item: (item[1].error_rate, item[1].latency),
+                reverse=True,
+            )[:limit]
+            unhealthy = sum(self._is_unhealthy(s) for s in self._scores.values())
+        return {
+            "responses": self.responses,
+            "fields": len(self._scores),
+            "excluded": unhealthy,
+            "disabled": sorted(self.disabled_names)
+            + sorted(f"{t}.{f}" for t, f in self.disabled_pairs),
+            "worst": [
+                {
+                    "field": f"{t}.{f}",
+                    "samples": round(s.requests, 2),
+                    "error_rate": s.error_rate,
+                    "latency": s.latency,
+                }
+                for (t, f), s in worst
+            ],
+        }
+
+
+FIELD_HEALTH = FieldHealth()
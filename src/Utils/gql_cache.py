@@ -0,0 +1,278 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from graphql import parse, print_ast, GraphQLError, get_named_type
+from graphql.language.ast import (
+    FieldNode,
+    OperationDefinitionNode,
+    OperationType,
+)
+
+from src.Utils import json_codec
+from src.Utils.gql_entities import EntityStore, ENTITY_STORE
+from src.Utils.gql_paging import PagingMixin
+
+GQL_CACHE_SIZE = int(os.getenv("GQL_CACHE_SIZE", "1024"))
+GQL_CACHE_TTL = float(os.getenv("GQL_CACHE_TTL", "60"))
+# např. "UserGQLModel=600,EventGQLModel=30"
+GQL_CACHE_TYPE_TTLS = os.getenv("GQL_CACHE_TYPE_TTLS", "")
+
+
+def parse_type_ttls(text: str) -> dict[str, float]:
+    ttls = {}
+    for item in text.split(","):
+        name, _, value = item.strip().partition("=")
+        if name and value:
+            ttls[name.strip()] = float(value)
+    return ttls
+
+
+@lru_cache(maxsize=512)
+def canonical_query(query: str) -> tuple[str | None, tuple[str, ...]]:
+    """
+    Returns (printed query, root field names) for a read-only query, printed query
+    is None for mutations, subscriptions and unparsable text.
+    """
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None, ()
+    roots = []
+    for d in document.definitions:
+        if isinstance(d, OperationDefinitionNode):
+            if d.operation != OperationType.QUERY:
+                return None, ()
+            roots.extend(
+                s.name.value
+                for s in d.selection_set.selections
+                if isinstance(s, FieldNode)
+            )
+    return print_ast(document), tuple(roots)
+
+
+def _schema():
+    from sdl.sdl_fetch import get_schema_provider
+
+    snapshot = get_schema_provider().snapshot
+    return None if snapshot is None else snapshot.schema
+
+
+def root_types(root_fields: tuple[str, ...]) -> tuple[str, ...]:
+    """Result type names of `Query` root fields, from the currently cached schema."""
+    schema = _schema()
+    if schema is None or schema.query_type is None:
+        return ()
+    fields = schema.query_type.fields
+    return tuple(
+        get_named_type(fields[name].type).name for name in root_fields if name in fields
+    )
+
+
+class GQLResponseCache:
+    """
+    LRU cache of GraphQL responses with a TTL chosen by the result types.
+
+    Keys are `(user, canonical query, canonical variables)`. The TTL of an entry is
+    the smallest TTL of the types returned by its root fields.
+
+    Args:
+        maxsize: max. number of cached responses (env `GQL_CACHE_SIZE`)
+        default_ttl: seconds for types without own TTL (env `GQL_CACHE_TTL`)
+        type_ttls: type name -> seconds (env `GQL_CACHE_TYPE_TTLS`, `Type=seconds,...`)
+    """
+
+    def __init__(
+        self,
+        maxsize: int | None = None,
+        default_ttl: float | None = None,
+        type_ttls: dict[str, float] | None = None,
+    ):
+        self.maxsize = GQL_CACHE_SIZE if maxsize is None else maxsize
+        self.default_ttl = GQL_CACHE_TTL if default_ttl is None else default_ttl
+        self.type_ttls = (
+            parse_type_ttls(GQL_CACHE_TYPE_TTLS) if type_ttls is None else type_ttls
+        )
+        # key -> (expires_at, types, response)
+        self._entries: OrderedDict[tuple, tuple[float, tuple, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, types: tuple[str, ...]) -> float:
+        return min(
+            (self.type_ttls.get(t, self.default_ttl) for t in types),
+            default=self.default_ttl,
+        )
+
+    def get(self, key: tuple) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: tuple, types: tuple[str, ...], response: dict):
+        ttl = self.ttl_for(types)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, types, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user=None, type_name: str | None = None):
+        """Drops entries of `user` (all users if None) touching `type_name` (all if None)."""
+        with self._lock:
+            for key in [
+                key
+                for key, (_, types, _) in self._entries.items()
+                if (user is None or key[0] == user)
+                and (type_name is None or type_name in types)
+            ]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bypassed": self.bypassed,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+
+RESPONSE_CACHE = GQLResponseCache()
+
+
+class CachingGQLClient(PagingMixin):
+    """
+    Serves repeated read-only queries of one user from `GQLResponseCache`.
+
+    Mutations, subscriptions, requests with explicit cookies and responses with
+    errors are never cached. Callers get a copy, so they may modify it. Unknown
+    attributes are delegated to the wrapped client.
+
+    Entities of the cached responses are also merged into the normalized
+    `EntityStore`, which answers a query for one entity by `id` when all selected
+    fields are already known. Entities returned by a mutation are dropped from the
+    store and cached responses of their types are invalidated, for all users.
+
+    Args:
+        client: async callable (query, variables, cookies=None) -> response
+        cache: shared cache, `RESPONSE_CACHE` by default
+        user: id of the authenticated app user the entries belong to; None keys them
+            as shared by everyone (all app sessions log in with one GraphQL account)
+        entities: shared entity store, `ENTITY_STORE` by default
+    """
+
+    def __init__(
+        self,
+        client,
+        cache: GQLResponseCache | None = None,
+        user=None,
+        entities: EntityStore | None = None,
+    ):
+        self.client = client
+        self.cache = RESPONSE_CACHE if cache is None else cache
+        self.user = user
+        self.entities = ENTITY_STORE if entities is None else entities
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def for_user(self, user) -> "CachingGQLClient":
+        """The same client, cache and entity store, with entries keyed by `user`."""
+        return CachingGQLClient(self.client, self.cache, user, self.entities)
+
+    def stream(self, query, variables, chunk_size: int | None = None):
+        """Streamed rows are not cached, the page is never held as a whole."""
+        return self.client.stream(query, variables, chunk_size)
+
+    async def __call__(self, query, variables, cookies=None):
+        printed, roots = canonical_query(query)
+        if printed is None or cookies is not None:
+            self.cache.bypassed += 1
+            response = await self.client(query, variables, cookies)
+            if printed is None and isinstance(response, dict) and response.get("data"):
+                self._invalidate(query, variables, response["data"], cookies is None)
+            return response
+
+        key = (
+            self.user,
+            printed,
+            json_codec.dumps(variables or {}, sort_keys=True, default=str),
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        # odpověď se sestaví z nových objektů, kopie není potřeba
+        local = self.entities.read_query(self.user, query, variables, _schema())
+        if local is not None:
+            return local
+
+        response = await self.client(query, variables)
+        if (
+            isinstance(response, dict)
+            and response.get("data")
+            and not response.get("errors")
+        ):
+            self.cache.put(key, root_types(roots), copy.deepcopy(response))
+            self.entities.write(
+                self.user,
+                query,
+                variables,
+                response["data"],
+                lambda type_name: self.cache.ttl_for((type_name,)),
+                schema=_schema(),
+            )
+        return response
+
+    def _invalidate(self, query, variables, data, store: bool):
+        # výsledek mutace nahradí entity všech uživatelů, s cizími cookies se neukládá
+        types = self.entities.write(
+            self.user,
+            query,
+            variables,
+            data,
+            (
+                (lambda type_name: self.cache.ttl_for((type_name,)))
+                if store
+                else (lambda _: 0)
+            ),
+            replace=True,
+            schema=_schema(),
+        )
+        for type_name in types:
+            self.cache.invalidate(type_name=type_name)
+
+    def stats(self) -> dict:
+        inner = getattr(self.client, "stats", None)
+        return {
+            "cache": self.cache.stats(),
+            "entities": self.entities.stats(),
+            **({"client": inner()} if callable(inner) else {}),
+        }
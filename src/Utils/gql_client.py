@@ -1,55 +1,423 @@
-async def createGQLClient(*, url: str = "http://localhost:33001/api/gql", username: str, password: str):
-    import aiohttp
-    async def getToken():
-        authurl = url.replace("/api/gql", "/oauth/login3")
-        async with aiohttp.ClientSession() as session:
-            # print(headers, cookies)
-            async with session.get(authurl) as resp:
-                json = await resp.json()
-
-            payload = {
-                **json,
-                "username": username,
-                "password": password
-            }
-            async with session.post(authurl, json=payload) as resp:
-                json = await resp.json()
-            # print(f"createGQLClient: {json}")
-            token = json["token"]
-        return token
-    token = await getToken()
-    total_attempts = 10
-    async def client(query, variables, cookies={"authorization": token}):
-        # gqlurl = "http://host.docker.internal:33001/api/gql"
-        # gqlurl = "http://localhost:33001/api/gql"
-        nonlocal total_attempts
-        if total_attempts < 1:
-            raise Exception(msg="Max attempts to reauthenticate to graphql endpoint has been reached")
+import asyncio
+import base64
+import binascii
+import os
+import time
+import weakref
+from typing import AsyncIterator, Awaitable, Callable
+
+import aiohttp
+
+from src.Utils import json_codec
+from src.Utils.gql_paging import PagingMixin
+from src.Utils.gql_persisted import (
+    APQ_REGISTRY,
+    GQL_APQ,
+    NOT_FOUND,
+    NOT_SUPPORTED,
+    PersistedQueryRegistry,
+    is_read_only,
+    persisted_error,
+    persisted_extensions,
+    query_hash,
+)
+from src.Utils.gql_stream import RowStreamDecoder
+
+GQL_POOL_LIMIT = int(os.getenv("GQL_POOL_LIMIT", "100"))
+GQL_POOL_LIMIT_PER_HOST = int(os.getenv("GQL_POOL_LIMIT_PER_HOST", "0"))
+GQL_KEEPALIVE_TIMEOUT = float(os.getenv("GQL_KEEPALIVE_TIMEOUT", "30"))
+GQL_DNS_CACHE_TTL = int(os.getenv("GQL_DNS_CACHE_TTL", "300"))
+GQL_REQUEST_TIMEOUT = float(os.getenv("GQL_REQUEST_TIMEOUT", "60"))
+GQL_STREAM_CHUNK_SIZE = int(os.getenv("GQL_STREAM_CHUNK_SIZE", "65536"))
+GQL_TOKEN_REFRESH_MARGIN = float(os.getenv("GQL_TOKEN_REFRESH_MARGIN", "60"))
+GQL_TOKEN_DEFAULT_TTL = float(os.getenv("GQL_TOKEN_DEFAULT_TTL", "3600"))
+
+# všichni živí klienti, aby je šlo zavřít při vypnutí aplikace
+_clients: "weakref.WeakSet[GQLClient]" = weakref.WeakSet()
+
+
+class TokenRejectedError(Exception):
+    """The endpoint refused the token (401/403 or an HTML login page), log in again."""
+
+
+def is_json_type(content_type: str) -> bool:
+    """`application/json` or `application/*+json` (e.g. `application/graphql-response+json`)."""
+    return content_type == "application/json" or (
+        content_type.startswith("application/") and content_type.endswith("+json")
+    )
+
+
+def _rejected(resp) -> bool:
+    return resp.status in (401, 403) or resp.content_type == "text/html"
+
+
+def token_expiry(token: str) -> float | None:
+    """Returns the `exp` claim of a JWT (unix time) or None if it cannot be read."""
+    # podpis se neověřuje, stačí payload (druhá část, base64url bez paddingu)
+    parts = token.split(".") if isinstance(token, str) else []
+    if len(parts) != 3:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4))
+        claims = json_codec.loads(payload)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(claims, dict):
+        return None
+    exp = claims.get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class TokenManager:
+    """
+    Holds the authorization token shared by all requests of one client.
+
+    The token is refreshed proactively `refresh_margin` seconds before its JWT
+    expiry. Concurrent refreshes are single-flight: the first caller logs in,
+    the others wait for it and reuse the new token.
+
+    Args:
+        login: coroutine function returning a fresh token
+        refresh_margin: seconds before `exp` when the token is refreshed (env `GQL_TOKEN_REFRESH_MARGIN`)
+        default_ttl: lifetime assumed for tokens without `exp` (env `GQL_TOKEN_DEFAULT_TTL`)
+    """
+
+    def __init__(
+        self,
+        login: Callable[[], Awaitable[str]],
+        refresh_margin: float | None = None,
+        default_ttl: float | None = None,
+    ):
+        self.login = login
+        self.refresh_margin = (
+            GQL_TOKEN_REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        )
+        self.default_ttl = GQL_TOKEN_DEFAULT_TTL if default_ttl is None else default_ttl
+        self.token: str | None = None
+        self.expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+        self.logins = 0
+        self.login_errors = 0
+        self.coalesced = 0
+
+    def is_fresh(self) -> bool:
+        return (
+            self.token is not None
+            and time.time() < self.expires_at - self.refresh_margin
+        )
+
+    async def get(self) -> str:
+        """Returns a valid token, logging in only when it is missing or expiring."""
+        if self.is_fresh():
+            return self.token
+        return await self.refresh()
+
+    async def refresh(self, stale: str | None = None) -> str:
+        """
+        Logs in again unless another caller already replaced the token.
+
+        Args:
+            stale: token which was rejected by the server, if any
+        """
+        async with self._lock:
+            if stale is not None:
+                # token odmítnutý serverem je potřeba vyměnit, i když ještě neexpiroval
+                done = self.token is not None and self.token != stale
+            else:
+                done = self.is_fresh()
+            if done:
+                self.coalesced += 1
+                return self.token
+            try:
+                token = await self.login()
+            except Exception:
+                self.login_errors += 1
+                raise
+            self.logins += 1
+            self.token = token
+            self.expires_at = token_expiry(token) or time.time() + self.default_ttl
+            return token
+
+    def stats(self) -> dict:
+        return {
+            "logins": self.logins,
+            "login_errors": self.login_errors,
+            "coalesced": self.coalesced,
+            "expires_in": self.expires_at - time.time() if self.token else None,
+        }
+
+
+class GQLClient(PagingMixin):
+    """
+    GraphQL client owning one long-lived, pooled `aiohttp.ClientSession`.
+
+    The instance is callable as `await client(query, variables)`, so it can be used
+    wherever the former closure from `createGQLClient` was expected.
+
+    Args:
+        url: GraphQL endpoint, the login endpoint is derived from it
+        username: login name
+        password: login password
+        limit: max. number of open connections (env `GQL_POOL_LIMIT`)
+        limit_per_host: max. connections per host, 0 = unlimited (env `GQL_POOL_LIMIT_PER_HOST`)
+        keepalive_timeout: seconds an idle connection is kept (env `GQL_KEEPALIVE_TIMEOUT`)
+        dns_cache_ttl: seconds a resolved address is cached (env `GQL_DNS_CACHE_TTL`)
+        timeout: total timeout of one request in seconds (env `GQL_REQUEST_TIMEOUT`)
+        persisted: send automatic persisted queries, see `gql_persisted` (env `GQL_APQ`)
+        registry: hashes accepted by the server, `APQ_REGISTRY` by default
+    """
+
+    def __init__(
+        self,
+        *,
+        url: str = "http://localhost:33001/api/gql",
+        username: str,
+        password: str,
+        limit: int | None = None,
+        limit_per_host: int | None = None,
+        keepalive_timeout: float | None = None,
+        dns_cache_ttl: int | None = None,
+        timeout: float | None = None,
+        persisted: bool | None = None,
+        registry: PersistedQueryRegistry | None = None,
+    ):
+        self.url = url
+        self.authurl = url.replace("/api/gql", "/oauth/login3")
+        self.username = username
+        self.password = password
+        self.limit = GQL_POOL_LIMIT if limit is None else limit
+        self.limit_per_host = (
+            GQL_POOL_LIMIT_PER_HOST if limit_per_host is None else limit_per_host
+        )
+        self.keepalive_timeout = (
+            GQL_KEEPALIVE_TIMEOUT if keepalive_timeout is None else keepalive_timeout
+        )
+        self.dns_cache_ttl = (
+            GQL_DNS_CACHE_TTL if dns_cache_ttl is None else dns_cache_ttl
+        )
+        self.timeout = GQL_REQUEST_TIMEOUT if timeout is None else timeout
+        self.persisted = GQL_APQ if persisted is None else persisted
+        self.registry = APQ_REGISTRY if registry is None else registry
+
+        self.tokens = TokenManager(self.login)
+        self._session: aiohttp.ClientSession | None = None
+
+        self.requests = 0
+        self.errors = 0
+        self.sessions_opened = 0
+        self.bytes_received = 0
+        self.total_seconds = 0.0
+        _clients.add(self)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, (re)created lazily on the running event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=json_codec.dumps,
+            )
+            self.sessions_opened += 1
+        return self._session
+
+    @property
+    def token(self) -> str | None:
+        return self.tokens.token
+
+    async def get_token(self) -> str:
+        return await self.tokens.get()
+
+    async def login(self) -> str:
+        async with self.session.get(self.authurl) as resp:
+            json_data = await resp.json(loads=json_codec.loads)
+
+        payload = {**json_data, "username": self.username, "password": self.password}
+        async with self.session.post(self.authurl, json=payload) as resp:
+            json_data = await resp.json(loads=json_codec.loads)
+        return json_data["token"]
+
+    async def post(self, payload: dict, cookies: dict) -> dict:
+        """
+        Sends one GraphQL payload and decodes the response body exactly once.
+
+        Raises:
+            TokenRejectedError: 401/403 or an HTML login page instead of a response
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            async with self.session.post(
+                self.url, json=payload, cookies=cookies
+            ) as resp:
+                body = await resp.read()
+                self.bytes_received += len(body)
+                if _rejected(resp):
+                    raise TokenRejectedError(resp.status, resp.content_type)
+                if resp.status != 200 or not is_json_type(resp.content_type):
+                    raise Exception(
+                        f"Unexpected GQL response",
+                        resp.status,
+                        resp.content_type,
+                        body.decode(resp.get_encoding(), errors="replace"),
+                    )
+                return json_codec.loads(body)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.total_seconds += time.perf_counter() - start
+
+    async def __call__(self, query, variables, cookies=None):
+        if (
+            not self.persisted
+            or not self.registry.is_supported(self.url)
+            or not is_read_only(query)
+        ):
+            return await self.send({"query": query, "variables": variables}, cookies)
+
+        digest = query_hash(query)
+        extensions = persisted_extensions(digest)
+        if self.registry.is_accepted(self.url, digest):
+            # server dotaz zná, posílá se jen hash; chyby přenosu se propagují
+            response = await self.send(
+                {"variables": variables, "extensions": extensions}, cookies
+            )
+            error = persisted_error(response, hash_only=True)
+            if error == NOT_SUPPORTED:
+                return await self._unsupported(query, variables, cookies)
+            if error != NOT_FOUND:
+                self.registry.hit(query)
+                return response
+            # server dotaz zapomněl, pošle se znovu celý
+            self.registry.forget(self.url, digest)
+
+        response = await self.send(
+            {"query": query, "variables": variables, "extensions": extensions},
+            cookies,
+        )
+        error = persisted_error(response)
+        if error == NOT_SUPPORTED:
+            return await self._unsupported(query, variables, cookies)
+        if error is None:
+            self.registry.accept(self.url, digest)
+        return response
+
+    async def _unsupported(self, query, variables, cookies):
+        # server hash neumí, dál jen celé dotazy
+        self.registry.unsupported(self.url)
+        return await self.send({"query": query, "variables": variables}, cookies)
+
+    async def send(self, payload: dict, cookies=None):
+        """Posts `payload` with the shared token (or explicit `cookies`), re-logs once."""
+        if cookies is not None:
+            return await self.post(payload, cookies=cookies)
+
+        # odmítnutý token se obnoví jednou, souběžné požadavky sdílí jedno přihlášení
         attempts = 2
-        while attempts > 0:
-            
-            payload = {"query": query, "variables": variables}
-            # print("Query payload", payload, flush=True)
+        while True:
+            token = await self.tokens.get()
             try:
-                async with aiohttp.ClientSession() as session:
-                    # print(headers, cookies)
-                    async with session.post(url, json=payload, cookies=cookies) as resp:
-                        # print(resp.status)
-                        if resp.status != 200:
-                            text = await resp.text()
-                            # print(text, flush=True)
-                            raise Exception(f"Unexpected GQL response", text)
-                        else:
-                            text = await resp.text()
-                            # print(text, flush=True)
-                            response = await resp.json()
-                            # print(response, flush=True)
-                            return response
-            except aiohttp.ContentTypeError as e:
+                return await self.post(payload, cookies={"authorization": token})
+            except TokenRejectedError:
                 attempts = attempts - 1
-                total_attempts = total_attempts - 1
-                print(f"attempts {attempts}-{total_attempts}", flush=True)
-                nonlocal token
-                token = await getToken()
+                print(f"token rejected, attempts left {attempts}", flush=True)
+                if attempts < 1:
+                    raise Exception(
+                        "Max attempts to reauthenticate to graphql endpoint has been reached"
+                    )
+                await self.tokens.refresh(stale=token)
+
+    async def stream(
+        self, query, variables, chunk_size: int | None = None
+    ) -> AsyncIterator[dict]:
+        """
+        Sends the query and yields rows of the first list in `data` while the body
+        is still arriving, so a large page is never held in memory as a whole.
+
+        Raises:
+            Exception: the response has errors and no rows
+        """
+        payload = {"query": query, "variables": variables}
+        chunk_size = chunk_size or GQL_STREAM_CHUNK_SIZE
+        attempts = 2
+        while True:
+            token = await self.tokens.get()
+            self.requests += 1
+            start = time.perf_counter()
+            try:
+                async with self.session.post(
+                    self.url, json=payload, cookies={"authorization": token}
+                ) as resp:
+                    if not _rejected(resp):
+                        if resp.status != 200 or not is_json_type(resp.content_type):
+                            body = await resp.read()
+                            raise Exception(
+                                f"Unexpected GQL response",
+                                resp.status,
+                                resp.content_type,
+                                body.decode(resp.get_encoding(), errors="replace"),
+                            )
+                        decoder = RowStreamDecoder()
+                        async for chunk in resp.content.iter_chunked(chunk_size):
+                            self.bytes_received += len(chunk)
+                            for row in decoder.feed(chunk):
+                                yield row
+                        for row in decoder.close():
+                            yield row
+                        if decoder.errors and not decoder.rows:
+                            raise Exception("GraphQL query failed", decoder.errors)
+                        return
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.total_seconds += time.perf_counter() - start
+
+            attempts = attempts - 1
+            print(f"token rejected, attempts left {attempts}", flush=True)
+            if attempts < 1:
+                raise Exception(
+                    "Max attempts to reauthenticate to graphql endpoint has been reached"
+                )
+            await self.tokens.refresh(stale=token)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "sessions_opened": self.sessions_opened,
+            "bytes_received": self.bytes_received,
+            "avg_seconds": self.total_seconds / self.requests if self.requests else 0.0,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "token": self.tokens.stats(),
+            **({"persisted": self.registry.stats()} if self.persisted else {}),
+        }
+
+
+async def createGQLClient(
+    *, url: str = "http://localhost:33001/api/gql", username: str, password: str
+) -> GQLClient:
+    client = GQLClient(url=url, username=username, password=password)
+    await client.get_token()
+    return client
+
 
-    return client
\ No newline at end of file
+async def close_gql_clients():
+    """Closes the sessions of all clients, meant for the app shutdown hook."""
+    for client in list(_clients):
+        await client.close()
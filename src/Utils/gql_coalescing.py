@@ -0,0 +1,374 @@
+import asyncio
+import os
+import typing
+
+from graphql import parse, print_ast, GraphQLError
+from graphql.language import visit, Visitor
+from graphql.language.ast import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    NameNode,
+    OperationDefinitionNode,
+    OperationType,
+    SelectionSetNode,
+    VariableNode,
+)
+
+from src.Utils import json_codec
+from src.Utils.gql_paging import PagingMixin
+
+# jak dlouho dotaz čeká na další do dávky, jen když už jiný dotaz běží
+GQL_BATCH_WINDOW_MS = float(os.getenv("GQL_BATCH_WINDOW_MS", "5"))
+GQL_BATCH_MAX = int(os.getenv("GQL_BATCH_MAX", "10"))
+GQL_BATCH_MAX_QUERY_SIZE = int(os.getenv("GQL_BATCH_MAX_QUERY_SIZE", "4000"))
+
+
+class _RenameVariables(Visitor):
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def enter_variable(self, node: VariableNode, *_):
+        return VariableNode(name=NameNode(value=self.prefix + node.name.value))
+
+
+class _FindVariable(Visitor):
+    found = False
+
+    def enter_variable(self, *_):
+        self.found = True
+        return self.BREAK
+
+
+def _uses_variables(node) -> bool:
+    finder = _FindVariable()
+    visit(node, finder)
+    return finder.found
+
+
+def is_query(document: DocumentNode) -> bool:
+    """True if every operation in the document is a query (safe to share a result)."""
+    operations = [
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    ]
+    return bool(operations) and all(
+        op.operation == OperationType.QUERY for op in operations
+    )
+
+
+class _BatchItem:
+    __slots__ = ("operation", "fragments", "variables", "future", "aliases")
+
+    def __init__(self, operation, fragments, variables, future):
+        self.operation: OperationDefinitionNode = operation
+        self.fragments: dict[str, FragmentDefinitionNode] = fragments
+        self.variables: dict = variables
+        self.future: asyncio.Future = future
+        # alias v dávce -> původní klíč odpovědi
+        self.aliases: dict[str, str] = {}
+
+
+def _batchable(document: DocumentNode):
+    """
+    Returns (operation, fragments) if the document can be merged into a batch,
+    that is a single anonymous-or-named query without directives whose fragments do
+    not use variables. Returns None otherwise.
+    """
+    operations = [
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    ]
+    if len(operations) != 1:
+        return None
+    operation = operations[0]
+    if operation.operation != OperationType.QUERY or operation.directives:
+        return None
+    fragments = {}
+    for d in document.definitions:
+        if isinstance(d, FragmentDefinitionNode):
+            if _uses_variables(d):
+                return None
+            fragments[d.name.value] = d
+    return operation, fragments
+
+
+def merge_batch(items: list[_BatchItem]) -> tuple[str, dict] | None:
+    """
+    Merges queries into one aliased multi-root operation.
+
+    Root fields of the i-th query get the alias `b{i}_<response key>`, its variables
+    are renamed to `$b{i}_<name>`. Returns None when fragments with the same name
+    differ between the queries.
+    """
+    fragments: dict[str, FragmentDefinitionNode] = {}
+    printed: dict[str, str] = {}
+    variable_definitions = []
+    selections = []
+    variables = {}
+    for i, item in enumerate(items):
+        for name, fragment in item.fragments.items():
+            text = print_ast(fragment)
+            if printed.setdefault(name, text) != text:
+                return None
+            fragments[name] = fragment
+
+        prefix = f"b{i}_"
+        operation = visit(item.operation, _RenameVariables(prefix))
+        variable_definitions.extend(operation.variable_definitions or [])
+        for name, value in (item.variables or {}).items():
+            variables[prefix + name] = value
+
+        item.aliases = {}
+        for selection in operation.selection_set.selections:
+            if not isinstance(selection, FieldNode):
+                # fragment na kořeni nelze bezpečně přejmenovat
+                return None
+            key = (selection.alias or selection.name).value
+            alias = prefix + key
+            item.aliases[alias] = key
+            selections.append(
+                FieldNode(
+                    alias=NameNode(value=alias),
+                    name=selection.name,
+                    arguments=selection.arguments,
+                    directives=selection.directives,
+                    selection_set=selection.selection_set,
+                )
+            )
+
+    operation = OperationDefinitionNode(
+        operation=OperationType.QUERY,
+        name=NameNode(value="batched"),
+        variable_definitions=variable_definitions,
+        directives=[],
+        selection_set=SelectionSetNode(selections=selections),
+    )
+    document = DocumentNode(definitions=[operation, *fragments.values()])
+    return print_ast(document), variables
+
+
+def split_response(
+    item: _BatchItem, response: dict, aliases: typing.AbstractSet[str] = frozenset()
+) -> dict:
+    """
+    Returns the part of a batched response which belongs to `item`.
+
+    `aliases` are the root aliases of the whole batch. An error without a `path`, or
+    with a path outside of them, cannot be attributed and is given to every item.
+    """
+    data = response.get("data") or {}
+    result = {"data": {key: data.get(alias) for alias, key in item.aliases.items()}}
+    errors = []
+    for error in response.get("errors") or []:
+        path = error.get("path") or []
+        # locations ukazují do sloučeného dotazu, původnímu nic neřeknou
+        error = {k: v for k, v in error.items() if k != "locations"}
+        if path and path[0] in item.aliases:
+            errors.append({**error, "path": [item.aliases[path[0]], *path[1:]]})
+        elif not path or path[0] not in aliases:
+            errors.append(error)
+    if errors:
+        result["errors"] = errors
+    if "extensions" in response:
+        result["extensions"] = response["extensions"]
+    return result
+
+
+class CoalescingGQLClient(PagingMixin):
+    """
+    Wraps a GraphQL client callable, identical in-flight requests share one request
+    task and distinct small queries arriving within `window_ms` are sent as one
+    aliased multi-root operation. Only queries arriving while another request is in
+    flight wait for the window, a lone query is sent at once. A cancelled caller only
+    stops waiting, the shared request is cancelled when its last caller is.
+
+    Only queries are coalesced or batched, mutations always go straight through.
+    Coalesced callers get the same response dict and must not modify it. Unknown
+    attributes (`close`, `tokens`, ...) are delegated to the wrapped client.
+
+    Args:
+        client: async callable (query, variables, cookies=None) -> response
+        window_ms: how long to wait for more queries to batch (env `GQL_BATCH_WINDOW_MS`), 0 disables batching
+        max_batch: max. number of queries in one operation (env `GQL_BATCH_MAX`)
+        max_query_size: only queries shorter than this are batched (env `GQL_BATCH_MAX_QUERY_SIZE`)
+    """
+
+    def __init__(
+        self,
+        client,
+        window_ms: float | None = None,
+        max_batch: int | None = None,
+        max_query_size: int | None = None,
+    ):
+        self.client = client
+        self.window = (GQL_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = GQL_BATCH_MAX if max_batch is None else max_batch
+        self.max_query_size = (
+            GQL_BATCH_MAX_QUERY_SIZE if max_query_size is None else max_query_size
+        )
+        # klíč -> [úloha sdíleného požadavku, počet čekajících volajících]
+        self._inflight: dict[tuple, list] = {}
+        self._pending: list[_BatchItem] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        # požadavky právě odeslané přes `client` (samostatné i dávky)
+        self._sending = 0
+
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched = 0
+        self.batch_fallbacks = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def stream(self, query, variables, chunk_size: int | None = None):
+        """Streams are passed through, every consumer reads its own body."""
+        return self.client.stream(query, variables, chunk_size)
+
+    async def __call__(self, query, variables, cookies=None):
+        self.requests += 1
+        try:
+            document = parse(query)
+        except GraphQLError:
+            document = None
+        if document is None or not is_query(document):
+            return await self.client(query, variables, cookies)
+
+        key = (
+            query,
+            json_codec.dumps(variables, sort_keys=True, default=str),
+            json_codec.dumps(cookies, sort_keys=True),
+        )
+        shared = self._inflight.get(key)
+        if shared is None:
+            # vlastní úloha, zrušení jednoho volajícího neruší ostatní
+            task = asyncio.ensure_future(
+                self._request(query, document, variables, cookies)
+            )
+            shared = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda t: self._request_done(key, shared))
+        else:
+            self.coalesced += 1
+
+        shared[1] += 1
+        try:
+            return await asyncio.shield(shared[0])
+        except asyncio.CancelledError:
+            if shared[1] == 1:
+                # poslední čekající, výsledek už nikdo nepotřebuje
+                shared[0].cancel()
+            raise
+        finally:
+            shared[1] -= 1
+
+    async def _request(self, query, document, variables, cookies):
+        if cookies is None:
+            return await self._batched(query, document, variables)
+        return await self.client(query, variables, cookies)
+
+    def _request_done(self, key, shared):
+        if self._inflight.get(key) is shared:
+            del self._inflight[key]
+        task = shared[0]
+        if not task.cancelled():
+            # výjimku dostali čekající, jinak by asyncio hlásilo nevyzvednutou
+            task.exception()
+
+    async def _batched(self, query, document, variables):
+        prepared = None
+        if self.window > 0 and len(query) <= self.max_query_size:
+            prepared = _batchable(document)
+        if prepared is None or (self._sending == 0 and not self._pending):
+            # nic jiného neběží, osamocený dotaz by na partnery jen čekal
+            return await self._direct(query, variables)
+
+        loop = asyncio.get_running_loop()
+        item = _BatchItem(*prepared, variables, loop.create_future())
+        self._pending.append(item)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await item.future
+
+    async def _direct(self, query, variables):
+        self._sending += 1
+        try:
+            return await self.client(query, variables)
+        finally:
+            self._sending -= 1
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_one(self, item: _BatchItem):
+        try:
+            query = print_ast(
+                DocumentNode(definitions=[item.operation, *item.fragments.values()])
+            )
+            result = await self.client(query, item.variables)
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+
+    async def _send(self, batch: list[_BatchItem]):
+        self._sending += 1
+        try:
+            await self._send_batch(batch)
+        finally:
+            self._sending -= 1
+
+    async def _send_batch(self, batch: list[_BatchItem]):
+        # zrušení volající už odpověď nečekají
+        batch = [item for item in batch if not item.future.done()]
+        if not batch:
+            return
+        merged = merge_batch(batch) if len(batch) > 1 else None
+        if merged is None:
+            await asyncio.gather(*(self._send_one(item) for item in batch))
+            return
+
+        query, variables = merged
+        try:
+            response = await self.client(query, variables)
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        if not isinstance(response, dict) or response.get("data") is None:
+            # celá dávka selhala (např. validace), každý dotaz zvlášť dostane svoji chybu
+            self.batch_fallbacks += 1
+            await asyncio.gather(*(self._send_one(item) for item in batch))
+            return
+
+        self.batches += 1
+        self.batched += len(batch)
+        aliases = {alias for item in batch for alias in item.aliases}
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(split_response(item, response, aliases))
+
+    def stats(self) -> dict:
+        inner = getattr(self.client, "stats", None)
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "batched": self.batched,
+            "batch_fallbacks": self.batch_fallbacks,
+            **({"client": inner()} if callable(inner) else {}),
+        }
@@ -0,0 +1,372 @@
+import os
+import threading
+import time
+import typing
+from collections import OrderedDict
+from functools import lru_cache
+
+from graphql import (
+    parse,
+    GraphQLError,
+    get_named_type,
+    is_abstract_type,
+    is_object_type,
+)
+from graphql.language.ast import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    OperationType,
+)
+from graphql.utilities import value_from_ast_untyped
+
+from src.Utils import json_codec
+
+GQL_ENTITY_CACHE_SIZE = int(os.getenv("GQL_ENTITY_CACHE_SIZE", "20000"))
+GQL_ENTITY_CACHE_BYTES = int(os.getenv("GQL_ENTITY_CACHE_BYTES", str(64 * 2**20)))
+
+
+class _Miss(Exception):
+    pass
+
+
+@lru_cache(maxsize=512)
+def _parse(query: str) -> DocumentNode | None:
+    try:
+        return parse(query)
+    except GraphQLError:
+        return None
+
+
+def _operation(document: DocumentNode) -> OperationDefinitionNode | None:
+    operations = [
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    ]
+    return operations[0] if len(operations) == 1 else None
+
+
+def entity_key(value) -> str | None:
+    """`Type:id` of a response object, None if it has no `__typename` or `id`."""
+    if not isinstance(value, dict):
+        return None
+    typename, id = value.get("__typename"), value.get("id")
+    if typename is None or id is None:
+        return None
+    return f"{typename}:{id}"
+
+
+class _Selection:
+    """
+    Field iteration over a selection set with fragments and resolved arguments.
+
+    Fragment type conditions are resolved against `schema` (interfaces and unions
+    included). A condition which cannot be resolved is skipped when writing and
+    raises `_Miss` when `strict` (reading), so no entity is reported complete
+    without the fields of such a fragment.
+    """
+
+    def __init__(
+        self,
+        document: DocumentNode,
+        variables: dict | None,
+        schema=None,
+        strict: bool = False,
+    ):
+        self.fragments = {
+            d.name.value: d
+            for d in document.definitions
+            if isinstance(d, FragmentDefinitionNode)
+        }
+        self.variables = variables or {}
+        self.schema = schema
+        self.strict = strict
+
+    def matches(self, condition, typename: str | None) -> bool:
+        if condition is None or condition.name.value == typename:
+            return True
+        abstract = self.schema.get_type(condition.name.value) if self.schema else None
+        concrete = self.schema.get_type(typename) if self.schema and typename else None
+        if abstract is not None and is_object_type(concrete):
+            if not is_abstract_type(abstract):
+                return False
+            return self.schema.is_sub_type(abstract, concrete)
+        if self.strict:
+            raise _Miss(condition.name.value)
+        return False
+
+    def store_key(self, node: FieldNode) -> str:
+        # pole s argumenty se ukládá zvlášť pro každou kombinaci hodnot (jako Apollo)
+        name = node.name.value
+        if not node.arguments:
+            return name
+        args = {
+            a.name.value: value_from_ast_untyped(a.value, self.variables)
+            for a in node.arguments
+        }
+        return f"{name}({json_codec.dumps(args, sort_keys=True, default=str)})"
+
+    def fields(self, selection_set, typename: str | None, seen=frozenset()):
+        """Yields (response key, store key, field node), fragments must match `typename`."""
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield (
+                    (selection.alias or selection.name).value,
+                    self.store_key(selection),
+                    selection,
+                )
+            elif isinstance(selection, InlineFragmentNode):
+                if self.matches(selection.type_condition, typename):
+                    yield from self.fields(selection.selection_set, typename, seen)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in seen:
+                    continue
+                if self.matches(fragment.type_condition, typename):
+                    yield from self.fields(
+                        fragment.selection_set, typename, seen | {name}
+                    )
+
+
+class EntityStore:
+    """
+    Normalized store of response objects keyed by `__typename:id`, per user.
+
+    Objects with `__typename` and `id` are merged field by field from every
+    response, nested entities are kept as references, so one entity is stored once
+    however many queries returned it. Fields with arguments are stored under the
+    field name plus the argument values. Every field keeps the expiry of the
+    response which wrote it, a later query selecting other fields does not renew
+    it. A query for one entity by `id` is answered from the store when every
+    selected field (also of the nested entities) is known and not expired.
+
+    LRU by number of entities and by their encoded size. Entities returned by a
+    mutation are dropped for all users before the new values are merged.
+
+    Args:
+        maxsize: max. number of entities (env `GQL_ENTITY_CACHE_SIZE`)
+        maxbytes: max. total size of the entities (env `GQL_ENTITY_CACHE_BYTES`)
+    """
+
+    def __init__(self, maxsize: int | None = None, maxbytes: int | None = None):
+        self.maxsize = GQL_ENTITY_CACHE_SIZE if maxsize is None else maxsize
+        self.maxbytes = GQL_ENTITY_CACHE_BYTES if maxbytes is None else maxbytes
+        # (user, "Typ:id") -> [expires_at (nejpozdější pole), bytes, fields, expiry pole]
+        self._entities: OrderedDict[tuple, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # --- zápis ---
+
+    def _normalize(self, value, node_selection, selection: _Selection, found: dict):
+        if isinstance(value, list):
+            return [self._normalize(v, node_selection, selection, found) for v in value]
+        if not isinstance(value, dict) or node_selection is None:
+            return value
+        obj = {}
+        for response_key, store_key, node in selection.fields(
+            node_selection, value.get("__typename")
+        ):
+            if response_key in value:
+                obj[store_key] = self._normalize(
+                    value[response_key], node.selection_set, selection, found
+                )
+        key = entity_key(value)
+        if key is None:
+            return obj
+        found.setdefault(key, {}).update(obj)
+        return {"__ref": key}
+
+    def write(
+        self,
+        user,
+        query: str,
+        variables: dict | None,
+        data: dict | None,
+        ttl_for: typing.Callable[[str], float],
+        replace: bool = False,
+        schema=None,
+    ) -> set[str]:
+        """
+        Merges all entities of a response `data`, returns their type names.
+
+        Args:
+          ttl_for: type name -> seconds the entity stays valid
+          replace: drop the entities for all users first (mutation results)
+          schema: resolves fragments on interfaces and unions
+        """
+        document = _parse(query)
+        operation = document and _operation(document)
+        if operation is None or not isinstance(data, dict):
+            return set()
+        found: dict[str, dict] = {}
+        self._normalize(
+            data,
+            operation.selection_set,
+            _Selection(document, variables, schema),
+            found,
+        )
+        if not found:
+            return set()
+
+        now = time.monotonic()
+        with self._lock:
+            if replace:
+                self._invalidate_keys(set(found))
+            for key, fields in found.items():
+                ttl = ttl_for(key.partition(":")[0])
+                if ttl <= 0:
+                    continue
+                entry = self._entities.get((user, key))
+                merged = fields
+                expiry = dict.fromkeys(fields, now + ttl)
+                if entry is not None:
+                    self.bytes -= entry[1]
+                    # starší pole si nechávají svoji expiraci, neobnovují se
+                    kept = {
+                        k: entry[3][k]
+                        for k in entry[2]
+                        if k not in fields and entry[3][k] >= now
+                    }
+                    merged = {**{k: entry[2][k] for k in kept}, **fields}
+                    expiry = {**kept, **expiry}
+                size = len(json_codec.dumps_bytes(merged, default=str))
+                self._entities[(user, key)] = [
+                    max(expiry.values()),
+                    size,
+                    merged,
+                    expiry,
+                ]
+                self._entities.move_to_end((user, key))
+                self.bytes += size
+                self.writes += 1
+            while self._entities and (
+                len(self._entities) > self.maxsize or self.bytes > self.maxbytes
+            ):
+                _, entry = self._entities.popitem(last=False)
+                self.bytes -= entry[1]
+                self.evictions += 1
+        return {key.partition(":")[0] for key in found}
+
+    def _invalidate_keys(self, keys: set[str]):
+        for entity in [entity for entity in self._entities if entity[1] in keys]:
+            self.bytes -= self._entities.pop(entity)[1]
+            self.invalidations += 1
+
+    def invalidate(self, user=None, key: str | None = None):
+        """Drops the entity `key` (all if None) of `user` (all users if None)."""
+        with self._lock:
+            for entity in [
+                entity
+                for entity in self._entities
+                if (user is None or entity[0] == user)
+                and (key is None or entity[1] == key)
+            ]:
+                self.bytes -= self._entities.pop(entity)[1]
+                self.invalidations += 1
+
+    # --- čtení ---
+
+    def _entity(self, user, key: str, now: float) -> tuple[dict, dict]:
+        entry = self._entities.get((user, key))
+        if entry is None or entry[0] < now:
+            raise _Miss(key)
+        self._entities.move_to_end((user, key))
+        return entry[2], entry[3]
+
+    def _read(self, user, value, node_selection, selection: _Selection, now: float):
+        if isinstance(value, list):
+            return [self._read(user, v, node_selection, selection, now) for v in value]
+        if not isinstance(value, dict) or node_selection is None:
+            return value
+        expiry = None
+        typename = value.get("__typename")
+        if "__ref" in value:
+            typename = value["__ref"].partition(":")[0]
+            value, expiry = self._entity(user, value["__ref"], now)
+        result = {}
+        for response_key, store_key, node in selection.fields(
+            node_selection, value.get("__typename", typename)
+        ):
+            if store_key not in value or (
+                expiry is not None and expiry[store_key] < now
+            ):
+                raise _Miss(store_key)
+            result[response_key] = self._read(
+                user, value[store_key], node.selection_set, selection, now
+            )
+        return result
+
+    def read_query(
+        self, user, query: str, variables: dict | None, schema
+    ) -> dict | None:
+        """
+        Answers a query for one entity by `id` (e.g. `userById(id: $id)`) from the
+        store, None if it is not such a query or some selected field is not known.
+        """
+        document = _parse(query)
+        operation = document and _operation(document)
+        if (
+            operation is None
+            or operation.operation != OperationType.QUERY
+            or len(operation.selection_set.selections) != 1
+            or schema is None
+            or schema.query_type is None
+        ):
+            return None
+        root = operation.selection_set.selections[0]
+        if not isinstance(root, FieldNode):
+            return None
+        field = schema.query_type.fields.get(root.name.value)
+        if field is None or not is_object_type(get_named_type(field.type)):
+            return None
+        selection = _Selection(document, variables, schema, strict=True)
+        id_argument = next(
+            (a for a in root.arguments or [] if a.name.value == "id"), None
+        )
+        if id_argument is None or len(root.arguments) != 1:
+            return None
+        id = value_from_ast_untyped(id_argument.value, selection.variables)
+        if id is None:
+            return None
+        key = f"{get_named_type(field.type).name}:{id}"
+
+        with self._lock:
+            try:
+                entity = self._read(
+                    user,
+                    {"__ref": key},
+                    root.selection_set,
+                    selection,
+                    time.monotonic(),
+                )
+            except _Miss:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {"data": {(root.alias or root.name).value: entity}}
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entities": len(self._entities),
+            "bytes": self.bytes,
+        }
+
+
+ENTITY_STORE = EntityStore()
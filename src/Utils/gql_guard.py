@@ -0,0 +1,642 @@
+import asyncio
+import os
+import time
+from collections import deque
+from functools import lru_cache
+
+from graphql import parse, GraphQLError
+from graphql.language.ast import FieldNode, OperationDefinitionNode
+
+from src.Utils.field_health import FIELD_HEALTH
+from src.Utils.gql_paging import PagingMixin
+
+GQL_BREAKER_WINDOW = int(os.getenv("GQL_BREAKER_WINDOW", "20"))
+GQL_BREAKER_MIN_REQUESTS = int(os.getenv("GQL_BREAKER_MIN_REQUESTS", "5"))
+GQL_BREAKER_ERROR_RATE = float(os.getenv("GQL_BREAKER_ERROR_RATE", "0.5"))
+GQL_BREAKER_SLOW_SECONDS = float(os.getenv("GQL_BREAKER_SLOW_SECONDS", "10"))
+GQL_BREAKER_OPEN_SECONDS = float(os.getenv("GQL_BREAKER_OPEN_SECONDS", "30"))
+GQL_LIMIT_INITIAL = float(os.getenv("GQL_LIMIT_INITIAL", "8"))
+GQL_LIMIT_MIN = float(os.getenv("GQL_LIMIT_MIN", "1"))
+GQL_LIMIT_MAX = float(os.getenv("GQL_LIMIT_MAX", "64"))
+GQL_LIMIT_LATENCY_TARGET = float(os.getenv("GQL_LIMIT_LATENCY_TARGET", "2"))
+GQL_LIMIT_MAX_QUEUE = int(os.getenv("GQL_LIMIT_MAX_QUEUE", "50"))
+GQL_LIMIT_QUEUE_TIMEOUT = float(os.getenv("GQL_LIMIT_QUEUE_TIMEOUT", "10"))
+# `extensions.code` chyb brány, které znamenají nedostupný subgraf (ne chybu dotazu)
+GQL_BREAKER_ERROR_CODES = frozenset(
+    code.strip().upper()
+    for code in os.getenv(
+        "GQL_BREAKER_ERROR_CODES",
+        "SUBGRAPH_ERROR,DOWNSTREAM_SERVICE_ERROR,SERVICE_UNAVAILABLE,"
+        "GATEWAY_TIMEOUT,TIMEOUT,TIMED_OUT",
+    ).split(",")
+    if code.strip()
+)
+
+
+class SubgraphUnavailableError(Exception):
+    """A request was refused without being sent, the subgraph is unhealthy or overloaded."""
+
+    def __init__(self, subgraph: str, message: str):
+        super().__init__(f"Subgraph {subgraph} is unavailable: {message}")
+        self.subgraph = subgraph
+
+
+class CircuitOpenError(SubgraphUnavailableError):
+    pass
+
+
+class OverloadedError(SubgraphUnavailableError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after too many failed or slow requests among the last `window` ones.
+
+    While open every request is refused, after `open_seconds` one probe request is
+    let through (half-open). Its success closes the circuit, a failure opens it again.
+
+    Args:
+        window: number of recent outcomes considered (env `GQL_BREAKER_WINDOW`)
+        min_requests: outcomes needed before the circuit may open (env `GQL_BREAKER_MIN_REQUESTS`)
+        error_rate: failure ratio which opens the circuit (env `GQL_BREAKER_ERROR_RATE`)
+        slow_seconds: slower requests count as failures (env `GQL_BREAKER_SLOW_SECONDS`)
+        open_seconds: how long the circuit stays open (env `GQL_BREAKER_OPEN_SECONDS`)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int | None = None,
+        min_requests: int | None = None,
+        error_rate: float | None = None,
+        slow_seconds: float | None = None,
+        open_seconds: float | None = None,
+    ):
+        self.min_requests = (
+            GQL_BREAKER_MIN_REQUESTS if min_requests is None else min_requests
+        )
+        self.error_rate = GQL_BREAKER_ERROR_RATE if error_rate is None else error_rate
+        self.slow_seconds = (
+            GQL_BREAKER_SLOW_SECONDS if slow_seconds is None else slow_seconds
+        )
+        self.open_seconds = (
+            GQL_BREAKER_OPEN_SECONDS if open_seconds is None else open_seconds
+        )
+        self.outcomes: deque[bool] = deque(
+            maxlen=GQL_BREAKER_WINDOW if window is None else window
+        )
+        self._state = self.CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == self.OPEN
+            and time.monotonic() >= self.opened_at + self.open_seconds
+        ):
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def failure_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def allow(self) -> bool:
+        """True if a request may be sent, in half-open state only one at a time."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def abort(self):
+        """The allowed request was not sent after all."""
+        self._probing = False
+
+    def record(self, ok: bool, seconds: float):
+        ok = ok and seconds <= self.slow_seconds
+        self._probing = False
+        if self._state == self.HALF_OPEN:
+            if ok:
+                self._state = self.CLOSED
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+        self.outcomes.append(ok)
+        if (
+            self._state == self.CLOSED
+            and len(self.outcomes) >= self.min_requests
+            and self.failure_rate() >= self.error_rate
+        ):
+            self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.opened += 1
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Every request finished within `latency_target` raises the limit by `1 / limit`
+    (about +1 per `limit` requests), a failure or a slower request halves it, at most
+    once per average latency. Requests over the limit wait in a bounded queue, when
+    it is full or the wait takes longer than `queue_timeout` they are refused, so a
+    slow subgraph cannot pile up waiting coroutines.
+
+    Args:
+        initial: starting limit (env `GQL_LIMIT_INITIAL`)
+        min_limit: lower bound (env `GQL_LIMIT_MIN`)
+        max_limit: upper bound (env `GQL_LIMIT_MAX`)
+        latency_target: seconds, slower requests decrease the limit (env `GQL_LIMIT_LATENCY_TARGET`)
+        max_queue: max. waiting requests (env `GQL_LIMIT_MAX_QUEUE`)
+        queue_timeout: max. seconds of waiting (env `GQL_LIMIT_QUEUE_TIMEOUT`)
+    """
+
+    def __init__(
+        self,
+        initial: float | None = None,
+        min_limit: float | None = None,
+        max_limit: float | None = None,
+        latency_target: float | None = None,
+        max_queue: int | None = None,
+        queue_timeout: float | None = None,
+    ):
+        self.min_limit = GQL_LIMIT_MIN if min_limit is None else min_limit
+        self.max_limit = GQL_LIMIT_MAX if max_limit is None else max_limit
+        self.limit = GQL_LIMIT_INITIAL if initial is None else initial
+        self.limit = min(self.max_limit, max(self.min_limit, self.limit))
+        self.latency_target = (
+            GQL_LIMIT_LATENCY_TARGET if latency_target is None else latency_target
+        )
+        self.max_queue = GQL_LIMIT_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = (
+            GQL_LIMIT_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        )
+        self.inflight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.latency = 0.0
+
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _has_slot(self) -> bool:
+        return self.inflight < max(1, int(self.limit))
+
+    async def acquire(self, subgraph: str):
+        """Takes one slot, raises `OverloadedError` if the queue is full or too slow."""
+        if self._has_slot() and not self._waiters:
+            self.inflight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise OverloadedError(subgraph, f"{self.queued} requests already waiting")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        start = time.monotonic()
+        self.waited += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # slot byl přidělen těsně před zrušením
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise OverloadedError(
+                    subgraph, f"no free slot within {self.queue_timeout:g}s"
+                ) from None
+            raise
+        finally:
+            self.wait_seconds += time.monotonic() - start
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._has_slot():
+            future = self._waiters.popleft()
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+    def fail_waiters(self, error: Exception):
+        """Refuses all waiting requests, e.g. when the circuit has just opened."""
+        waiters, self._waiters = self._waiters, deque()
+        for future in waiters:
+            if not future.done():
+                future.set_exception(error)
+
+    def record(self, ok: bool, seconds: float):
+        # klouzavý průměr latence, určuje i jak často lze limit snížit
+        self.latency = (
+            seconds if not self.latency else 0.8 * self.latency + 0.2 * seconds
+        )
+        if ok and seconds <= self.latency_target:
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+        else:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit / 2)
+                self.decreases += 1
+        # vyšší limit může pustit čekající
+        self._wake()
+
+
+class SubgraphGuard:
+    """Circuit breaker, concurrency limiter and counters of one subgraph."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker()
+        self.limiter = AIMDLimiter()
+
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+        self.overloaded = 0
+        self.total_seconds = 0.0
+
+    def _open_error(self) -> CircuitOpenError:
+        return CircuitOpenError(
+            self.name, f"circuit open, retry in {self.breaker.retry_in():.0f}s"
+        )
+
+    def check(self):
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise self._open_error()
+
+    async def acquire(self):
+        try:
+            await self.limiter.acquire(self.name)
+        except OverloadedError:
+            self.overloaded += 1
+            raise
+        except CircuitOpenError:
+            self.rejected += 1
+            raise
+        if self.breaker.state == CircuitBreaker.OPEN:
+            # okruh se otevřel, zatímco požadavek čekal ve frontě
+            self.limiter.release()
+            self.rejected += 1
+            raise self._open_error()
+
+    def record(self, ok: bool, seconds: float):
+        self.requests += 1
+        self.failures += not ok
+        self.total_seconds += seconds
+        was_open = self.breaker.state == CircuitBreaker.OPEN
+        self.breaker.record(ok, seconds)
+        self.limiter.record(ok, seconds)
+        if not was_open and self.breaker.state == CircuitBreaker.OPEN:
+            self.limiter.fail_waiters(self._open_error())
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "retry_in": self.breaker.retry_in(),
+            "opened": self.breaker.opened,
+            "failure_rate": self.breaker.failure_rate(),
+            "limit": self.limiter.limit,
+            "inflight": self.limiter.inflight,
+            "queued": self.limiter.queued,
+            "latency": self.limiter.latency,
+            "avg_seconds": self.total_seconds / self.requests if self.requests else 0.0,
+            "avg_wait_seconds": (
+                self.limiter.wait_seconds / self.limiter.waited
+                if self.limiter.waited
+                else 0.0
+            ),
+            "requests": self.requests,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "overloaded": self.overloaded,
+        }
+
+
+class GuardRegistry:
+    """Process-wide `SubgraphGuard`s, created on first use."""
+
+    def __init__(self):
+        self.guards: dict[str, SubgraphGuard] = {}
+
+    def get(self, name: str) -> SubgraphGuard:
+        guard = self.guards.get(name)
+        if guard is None:
+            guard = self.guards[name] = SubgraphGuard(name)
+        return guard
+
+    def stats(self) -> dict:
+        return {name: guard.stats() for name, guard in sorted(self.guards.items())}
+
+
+GQL_GUARDS = GuardRegistry()
+
+
+@lru_cache(maxsize=512)
+def root_fields(query: str) -> tuple[str, tuple[tuple[str, str], ...]]:
+    """Returns (operation type, ((response key, field name), ...)) of a query."""
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return "query", ()
+    for d in document.definitions:
+        if isinstance(d, OperationDefinitionNode):
+            return d.operation.value, tuple(
+                ((s.alias or s.name).value, s.name.value)
+                for s in d.selection_set.selections
+                if isinstance(s, FieldNode)
+            )
+    return "query", ()
+
+
+_subgraph_maps: dict[str, dict[tuple[str, str], str]] = {}
+
+
+def subgraph_map(snapshot) -> dict[tuple[str, str], str]:
+    """(operation type, root field) -> subgraph, read from `@join__field(graph: ...)`."""
+    mapping = _subgraph_maps.get(snapshot.version)
+    if mapping is not None:
+        return mapping
+    mapping = {}
+    schema = snapshot.schema
+    for operation, root in (
+        ("query", schema.query_type),
+        ("mutation", schema.mutation_type),
+        ("subscription", schema.subscription_type),
+    ):
+        for name, field in (root.fields if root else {}).items():
+            for directive in getattr(field.ast_node, "directives", None) or []:
+                if directive.name.value != "join__field":
+                    continue
+                for argument in directive.arguments:
+                    if argument.name.value == "graph":
+                        mapping[(operation, name)] = argument.value.value.lower()
+    _subgraph_maps.clear()
+    _subgraph_maps[snapshot.version] = mapping
+    return mapping
+
+
+def subgraphs_of(query: str) -> dict[str, str]:
+    """Response key -> subgraph (or the root field name if the schema does not tell)."""
+    from sdl.sdl_fetch import get_schema_provider
+
+    operation, fields = root_fields(query)
+    snapshot = get_schema_provider().snapshot
+    mapping = subgraph_map(snapshot) if snapshot is not None else {}
+    return {key: mapping.get((operation, name), name) for key, name in fields}
+
+
+def failed_subgraphs(response, keys: dict[str, str]) -> set[str]:
+    """
+    Subgraphs blamed by the transport errors of a response.
+
+    Only errors the gateway reports for a subgraph it could not reach count: those
+    with `extensions.serviceName` or an `extensions.code` from `GQL_BREAKER_ERROR_CODES`.
+    Resolver errors (not found, forbidden, bad arguments) are the query's fault and
+    must not open the circuit for everybody. The subgraph is `serviceName`, else the
+    one of the root field in `path`.
+    """
+    failed = set()
+    if not isinstance(response, dict):
+        return failed
+    for error in response.get("errors") or []:
+        if not isinstance(error, dict):
+            continue
+        extensions = error.get("extensions") or {}
+        service = extensions.get("serviceName")
+        if service:
+            failed.add(str(service).lower())
+            continue
+        if str(extensions.get("code") or "").upper() not in GQL_BREAKER_ERROR_CODES:
+            continue
+        path = error.get("path") or []
+        if path and path[0] in keys:
+            failed.add(keys[path[0]])
+        else:
+            # chyba brány bez cesty, postihne všechny subgrafy dotazu
+            failed.update(keys.values())
+    return failed
+    for error in response.get("errors") or []:
+        if not isinstance(error, dict):
+            continue
+        service = (error.get("extensions") or {}).get("serviceName")
+        if service:
+            failed.add(str(service).lower())
+        path = error.get("path") or []
+        if path and path[0] in keys:
+            failed.add(keys[path[0]])
+    return failed
+
+
+class GuardedGQLClient(PagingMixin):
+    """
+    Protects the subgraphs behind the gateway, requests are keyed by the subgraphs
+    of their root fields.
+
+    A subgraph with an open circuit is not called at all (`CircuitOpenError`), the
+    number of concurrent requests per subgraph follows an AIMD limit and requests
+    over it wait in a bounded queue (`OverloadedError`). Latency, exceptions and
+    errors attributed to a subgraph are recorded after every request, per-field
+    errors and timing go to `FIELD_HEALTH`. `stream` is guarded the same way.
+    Unknown attributes are delegated to the wrapped client.
+
+    Args:
+        client: async callable (query, variables, cookies=None) -> response
+        registry: shared guards, `GQL_GUARDS` by default
+    """
+
+    def __init__(self, client, registry: GuardRegistry | None = None):
+        self.client = client
+        self.registry = GQL_GUARDS if registry is None else registry
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def _enter(self, guards: list[SubgraphGuard]):
+        allowed = []
+        acquired = []
+        try:
+            for guard in guards:
+                guard.check()
+                allowed.append(guard)
+            # limity se berou v pevném pořadí, souběžné dotazy na více subgrafů se nezablokují
+            for guard in guards:
+                await guard.acquire()
+                acquired.append(guard)
+        except BaseException:
+            for guard in allowed:
+                guard.breaker.abort()
+            for guard in acquired:
+                guard.limiter.release()
+            raise
+
+    def _leave(self, guards: list[SubgraphGuard], failed: set[str] | None, seconds):
+        for guard in guards:
+            if failed is None:
+                # zrušený požadavek o zdraví subgrafu nic neříká
+                guard.breaker.abort()
+            else:
+                guard.record(guard.name not in failed, seconds)
+            guard.limiter.release()
+
+    async def __call__(self, query, variables, cookies=None):
+        keys = subgraphs_of(query)
+        guards = [self.registry.get(name) for name in sorted(set(keys.values()))]
+        await self._enter(guards)
+
+        start = time.monotonic()
+        response = None
+        failed: set[str] | None = None
+        try:
+            response = await self.client(query, variables, cookies)
+            failed = failed_subgraphs(response, keys)
+            FIELD_HEALTH.observe(query, response, time.monotonic() - start)
+            return response
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            failed = {guard.name for guard in guards}
+            raise
+        finally:
+            self._leave(guards, failed, time.monotonic() - start)
+
+    async def stream(self, query, variables, chunk_size: int | None = None):
+        """
+        `stream` of the wrapped client under the same guards as `__call__`, the
+        subgraph slots are held until the last row is read. A consumer that stops
+        early neither records a success nor a failure.
+        """
+        guards = [
+            self.registry.get(name)
+            for name in sorted(set(subgraphs_of(query).values()))
+        ]
+        await self._enter(guards)
+
+        start = time.monotonic()
+        failed: set[str] | None = None
+        try:
+            async for row in self.client.stream(query, variables, chunk_size):
+                yield row
+            failed = set()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            failed = {guard.name for guard in guards}
+            raise
+        finally:
+            self._leave(guards, failed, time.monotonic() - start)
+
+    def stats(self) -> dict:
+        inner = getattr(self.client, "stats", None)
+        return {
+            "subgraphs": self.registry.stats(),
+            **({"client": inner()} if callable(inner) else {}),
+        }
+
+
+_STATES = {
+    CircuitBreaker.CLOSED: 0,
+    CircuitBreaker.HALF_OPEN: 1,
+    CircuitBreaker.OPEN: 2,
+}
+
+
+class GuardCollector:
+    """prometheus_client collector exporting the state of all subgraph guards."""
+
+    def __init__(self, registry: GuardRegistry | None = None):
+        self.registry = GQL_GUARDS if registry is None else registry
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        gauges = {
+            "state": GaugeMetricFamily(
+                "gql_subgraph_circuit_state",
+                "Circuit state (0 closed, 1 half-open, 2 open)",
+                labels=["subgraph"],
+            ),
+            "limit": GaugeMetricFamily(
+                "gql_subgraph_concurrency_limit",
+                "AIMD concurrency limit",
+                labels=["subgraph"],
+            ),
+            "inflight": GaugeMetricFamily(
+                "gql_subgraph_inflight", "Requests in flight", labels=["subgraph"]
+            ),
+            "queued": GaugeMetricFamily(
+                "gql_subgraph_queued",
+                "Requests waiting for a slot",
+                labels=["subgraph"],
+            ),
+            "latency": GaugeMetricFamily(
+                "gql_subgraph_latency_seconds",
+                "Moving average of request latency",
+                labels=["subgraph"],
+            ),
+            "failure_rate": GaugeMetricFamily(
+                "gql_subgraph_failure_rate",
+                "Failure ratio of recent requests",
+                labels=["subgraph"],
+            ),
+        }
+        counters = {
+            name: CounterMetricFamily(
+                f"gql_subgraph_{name}", description, labels=["subgraph"]
+            )
+            for name, description in (
+                ("requests", "Requests sent"),
+                ("failures", "Failed or erroneous requests"),
+                ("rejected", "Requests refused by an open circuit"),
+                ("overloaded", "Requests refused by the concurrency limiter"),
+                ("opened", "Times the circuit opened"),
+            )
+        }
+        for name, stats in self.registry.stats().items():
+            for key, metric in gauges.items():
+                value = stats[key]
+                metric.add_metric([name], _STATES[value] if key == "state" else value)
+            for key, metric in counters.items():
+                metric.add_metric([name], stats[key])
+        yield from gauges.values()
+        yield from counters.values()
+
+
+def register_prometheus_collector(registry: GuardRegistry | None = None) -> bool:
+    """Registers `GuardCollector` in the default prometheus registry, False without prometheus_client."""
+    try:
+        from prometheus_client import REGISTRY
+    except ImportError:
+        return False
+    REGISTRY.register(GuardCollector(registry))
+    return True
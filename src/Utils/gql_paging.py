@@ -0,0 +1,385 @@
+import asyncio
+import os
+import typing
+from functools import lru_cache
+
+from graphql import parse, print_ast, get_named_type, is_object_type
+from graphql.language import visit, Visitor
+from graphql.language.ast import (
+    ArgumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    NameNode,
+    OperationDefinitionNode,
+    VariableNode,
+)
+
+GQL_PAGE_SIZE = int(os.getenv("GQL_PAGE_SIZE", "100"))
+GQL_PAGE_CONCURRENCY = int(os.getenv("GQL_PAGE_CONCURRENCY", "4"))
+# počet reprezentací v jednom dotazu `_entities`
+GQL_ENTITIES_CHUNK = int(os.getenv("GQL_ENTITIES_CHUNK", "100"))
+
+
+def page_rows(response: dict) -> list:
+    """Returns the list under the first key of `data` (e.g. `data.userPage`)."""
+    if response.get("errors") and not response.get("data"):
+        raise Exception("GraphQL query failed", response["errors"])
+    data = response.get("data") or {}
+    rows = next(iter(data.values()), [])
+    if rows is None:
+        return []
+    if not isinstance(rows, list):
+        raise Exception("response has nonlist key, this is not expected")
+    return rows
+
+
+async def iterate_pages(
+    gqlclient,
+    query: str,
+    variables: dict | None = None,
+    page_size: int | None = None,
+    max_rows: int | None = None,
+    concurrency: int | None = None,
+) -> typing.AsyncIterator[dict]:
+    """
+    Yields all rows of a `skip`/`limit` page query.
+
+    Up to `concurrency` windows are requested at once, rows are yielded in page
+    order as soon as the page and all pages before it have arrived. Fetching stops
+    at the first short page or after `max_rows` rows.
+
+    Args:
+      gqlclient: async callable (query, variables) -> response
+      query: query with `$skip` and `$limit` variables
+      variables: other variables of the query
+      page_size: rows per request (env `GQL_PAGE_SIZE`)
+      max_rows: upper bound of yielded rows, None = all
+      concurrency: max. pages in flight (env `GQL_PAGE_CONCURRENCY`)
+    """
+    page_size = page_size or GQL_PAGE_SIZE
+    if max_rows is not None:
+        page_size = max(1, min(page_size, max_rows))
+    concurrency = max(1, concurrency or GQL_PAGE_CONCURRENCY)
+    base = {k: v for k, v in (variables or {}).items() if k not in ("skip", "limit")}
+    first_skip = (variables or {}).get("skip", 0) or 0
+    last_page = None
+    if max_rows is not None:
+        last_page = max(0, (max_rows - 1) // page_size)
+
+    async def fetch(page: int) -> list:
+        skip = first_skip + page * page_size
+        response = await gqlclient(query, {**base, "skip": skip, "limit": page_size})
+        return page_rows(response)
+
+    tasks: dict[int, asyncio.Task] = {}
+    next_page = 0
+    yielded = 0
+    try:
+        page = 0
+        while True:
+            while len(tasks) < concurrency and (
+                last_page is None or next_page <= last_page
+            ):
+                tasks[next_page] = asyncio.ensure_future(fetch(next_page))
+                next_page += 1
+            task = tasks.pop(page, None)
+            if task is None:
+                return
+            rows = await task
+            for row in rows:
+                if max_rows is not None and yielded >= max_rows:
+                    return
+                yield row
+                yielded += 1
+            if len(rows) < page_size:
+                return
+            page += 1
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # výjimka stránky za koncem dat už nikoho nezajímá
+                task.exception()
+
+
+class _VariableUses(Visitor):
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self.count = 0
+
+    def enter_variable(self, node: VariableNode, *_):
+        if node.name.value == self.name:
+            self.count += 1
+
+
+@lru_cache(maxsize=128)
+def _by_id_parts(query: str, schema) -> tuple:
+    """
+    Splits a query for one entity by `$id` (e.g. `userById(id: $id) {...}`) to
+    (root field, type name, `$id` definition, other variable definitions, fragments).
+
+    Raises:
+        ValueError: the query does not select exactly one object type root field,
+            or uses `$id` elsewhere than in an argument of the root field
+    """
+    document = parse(query)
+    operations = [
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    ]
+    if len(operations) != 1 or len(operations[0].selection_set.selections) != 1:
+        raise ValueError("expected a query with exactly one root field")
+    operation = operations[0]
+    root = operation.selection_set.selections[0]
+    field = (
+        schema.query_type.fields.get(root.name.value)
+        if isinstance(root, FieldNode) and schema.query_type is not None
+        else None
+    )
+    if field is None or root.selection_set is None:
+        raise ValueError("the root field is not a field of Query")
+    type_ = get_named_type(field.type)
+    if not is_object_type(type_):
+        raise ValueError(f"{type_.name} is not an object type")
+    definitions = operation.variable_definitions or []
+    id_definition = next(
+        (v for v in definitions if v.variable.name.value == "id"), None
+    )
+    if id_definition is None:
+        raise ValueError("the query has no `$id` variable")
+    # `$id` se nahrazuje jen v argumentu kořene, jinde by zůstal nedefinovaný
+    uses = _VariableUses("id")
+    for node in (root, *operation.directives, *document.definitions):
+        if not isinstance(node, OperationDefinitionNode):
+            visit(node, uses)
+    direct = sum(
+        1
+        for a in root.arguments or []
+        if isinstance(a.value, VariableNode) and a.value.name.value == "id"
+    )
+    if uses.count != direct:
+        raise ValueError("`$id` may only be used as an argument of the root field")
+    fragments = "\n\n".join(
+        print_ast(d)
+        for d in document.definitions
+        if isinstance(d, FragmentDefinitionNode)
+    )
+    others = [print_ast(v) for v in definitions if v is not id_definition]
+    return root, type_.name, id_definition, others, fragments
+
+
+def _query_text(variables: list[str], body: str, fragments: str) -> str:
+    text = f"query({', '.join(variables)}) {{\n{body}}}"
+    return f"{text}\n\n{fragments}" if fragments else text
+
+
+@lru_cache(maxsize=128)
+def entities_query(query: str, schema) -> tuple[str, str]:
+    """
+    Rewrites a query for one entity by `$id` to a federated
+    `_entities(representations: $representations)` query with the same selection.
+    Other variables and fragments of the query are kept.
+
+    Returns:
+        (`_entities` query, type name of the entity)
+    """
+    root, type_name, _, others, fragments = _by_id_parts(query, schema)
+    selection = print_ast(root.selection_set).replace("\n", "\n    ")
+    body = (
+        "  _entities(representations: $representations) {\n"
+        f"    ... on {type_name} {selection}\n"
+        "  }\n"
+    )
+    return (
+        _query_text(["$representations: [_Any!]!", *others], body, fragments),
+        type_name,
+    )
+
+
+@lru_cache(maxsize=128)
+def aliased_query(query: str, schema, count: int) -> str:
+    """
+    Repeats the root field of a query for one entity by `$id` `count` times as
+    `e0: ...(id: $id0)`, `e1: ...(id: $id1)`, ... for servers without `_entities`.
+    """
+    root, _, id_definition, others, fragments = _by_id_parts(query, schema)
+    id_type = print_ast(id_definition.type)
+
+    def field(i: int) -> str:
+        arguments = [
+            (
+                ArgumentNode(
+                    name=a.name, value=VariableNode(name=NameNode(value=f"id{i}"))
+                )
+                if isinstance(a.value, VariableNode) and a.value.name.value == "id"
+                else a
+            )
+            for a in root.arguments or []
+        ]
+        node = FieldNode(
+            alias=NameNode(value=f"e{i}"),
+            name=root.name,
+            arguments=arguments,
+            directives=root.directives,
+            selection_set=root.selection_set,
+        )
+        return "  " + print_ast(node).replace("\n", "\n  ") + "\n"
+
+    return _query_text(
+        [*(f"$id{i}: {id_type}" for i in range(count)), *others],
+        "".join(field(i) for i in range(count)),
+        fragments,
+    )
+
+
+async def resolve_entities(
+    gqlclient,
+    query: str,
+    keys: typing.Sequence[tuple[str, typing.Any]],
+    variables: dict | None = None,
+    chunk_size: int | None = None,
+    concurrency: int | None = None,
+) -> list[dict | None]:
+    """
+    Resolves `(typename, id)` pairs through the federated `_entities` query.
+
+    The pairs are sent in chunks of `chunk_size` representations, up to
+    `concurrency` chunks at once. The result has the order of `keys`, an entity
+    which was not found (or failed) is None.
+
+    Args:
+      gqlclient: async callable (query, variables) -> response
+      query: query with `_entities(representations: $representations)` and a
+        fragment for every requested type, see `entities_query`
+      keys: `(typename, id)` pairs
+      variables: other variables of the query
+      chunk_size: representations per request (env `GQL_ENTITIES_CHUNK`)
+      concurrency: max. requests in flight (env `GQL_PAGE_CONCURRENCY`)
+
+    Raises:
+      Exception: a chunk failed without any data
+    """
+    representations = [{"__typename": t, "id": id} for t, id in keys]
+
+    async def fetch(chunk: list) -> list:
+        response = await gqlclient(
+            query, {**(variables or {}), "representations": chunk}
+        )
+        # server vrací entity v pořadí reprezentací, chybějící doplní None
+        rows = page_rows(response)
+        return [*rows[: len(chunk)], *[None] * (len(chunk) - len(rows))]
+
+    return await _chunked(representations, fetch, chunk_size, concurrency)
+
+
+async def resolve_by_id(
+    gqlclient,
+    query: str,
+    ids: typing.Sequence,
+    variables: dict | None = None,
+    schema=None,
+    chunk_size: int | None = None,
+    concurrency: int | None = None,
+) -> list[dict | None]:
+    """
+    Runs a query for one entity by `$id` for many ids in few requests, through
+    `_entities` when the schema has it, otherwise as aliased root fields
+    (`aliased_query`). Chunking, concurrency and result order as `resolve_entities`.
+
+    Args:
+      query: query for one entity with an `$id` variable (as for `runQuerySingle`)
+      ids: requested ids
+      variables: other variables of the query
+      schema: GraphQLSchema, the cached schema by default
+    """
+    if schema is None:
+        from sdl.sdl_fetch import get_schema_snapshot
+
+        schema = get_schema_snapshot().schema
+    variables = {k: v for k, v in (variables or {}).items() if k != "id"}
+    if "_entities" in schema.query_type.fields:
+        text, type_name = entities_query(query, schema)
+        return await resolve_entities(
+            gqlclient,
+            text,
+            [(type_name, id) for id in ids],
+            variables,
+            chunk_size,
+            concurrency,
+        )
+
+    async def fetch(chunk: list) -> list:
+        response = await gqlclient(
+            aliased_query(query, schema, len(chunk)),
+            {**variables, **{f"id{i}": id for i, id in enumerate(chunk)}},
+        )
+        if response.get("errors") and not response.get("data"):
+            raise Exception("GraphQL query failed", response["errors"])
+        data = response.get("data") or {}
+        return [data.get(f"e{i}") for i in range(len(chunk))]
+
+    return await _chunked(list(ids), fetch, chunk_size, concurrency)
+
+
+async def _chunked(items: list, fetch, chunk_size, concurrency) -> list:
+    chunk_size = max(1, chunk_size or GQL_ENTITIES_CHUNK)
+    semaphore = asyncio.Semaphore(max(1, concurrency or GQL_PAGE_CONCURRENCY))
+
+    async def run(chunk: list) -> list:
+        async with semaphore:
+            return await fetch(chunk)
+
+    tasks = [
+        asyncio.ensure_future(run(items[i : i + chunk_size]))
+        for i in range(0, len(items), chunk_size)
+    ]
+    try:
+        chunks = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    return [item for chunk in chunks for item in chunk]
+
+
+class PagingMixin:
+    """
+    Adds `iterate_pages`, `resolve_entities` and `resolve_by_id` to GraphQL client
+    classes, requests go through `self`.
+    """
+
+    def iterate_pages(
+        self,
+        query: str,
+        variables: dict | None = None,
+        page_size: int | None = None,
+        max_rows: int | None = None,
+        concurrency: int | None = None,
+    ) -> typing.AsyncIterator[dict]:
+        return iterate_pages(self, query, variables, page_size, max_rows, concurrency)
+
+    async def resolve_entities(
+        self,
+        query: str,
+        keys: typing.Sequence[tuple[str, typing.Any]],
+        variables: dict | None = None,
+        chunk_size: int | None = None,
+        concurrency: int | None = None,
+    ) -> list[dict | None]:
+        return await resolve_entities(
+            self, query, keys, variables, chunk_size, concurrency
+        )
+
+    async def resolve_by_id(
+        self,
+        query: str,
+        ids: typing.Sequence,
+        variables: dict | None = None,
+        schema=None,
+        chunk_size: int | None = None,
+        concurrency: int | None = None,
+    ) -> list[dict | None]:
+        return await resolve_by_id(
+            self, query, ids, variables, schema, chunk_size, concurrency
+        )
@@ -0,0 +1,161 @@
+"""
+Automatic persisted queries (APQ).
+
+A query is sent in full with `extensions.persistedQuery.sha256Hash` the first
+time, the server stores it under the hash. Once the server has accepted a hash,
+following requests send only the hash and variables. When the server has lost the
+query (`PersistedQueryNotFound`) the full text is sent again. Mutations are never
+sent hash-first, so they are never sent twice.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from graphql import parse, GraphQLError
+from graphql.language.ast import OperationDefinitionNode, OperationType
+
+GQL_APQ = os.getenv("GQL_APQ", "1").strip().lower() not in ("0", "false", "no", "")
+GQL_APQ_REGISTRY_SIZE = int(os.getenv("GQL_APQ_REGISTRY_SIZE", "4096"))
+
+NOT_FOUND = "PersistedQueryNotFound"
+NOT_SUPPORTED = "PersistedQueryNotSupported"
+# odpověď serveru, který extensions ignoruje, na požadavek bez textu dotazu
+_MISSING_QUERY = re.compile(
+    r"no (graphql )?query|must provide (a )?query|query (is )?(missing|required)",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=1024)
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def is_read_only(query: str) -> bool:
+    """
+    True if every operation of `query` is a query. Only those are sent hash-first,
+    a mutation must never be sent twice.
+    """
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return False
+    operations = [
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    ]
+    return bool(operations) and all(
+        op.operation == OperationType.QUERY for op in operations
+    )
+
+
+def persisted_extensions(digest: str) -> dict:
+    return {"persistedQuery": {"version": 1, "sha256Hash": digest}}
+
+
+def persisted_error(response, hash_only: bool = False) -> str | None:
+    """
+    `PersistedQueryNotFound`, `PersistedQueryNotSupported`, `error` (errors without
+    data) or None for a usable response. Works for dicts and decoded Structs.
+
+    With `hash_only` (the request had no query text) a "no query" error means the
+    server ignores persisted queries and is reported as `PersistedQueryNotSupported`.
+    """
+    if isinstance(response, dict):
+        errors, data = response.get("errors"), response.get("data")
+    else:
+        errors = getattr(response, "errors", None)
+        data = getattr(response, "data", None)
+    for error in errors or []:
+        if not isinstance(error, dict):
+            continue
+        code = (error.get("extensions") or {}).get("code")
+        message = error.get("message")
+        if NOT_FOUND in (message, code) or code == "PERSISTED_QUERY_NOT_FOUND":
+            return NOT_FOUND
+        if NOT_SUPPORTED in (message, code) or code == "PERSISTED_QUERY_NOT_SUPPORTED":
+            return NOT_SUPPORTED
+        if hash_only and not data and _MISSING_QUERY.search(str(message or "")):
+            return NOT_SUPPORTED
+    if errors and not data:
+        return "error"
+    return None
+
+
+class PersistedQueryRegistry:
+    """
+    Hashes of queries already accepted by a server, LRU per process.
+
+    Shared by all clients of the same endpoint, the server side cache is shared too.
+    An endpoint which does not understand hash-only requests is remembered and gets
+    plain requests since.
+
+    Args:
+        maxsize: max. number of remembered hashes (env `GQL_APQ_REGISTRY_SIZE`)
+    """
+
+    def __init__(self, maxsize: int | None = None):
+        self.maxsize = GQL_APQ_REGISTRY_SIZE if maxsize is None else maxsize
+        # (url, hash) -> None
+        self._accepted: OrderedDict[tuple[str, str], None] = OrderedDict()
+        self._unsupported: set[str] = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.registered = 0
+        self.bytes_saved = 0
+
+    def is_accepted(self, url: str, digest: str) -> bool:
+        with self._lock:
+            if (url, digest) not in self._accepted:
+                return False
+            self._accepted.move_to_end((url, digest))
+            return True
+
+    def accept(self, url: str, digest: str):
+        with self._lock:
+            if (url, digest) not in self._accepted:
+                self.registered += 1
+            self._accepted[(url, digest)] = None
+            self._accepted.move_to_end((url, digest))
+            while len(self._accepted) > self.maxsize:
+                self._accepted.popitem(last=False)
+
+    def forget(self, url: str, digest: str):
+        with self._lock:
+            self._accepted.pop((url, digest), None)
+            self.misses += 1
+
+    def hit(self, query: str):
+        self.hits += 1
+        self.bytes_saved += len(query.encode())
+
+    def is_supported(self, url: str) -> bool:
+        return url not in self._unsupported
+
+    def unsupported(self, url: str):
+        print(f"persisted queries are not supported by {url}", flush=True)
+        with self._lock:
+            self._unsupported.add(url)
+            for key in [key for key in self._accepted if key[0] == url]:
+                del self._accepted[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "registered": self.registered,
+            "hashes": len(self._accepted),
+            "bytes_saved": self.bytes_saved,
+            "unsupported": sorted(self._unsupported),
+        }
+
+
+APQ_REGISTRY = PersistedQueryRegistry()
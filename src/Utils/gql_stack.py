@@ -0,0 +1,19 @@
+from src.Utils.gql_cache import CachingGQLClient
+from src.Utils.gql_client import createGQLClient
+from src.Utils.gql_coalescing import CoalescingGQLClient
+from src.Utils.gql_guard import GuardedGQLClient
+
+
+async def createCachedGQLClient(user=None, **kwargs) -> CachingGQLClient:
+    """
+    The client stack shared by the app and the chat: `GQLClient` behind request
+    coalescing, the subgraph guards and the response cache (outermost).
+
+    Args:
+        user: authenticated app user the cached responses belong to, None = shared
+        kwargs: passed to `createGQLClient` (`url`, `username`, `password`)
+    """
+    return CachingGQLClient(
+        GuardedGQLClient(CoalescingGQLClient(await createGQLClient(**kwargs))),
+        user=user,
+    )
@@ -0,0 +1,160 @@
+import codecs
+import json
+import os
+
+# opt-in: skills stream velké stránky místo stránkování po částech
+GQL_STREAM_ROWS = os.getenv("GQL_STREAM_ROWS", "0").lower() in ("1", "true", "yes")
+
+_WHITESPACE = " \t\n\r"
+# znaky, kterými může číslo v JSON pokračovat
+_NUMBER_CHARS = "0123456789+-.eE"
+_decoder = json.JSONDecoder()
+
+
+class RowStreamDecoder:
+    """
+    Incremental decoder of a GraphQL response `{"data": {"<root>": [row, ...]}, ...}`.
+
+    Bytes are pushed by `feed` in arbitrary chunks, complete rows of the first root
+    field's list are returned as soon as they are parsed, so only one row (plus the
+    unparsed tail of the body) is held in memory. Everything else of the response
+    (other root fields, `errors`, `extensions`) is decoded normally and kept in
+    `root_name`, `data` and `extra`.
+
+    Example:
+        decoder = RowStreamDecoder()
+        for chunk in chunks:
+            for row in decoder.feed(chunk):
+                ...
+        decoder.close()
+    """
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._eof = False
+
+        self.root_name: str | None = None
+        # ostatní kořenová pole z `data` (první seznam se streamuje)
+        self.data: dict | None = {}
+        self.extra: dict = {}
+        self.rows = 0
+
+    @property
+    def errors(self) -> list | None:
+        return self.extra.get("errors")
+
+    def feed(self, chunk: bytes) -> list[dict]:
+        self._buf += self._text.decode(chunk)
+        return self._parse()
+
+    def close(self) -> list[dict]:
+        """Finishes decoding, raises ValueError for a truncated or invalid body."""
+        self._buf += self._text.decode(b"", final=True)
+        self._eof = True
+        rows = self._parse()
+        if self._state != "done":
+            raise ValueError(f"Incomplete GraphQL response (state {self._state})")
+        return rows
+
+    def _skip_ws(self) -> str | None:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buf[pos] if pos < len(buf) else None
+
+    def _value(self):
+        """Decodes one complete JSON value at the position or raises EOFError."""
+        if self._skip_ws() is None:
+            raise EOFError
+        try:
+            value, end = _decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if self._eof:
+                raise
+            raise EOFError
+        if not self._eof and (end >= len(self._buf) or self._buf[end] in _NUMBER_CHARS):
+            # číslo na konci bufferu ("1", "1.", "-1e") může pokračovat v dalším chunku
+            raise EOFError
+        self._pos = end
+        return value
+
+    def _expect(self, char: str):
+        if self._skip_ws() is None:
+            raise EOFError
+        if self._buf[self._pos] != char:
+            raise ValueError(
+                f"Expected {char!r} at {self._pos}, got {self._buf[self._pos]!r}"
+            )
+        self._pos += 1
+
+    def _parse(self) -> list[dict]:
+        rows = []
+        while True:
+            mark, state = self._pos, self._state
+            try:
+                self._step(rows)
+            except EOFError:
+                # čekáme na další data, nedokončený krok se zopakuje
+                self._pos, self._state = mark, state
+                break
+            if self._state == "done":
+                break
+        if self._pos > 65536:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+        self.rows += len(rows)
+        return rows
+
+    def _step(self, rows: list):
+        state = self._state
+        if state == "start":
+            self._expect("{")
+            self._state = "key"
+        elif state in ("key", "data_key"):
+            char = self._skip_ws()
+            if char is None:
+                raise EOFError
+            if char == ",":
+                self._pos += 1
+                return
+            if char == "}":
+                self._pos += 1
+                self._state = "key" if state == "data_key" else "done"
+                return
+            key = self._value()
+            self._expect(":")
+            if state == "data_key":
+                if self._skip_ws() is None:
+                    raise EOFError
+                if self.root_name is None and self._buf[self._pos] == "[":
+                    self._pos += 1
+                    self.root_name = key
+                    self._state = "array"
+                else:
+                    self.data[key] = self._value()
+            elif key == "data":
+                char = self._skip_ws()
+                if char is None:
+                    raise EOFError
+                if char == "{":
+                    self._pos += 1
+                    self._state = "data_key"
+                else:
+                    self.data = self._value()
+            else:
+                self.extra[key] = self._value()
+        elif state == "array":
+            char = self._skip_ws()
+            if char is None:
+                raise EOFError
+            if char == ",":
+                self._pos += 1
+            elif char == "]":
+                self._pos += 1
+                self._state = "data_key"
+            else:
+                rows.append(self._value())
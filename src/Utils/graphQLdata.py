@@ -1,6 +1,6 @@
 import typing
 from nicegui import ui
-import json
+from src.Utils import json_codec
 
 
 def GraphQLData(
@@ -12,6 +12,7 @@ def GraphQLData(
     metadata: typing.Optional[typing.List[typing.Dict[str, typing.Any]]] = None,
     # extract_rows: typing.Optional[typing.Callable[[typing.Dict[str, typing.Any]], typing.List[typing.Dict[str, typing.Any]]]] = None,
     autoload: bool = True,
+    stream: bool = False,
 ):
     """Composite NiceGUI widget to page GraphQL list results and show them in a table.
 
@@ -21,6 +22,7 @@ def GraphQLData(
         variables: initial variables; uses 'skip' and 'limit' for paging
         result: initial rows (optional)
         autoload: if True and no initial result, automatically loads first page
+        stream: if True and the client has `stream`, rows are decoded and added while the page is downloading
     """
     if variables is None:
         variables = {}
@@ -69,6 +71,14 @@ def GraphQLData(
         await load_page(skip=0)
     
 
+    def add_row(row) -> None:
+        # append unique
+        rid = row.get("id")
+        if rid is not None and rid not in state["ids"]:
+            state["result"].append(row)
+            if rid is not None:
+                state["ids"].add(rid)
+
     async def load_page(skip: typing.Optional[int] = None):
         if state["loading"]:
             return
@@ -81,6 +91,17 @@ def GraphQLData(
             else:
                 vars_now["skip"] = vars_now.get("skip", 0) + vars_now.get("limit", 10)
             print(f"load_page.variables={vars_now}")
+            if stream and hasattr(gqlclient, "stream"):
+                count = 0
+                async for row in gqlclient.stream(query, vars_now):
+                    count += 1
+                    if isinstance(row, dict):
+                        add_row(row)
+                state["variables"] = {
+                    **vars_now
+                }
+                compute_done(count)
+                return
             response = await gqlclient(query, vars_now)
             errors = response.get("errors")
             if errors:
@@ -92,15 +113,8 @@ def GraphQLData(
             if not isinstance(rows, list):
                 state["errors"] = ["response has nonlist key, this is not expected"]
                 rows = []
-            # append unique
-            # new_added = 0
             for row in rows:
-                rid = row.get("id")
-                if rid is not None and rid not in state["ids"]:
-                    state["result"].append(row)
-                    if rid is not None:
-                        state["ids"].add(rid)
-                    # new_added += 1
+                add_row(row)
 
             state["variables"] = {
                 **vars_now
@@ -153,18 +167,18 @@ def GraphQLData(
                 # ui.label('varTab tab')
                 ui.markdown((
                     "```json\n"
-                    f'{json.dumps(state["variables"], indent=2)}'
+                    f'{json_codec.dumps(state["variables"], indent=2)}'
                     "\n```"
                 ))
             with ui.tab_panel(rawresultTab):
                 ui.markdown((
                     "## Raw Result\n\n"
                     "```json\n"
-                    f"{json.dumps(state['result'], indent=2)}"
+                    f"{json_codec.dumps(state['result'], indent=2)}"
                     "\n```\n"
                     "## Metadata\n\n"
                     "```json\n"
-                    f"{json.dumps(metadata, indent=2)}"
+                    f"{json_codec.dumps(metadata, indent=2)}"
                     "\n```"
                     
                 ))
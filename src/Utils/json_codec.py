@@ -0,0 +1,106 @@
+"""
+One JSON codec for the hot paths (GraphQL client, logs, widgets, skills).
+
+Uses orjson or msgspec when installed, stdlib `json` otherwise. The backend can be
+forced with env `JSON_CODEC` (`orjson`, `msgspec`, `json`). Output is always UTF-8
+text without `\\uXXXX` escapes (like `ensure_ascii=False`), whatever the backend.
+Values the native backend cannot encode (big ints, unknown types without
+`default`, ...) are encoded by stdlib `json`.
+"""
+
+import json
+import os
+import typing
+
+JSONDecodeError = json.JSONDecodeError
+
+_requested = os.getenv("JSON_CODEC", "").strip().lower()
+
+orjson = None
+msgspec = None
+if _requested in ("", "orjson"):
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+if orjson is None and _requested in ("", "msgspec"):
+    try:
+        import msgspec
+    except ImportError:
+        msgspec = None
+
+BACKEND = "orjson" if orjson else "msgspec" if msgspec else "json"
+
+
+def _std_dumps(obj, indent, default, sort_keys) -> str:
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        indent=indent or None,
+        default=default,
+        sort_keys=sort_keys,
+    )
+
+
+def dumps(
+    obj: typing.Any,
+    *,
+    indent: int | None = None,
+    default: typing.Callable[[typing.Any], typing.Any] | None = None,
+    sort_keys: bool = False,
+) -> str:
+    """Encodes `obj` to a JSON string, `indent` 2 is native for orjson and msgspec."""
+    if indent in (None, 0, 2):
+        try:
+            if orjson is not None:
+                option = orjson.OPT_NON_STR_KEYS
+                if indent:
+                    option |= orjson.OPT_INDENT_2
+                if sort_keys:
+                    option |= orjson.OPT_SORT_KEYS
+                return orjson.dumps(obj, default=default, option=option).decode()
+            if msgspec is not None and not sort_keys:
+                data = msgspec.json.encode(obj, enc_hook=default)
+                if indent:
+                    data = msgspec.json.format(data, indent=indent)
+                return data.decode()
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return _std_dumps(obj, indent, default, sort_keys)
+
+
+def dumps_bytes(
+    obj: typing.Any,
+    *,
+    default: typing.Callable[[typing.Any], typing.Any] | None = None,
+) -> bytes:
+    """Compact UTF-8 JSON, e.g. for request bodies."""
+    try:
+        if orjson is not None:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+        if msgspec is not None:
+            return msgspec.json.encode(obj, enc_hook=default)
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return _std_dumps(obj, None, default, False).encode()
+
+
+def loads(data: str | bytes | bytearray | memoryview) -> typing.Any:
+    """
+    Decodes JSON text or UTF-8 bytes.
+
+    Raises:
+        JSONDecodeError: invalid JSON (same type as stdlib `json.JSONDecodeError`)
+    """
+    if orjson is not None:
+        # orjson.JSONDecodeError je podtřída json.JSONDecodeError
+        return orjson.loads(data)
+    if msgspec is not None:
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            text = (
+                data if isinstance(data, str) else bytes(data).decode(errors="replace")
+            )
+            raise JSONDecodeError(str(e), text, 0) from e
+    return json.loads(data)
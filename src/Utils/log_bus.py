@@ -5,6 +5,8 @@ from dataclasses import dataclass
 from logging.handlers import QueueHandler, QueueListener
 from typing import Any, Deque, Dict, List, Optional
 
+from src.Utils import json_codec
+
 LEVEL_COLORS = {
     "DEBUG": "#6b7280",
     "INFO": "#2563eb",
@@ -113,9 +115,9 @@ def _to_jsonable(obj: Any, *, max_depth: int = 4, _seen: Optional[set] = None) -
     if isinstance(dct, dict):
         return _to_jsonable(dct, max_depth=max_depth - 1, _seen=_seen)
 
-    # Fallback: pokud projde json.dumps, vrať rovnou; jinak repr
+    # Fallback: pokud projde json_codec.dumps, vrať rovnou; jinak repr
     try:
-        json.dumps(obj)
+        json_codec.dumps(obj)
         return obj
     except Exception:
         try:
@@ -168,6 +170,10 @@ class LogItem:
 
 class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
+        # Serializace na JSON string
+        return json_codec.dumps(self.to_dict(record))
+
+    def to_dict(self, record: logging.LogRecord) -> Dict[str, Any]:
         exc_text = None
         if record.exc_info:
             try:
@@ -208,8 +214,7 @@ class JSONFormatter(logging.Formatter):
             exc_text=exc_text,
         )
 
-        # Serializace na JSON string
-        return json.dumps(item.to_dict(), ensure_ascii=False)
+        return item.to_dict()
 
 
 class LogBus:
@@ -220,7 +225,7 @@ class LogBus:
 
     def push_json(self, json_line: str):
         try:
-            obj = json.loads(json_line)
+            obj = json_codec.loads(json_line)
         except Exception:
             obj = {
                 "iso": time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -228,6 +233,9 @@ class LogBus:
                 "logger": "logbus",
                 "message": f"Invalid JSON log line: {json_line!r}",
             }
+        self.push(obj)
+
+    def push(self, obj: Dict[str, Any]):
         self.buffer.appendleft(obj)
         try:
             self.q.put_nowait(obj)
@@ -251,8 +259,13 @@ class InMemoryHandler(logging.Handler):
 
     def emit(self, record: logging.LogRecord):
         try:
-            # Pozor: LOG_BUS.push_json nesmí logovat do stejného loggeru
-            LOG_BUS.push_json(self.format(record))
+            # Pozor: LOG_BUS.push nesmí logovat do stejného loggeru
+            formatter = self.formatter
+            if isinstance(formatter, JSONFormatter):
+                # bez zbytečného dumps -> loads, záznam jde rovnou jako dict
+                LOG_BUS.push(formatter.to_dict(record))
+            else:
+                LOG_BUS.push_json(self.format(record))
         except Exception:
             # Neposílat to zpátky do loggeru (vyhnout se smyčce)
             logging.Handler.handleError(self, record)
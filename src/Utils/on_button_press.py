@@ -1,6 +1,7 @@
 # feedback_handlers.py
 from dataclasses import dataclass
-from Database.Embedding.add_to_db import add_embedding_row
+from nicegui import background_tasks
+from Database.Embedding.add_to_db import aadd_embedding_row
 
 
 # provides a decorator and functions for automatically adding generated special methods such as __init__() and __repr__() to user-defined classes
@@ -72,7 +73,10 @@ def on_like_click(
         like_btn.set_content(_btn_html("like", state.like, svgs, disabled=False))
 
         if on_commit:
-            add_embedding_row(on_commit[0], on_commit[1])
+            # embedding i zápis do DB běží na pozadí, UI smyčka nečeká
+            background_tasks.create(
+                aadd_embedding_row(on_commit[0], on_commit[1]), name="add_embedding_row"
+            )
         _disable_both(like_btn, dislike_btn, state, svgs)
 
 
@@ -0,0 +1,182 @@
+import os
+from functools import lru_cache
+
+from graphql import parse, GraphQLError
+from graphql.language import visit, Visitor
+from graphql.language.ast import ArgumentNode, OperationDefinitionNode
+
+from src.Utils import json_codec
+
+# podobnost (cosine), od které se liked dotaz spustí bez LLM
+SEMANTIC_ANSWER_THRESHOLD = float(os.getenv("SEMANTIC_ANSWER_THRESHOLD", "0.92"))
+# podobnost, od které se liked dotazy přidají jako příklady pro LLM
+SEMANTIC_FEW_SHOT_THRESHOLD = float(os.getenv("SEMANTIC_FEW_SHOT_THRESHOLD", "0.7"))
+SEMANTIC_FEW_SHOT_K = int(os.getenv("SEMANTIC_FEW_SHOT_K", "3"))
+SEMANTIC_ANSWER_LIMIT = int(os.getenv("SEMANTIC_ANSWER_LIMIT", "10"))
+
+
+# jediné vstupy, které lze u liked dotazu bezpečně doplnit
+PAGE_ARGUMENTS = frozenset(("skip", "limit"))
+
+
+class _ArgumentNames(Visitor):
+    def __init__(self):
+        super().__init__()
+        self.names = set()
+
+    def enter_argument(self, node: ArgumentNode, *_):
+        self.names.add(node.name.value)
+
+
+@lru_cache(maxsize=256)
+def page_variables(query: str, limit: int) -> dict | None:
+    """
+    Variables for re-running a stored query: `skip` 0 and `limit`.
+
+    Liked rows keep only the query text, not the filter or id the user asked about,
+    and a near-duplicate question may differ exactly in it ("starts with Z" vs "Y").
+    So only queries whose sole inputs are `skip` and `limit` are re-run. None for a
+    query declaring any other variable or having any other argument, literal or not.
+    """
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+    operations = [
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    ]
+    if len(operations) != 1 or operations[0].operation.value != "query":
+        return None
+    finder = _ArgumentNames()
+    visit(document, finder)
+    if not finder.names <= PAGE_ARGUMENTS:
+        return None
+    variables = {}
+    for definition in operations[0].variable_definitions or []:
+        name = definition.variable.name.value
+        if name not in PAGE_ARGUMENTS:
+            return None
+        variables[name] = 0 if name == "skip" else limit
+    return variables
+
+
+class SemanticAnswers:
+    """
+    Reuses liked `(question, query)` pairs from `graphql_types` for new questions.
+
+    The question is embedded and the nearest liked questions are looked up. Above
+    `threshold` the stored query is run directly through the GraphQL client and its
+    result is the answer, without the tool-calling loop of the LLM, but only if it
+    takes no input besides paging (see `page_variables`). Otherwise the matches above
+    `few_shot_threshold` are given to the LLM as examples.
+
+    Args:
+        threshold: similarity for a direct answer (env `SEMANTIC_ANSWER_THRESHOLD`)
+        few_shot_threshold: similarity for an example (env `SEMANTIC_FEW_SHOT_THRESHOLD`)
+        k: number of looked up questions (env `SEMANTIC_FEW_SHOT_K`)
+        limit: `$limit` of a directly run page query (env `SEMANTIC_ANSWER_LIMIT`)
+    """
+
+    def __init__(
+        self,
+        threshold: float | None = None,
+        few_shot_threshold: float | None = None,
+        k: int | None = None,
+        limit: int | None = None,
+    ):
+        self.threshold = SEMANTIC_ANSWER_THRESHOLD if threshold is None else threshold
+        self.few_shot_threshold = (
+            SEMANTIC_FEW_SHOT_THRESHOLD
+            if few_shot_threshold is None
+            else few_shot_threshold
+        )
+        self.k = SEMANTIC_FEW_SHOT_K if k is None else k
+        self.limit = SEMANTIC_ANSWER_LIMIT if limit is None else limit
+
+        self.lookups = 0
+        self.answered = 0
+        self.few_shots = 0
+        self.errors = 0
+
+    async def matches(self, question: str) -> list[tuple[str, str, float]]:
+        """Liked (question, query, score) above `few_shot_threshold`, best first."""
+        from Database.Embedding.vector_search import asearch_similar
+
+        self.lookups += 1
+        try:
+            matches = await asearch_similar(
+                question, k=self.k, threshold=self.few_shot_threshold
+            )
+        except Exception as e:
+            # bez embeddingů / databáze odpoví LLM jako dřív
+            self.errors += 1
+            print(f"semantic answer lookup failed: {e}")
+            return []
+        return [m for m in matches if m[1]]
+
+    async def answer(self, matches, gqlclient) -> dict | None:
+        """
+        Runs the query of the best match above `threshold`, returns the chat answer
+        (`Response`, `Query`, `Variables`) or None when the LLM has to answer.
+        """
+        if not matches or matches[0][2] < self.threshold:
+            return None
+        # až zde, SemanticKernel importuje tento modul
+        try:
+            from Skills.graphqlQueryCost import admit_query
+        except ImportError:
+            from SemanticKernel.Skills.graphqlQueryCost import admit_query
+
+        question, query, score = matches[0]
+        variables = page_variables(query, self.limit)
+        if variables is None:
+            return None
+        try:
+            admission = admit_query(query, variables)
+            if not admission.allowed:
+                return None
+            response = await gqlclient(admission.query, admission.variables)
+        except Exception as e:
+            self.errors += 1
+            print(f"semantic answer query failed: {e}")
+            return None
+        if not isinstance(response, dict) or response.get("errors"):
+            return None
+        data = response.get("data")
+        if not data:
+            return None
+
+        self.answered += 1
+        print(f"semantic answer: {score:.3f} for liked question {question!r}")
+        rows = next(iter(data.values()))
+        return {
+            "Response": f"Answered with the query of the similar question "
+            f"„{question}“ (similarity {score:.2f}):\n\n"
+            f"```json\n{json_codec.dumps(rows, indent=2, default=str)}\n```",
+            "Query": admission.query,
+            "Variables": admission.variables,
+        }
+
+    def few_shot(self, matches) -> str | None:
+        """System message with the matches as examples, None without matches."""
+        if not matches:
+            return None
+        self.few_shots += 1
+        examples = "\n\n".join(
+            f"Question: {question}\nQuery: {query}" for question, query, _ in matches
+        )
+        return (
+            "Users liked these queries for similar questions, use them as examples "
+            "(check the types and arguments before reusing one):\n\n" + examples
+        )
+
+    def stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "answered": self.answered,
+            "few_shots": self.few_shots,
+            "errors": self.errors,
+        }
+
+
+SEMANTIC_ANSWERS = SemanticAnswers()